@@ -0,0 +1,434 @@
+"""Micro-benchmarks for the fetch and rule-processing pipelines.
+
+Each subcommand builds synthetic data locally (no Gmail access needed), times
+the current implementation against the previous approach and prints the
+results.
+
+Usage:
+    python benchmark.py storage --messages 10000 100000
+    python benchmark.py rules --rules 100 --emails 100000
+    python benchmark.py parse --repeat 2000
+    python benchmark.py raw --attachment-mb 1 10 25
+
+Subcommands:
+    storage: Deduplicate and store fetched emails (per-row ORM vs EmailStore).
+    rules: Evaluate rules against emails (interpreted vs compiled, with and
+        without cost-based condition ordering, and vectorized with NumPy).
+    parse: Parse the recorded Gmail API payloads in tests/fixtures (full
+        header map and recursive base64 decoding vs parse_message).
+    raw: Parse format=raw messages with large attachments (email.parser
+        BytesFeedParser vs the streaming scan), reporting time and peak
+        memory.
+"""
+
+import argparse
+import base64
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.parser import BytesFeedParser
+from email.policy import default
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# Add the src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from gmail_automation.database.connection import Database
+from gmail_automation.database.models import Email
+from gmail_automation.database.store import EmailStore
+from gmail_automation.gmail.parser import FORMAT_RAW, parse_message
+from gmail_automation.rules import batch
+from gmail_automation.rules.engine import Action, Condition, Rule, RuleEngine
+from gmail_automation.utils.helpers import chunked
+
+BASE_DATE = datetime(2024, 1, 1)
+
+# Recorded messages.get responses used by the parse benchmark.
+FIXTURES_DIR = (
+    Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "gmail_messages"
+)
+
+# Condition templates cycled through when generating rules.
+CONDITION_TEMPLATES = [
+    ("from", "contains", "example{n}.com"),
+    ("from", "equals", "sender{n}@example3.com"),
+    ("subject", "contains", "subject {n}"),
+    ("subject", "not_contains", "urgent {n}"),
+    ("message", "contains", "hello {n},"),
+    ("received_date", "less_than", "{n} days ago"),
+]
+
+
+def make_emails(count: int, offset: int = 0) -> List[Email]:
+    """
+    Build synthetic Email objects.
+
+    Args:
+        count (int): Number of emails to build.
+        offset (int): First numeric ID to use.
+
+    Returns:
+        List[Email]: The generated emails.
+    """
+    return [
+        Email(
+            id=f"m{i:08d}",
+            thread_id=f"t{i // 3:08d}",
+            message_id=f"<m{i:08d}@example.com>",
+            sender=f"sender{i % 500}@example{i % 7}.com",
+            recipient="me@example.com",
+            subject=f"Subject {i} newsletter" if i % 5 == 0 else f"Subject {i}",
+            body=f"Hello {i}, this is a synthetic message body. " * 8,
+            received_at=BASE_DATE + timedelta(minutes=i),
+            is_read=i % 2 == 0,
+            labels='["INBOX", "UNREAD"]',
+        )
+        for i in range(offset, offset + count)
+    ]
+
+
+def make_rules(count: int) -> List[Rule]:
+    """
+    Build synthetic rules mixing every field, predicate and logic.
+
+    Args:
+        count (int): Number of rules to build.
+
+    Returns:
+        List[Rule]: The generated rules.
+    """
+    rules = []
+    for i in range(count):
+        conditions = [
+            Condition(field=field, predicate=predicate, value=value.format(n=i + j))
+            for j, (field, predicate, value) in enumerate(
+                CONDITION_TEMPLATES[(i + k) % len(CONDITION_TEMPLATES)]
+                for k in range(1 + i % 3)
+            )
+        ]
+        rules.append(
+            Rule(
+                name=f"Rule {i}",
+                conditions=conditions,
+                logic="all" if i % 2 else "any",
+                actions=[Action(type="mark_read")],
+            )
+        )
+    return rules
+
+
+def timed(label: str, func: Callable[[], object]) -> float:
+    """
+    Run a function once and print how long it took.
+
+    Args:
+        label (str): Name printed next to the timing.
+        func (Callable[[], object]): The function to time.
+
+    Returns:
+        float: Elapsed seconds.
+    """
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<40} {elapsed:8.3f}s")
+    return elapsed
+
+
+def bench_storage(counts: List[int], chunk_size: int) -> None:
+    """
+    Compare per-row ORM dedupe/insert with bulk EmailStore dedupe/insert.
+
+    Half of each run's messages already exist in the database, mirroring a
+    fetch that overlaps the previous one.
+
+    Args:
+        counts (List[int]): Message counts to benchmark.
+        chunk_size (int): IDs deduplicated and committed per chunk.
+    """
+    for count in counts:
+        print(f"storage: {count} messages ({count // 2} already stored)")
+        for name in ("per-row ORM", "EmailStore"):
+            with tempfile.TemporaryDirectory() as tmp:
+                database = Database(f"sqlite:///{tmp}/bench.db")
+                database.create_tables()
+                with EmailStore(database) as seed:
+                    seed.add(make_emails(count // 2))
+                emails = make_emails(count)
+
+                def legacy() -> None:
+                    with database.get_session() as session:
+                        for email in emails:
+                            exists = session.query(Email).filter_by(id=email.id).first()
+                            if not exists:
+                                session.add(email)
+
+                def bulk() -> None:
+                    with EmailStore(database, commit_every=chunk_size) as store:
+                        for chunk in chunked(emails, chunk_size):
+                            new_ids = set(store.filter_new_ids(e.id for e in chunk))
+                            store.add(e for e in chunk if e.id in new_ids)
+
+                timed(name, legacy if name == "per-row ORM" else bulk)
+                database.engine.dispose()
+
+
+def bench_rules(rule_count: int, email_count: int) -> None:
+    """
+    Compare interpreted and compiled rule evaluation.
+
+    Args:
+        rule_count (int): Number of rules to evaluate.
+        email_count (int): Number of emails to evaluate them against.
+    """
+    logging.getLogger("gmail_automation").setLevel(logging.WARNING)
+    engine = RuleEngine(rules=make_rules(rule_count))
+    emails = make_emails(email_count)
+    print(f"rules: {rule_count} rules x {email_count} emails")
+
+    def interpreted() -> None:
+        for email in emails:
+            for rule in engine.rules:
+                engine._evaluate_rule(email, rule)
+
+    def compiled() -> None:
+        for email in emails:
+            engine.evaluate_email(email)
+
+    optimized_engine = RuleEngine(rules=engine.rules, optimize=True)
+
+    def optimized() -> None:
+        for email in emails:
+            optimized_engine.evaluate_email(email)
+
+    baseline = timed("interpreted (_evaluate_rule)", interpreted)
+    elapsed = timed("compiled (evaluate_email)", compiled)
+    print(f"  speedup {baseline / elapsed:.1f}x")
+    elapsed = timed("compiled, optimize=True", optimized)
+    print(f"  speedup {baseline / elapsed:.1f}x")
+
+    def vectorized() -> None:
+        for chunk in chunked(emails, 10_000):
+            engine.evaluate_emails(chunk, vectorize=True)
+
+    if batch.is_available():
+        elapsed = timed("vectorized (evaluate_emails)", vectorized)
+        print(f"  speedup {baseline / elapsed:.1f}x")
+
+
+def legacy_parse(message: Dict[str, Any]) -> Email:
+    """
+    Parse a message the way the client did before selective header parsing.
+
+    Args:
+        message (Dict[str, Any]): A ``messages.get`` response.
+
+    Returns:
+        Email: The parsed email.
+    """
+
+    def extract(payload: Dict[str, Any]) -> str:
+        if payload.get("body", {}).get("data"):
+            data = payload["body"]["data"]
+            return base64.urlsafe_b64decode(data.encode("ASCII")).decode(
+                "utf-8", "ignore"
+            )
+        for part in payload.get("parts", []):
+            if part["mimeType"] == "text/plain":
+                if part.get("body", {}).get("data"):
+                    return extract(part)
+            elif "parts" in part:
+                body = extract(part)
+                if body:
+                    return body
+        return ""
+
+    header_map = {h["name"].lower(): h["value"] for h in message["payload"]["headers"]}
+    label_ids = message.get("labelIds", [])
+    return Email(
+        id=message["id"],
+        thread_id=message["threadId"],
+        message_id=header_map.get("message-id", message["id"]),
+        subject=header_map.get("subject", ""),
+        sender=header_map.get("from", ""),
+        recipient=header_map.get("to", ""),
+        received_at=datetime.fromtimestamp(int(message["internalDate"]) / 1000.0),
+        body=extract(message["payload"]),
+        is_read="UNREAD" not in label_ids,
+        labels=json.dumps(label_ids),
+    )
+
+
+def bench_parse(repeat: int, max_body_bytes: int) -> None:
+    """
+    Compare the legacy message parser with parse_message on the fixture corpus.
+
+    Args:
+        repeat (int): Times the whole corpus is parsed.
+        max_body_bytes (int): Body truncation passed to parse_message.
+    """
+    paths = sorted(FIXTURES_DIR.glob("*.json"))
+    messages = [json.loads(path.read_text()) for path in paths]
+    count = len(messages) * repeat
+    print(f"parse: {len(messages)} fixture messages x {repeat}")
+
+    def legacy() -> None:
+        for _ in range(repeat):
+            for message in messages:
+                legacy_parse(message)
+
+    def selective() -> None:
+        for _ in range(repeat):
+            for message in messages:
+                parse_message(message, max_body_bytes=max_body_bytes)
+
+    baseline = timed("legacy (header map, urlsafe_b64decode)", legacy)
+    print(f"  {count / baseline:,.0f} messages/s")
+    elapsed = timed("parse_message", selective)
+    print(f"  {count / elapsed:,.0f} messages/s, speedup {baseline / elapsed:.1f}x")
+
+    # HTML-only messages cost more now: the legacy parser skipped their text.
+    for path, message in zip(paths, messages):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            legacy_parse(message)
+        before = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parse_message(message, max_body_bytes=max_body_bytes)
+        after = time.perf_counter() - start
+        print(
+            f"  {path.stem:<16} {before / repeat * 1e6:8.1f}us -> "
+            f"{after / repeat * 1e6:8.1f}us"
+        )
+
+
+def make_raw_message(attachment_size: int) -> Dict[str, Any]:
+    """
+    Build a format=raw response whose attachment precedes the text part.
+
+    Args:
+        attachment_size (int): Attachment size in bytes.
+
+    Returns:
+        Dict[str, Any]: The ``messages.get`` response.
+    """
+    message = EmailMessage()
+    message["From"] = "Billing <billing@example.com>"
+    message["To"] = "me@example.com"
+    message["Subject"] = "Quarterly report"
+    message["Message-ID"] = "<report@example.com>"
+    attachment = os.urandom(attachment_size)
+    message.add_attachment(
+        attachment, maintype="application", subtype="pdf", filename="report.pdf"
+    )
+    message.add_attachment("The report is attached.\n", disposition="inline")
+    return {
+        "id": "raw",
+        "threadId": "raw",
+        "labelIds": ["INBOX"],
+        "internalDate": "1700000000000",
+        "raw": base64.urlsafe_b64encode(message.as_bytes()).decode("ascii"),
+    }
+
+
+def feed_parse(message: Dict[str, Any]) -> str:
+    """
+    Parse a format=raw message by building its whole MIME tree.
+
+    Args:
+        message (Dict[str, Any]): A ``messages.get`` response.
+
+    Returns:
+        str: The first text/plain part.
+    """
+    parser = BytesFeedParser(policy=default)
+    parser.feed(base64.urlsafe_b64decode(message["raw"]))
+    part = parser.close().get_body(preferencelist=("plain", "html"))
+    return part.get_content() if part is not None else ""
+
+
+def profiled(label: str, func: Callable[[], object]) -> None:
+    """
+    Run a function once and print its time and peak traced memory.
+
+    Args:
+        label (str): Name printed next to the results.
+        func (Callable[[], object]): The function to run.
+    """
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    print(f"  {label:<40} {elapsed:8.3f}s {peak / 1_048_576:8.1f} MiB peak")
+
+
+def bench_raw(sizes_mb: List[float]) -> None:
+    """
+    Compare BytesFeedParser with the streaming scan on format=raw messages.
+
+    Peak memory excludes the ``raw`` string itself, which both hold.
+
+    Args:
+        sizes_mb (List[float]): Attachment sizes to benchmark, in MiB.
+    """
+    for size_mb in sizes_mb:
+        message = make_raw_message(int(size_mb * 1_048_576))
+        print(f"raw: {size_mb:g} MiB attachment before the text part")
+        profiled("BytesFeedParser", lambda: feed_parse(message))
+        profiled(
+            "parse_message(format=raw)", lambda: parse_message(message, FORMAT_RAW)
+        )
+
+
+def main():
+    """
+    Parse arguments and run the selected benchmark.
+    """
+    parser = argparse.ArgumentParser(description="Run pipeline micro-benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    storage_parser = subparsers.add_parser("storage", help="Fetch-pipeline storage")
+    storage_parser.add_argument(
+        "--messages", type=int, nargs="+", default=[10_000, 100_000]
+    )
+    storage_parser.add_argument("--chunk-size", type=int, default=500)
+
+    rules_parser = subparsers.add_parser("rules", help="Rule evaluation")
+    rules_parser.add_argument("--rules", type=int, default=100)
+    rules_parser.add_argument("--emails", type=int, default=100_000)
+
+    parse_parser = subparsers.add_parser("parse", help="Message parsing")
+    parse_parser.add_argument("--repeat", type=int, default=2000)
+    parse_parser.add_argument("--max-body-bytes", type=int, default=1_048_576)
+
+    raw_parser = subparsers.add_parser("raw", help="Raw message parsing")
+    raw_parser.add_argument(
+        "--attachment-mb", type=float, nargs="+", default=[1.0, 10.0, 25.0]
+    )
+
+    args = parser.parse_args()
+
+    if args.benchmark == "storage":
+        bench_storage(args.messages, args.chunk_size)
+    elif args.benchmark == "rules":
+        bench_rules(args.rules, args.emails)
+    elif args.benchmark == "parse":
+        bench_parse(args.repeat, args.max_body_bytes)
+    elif args.benchmark == "raw":
+        bench_raw(args.attachment_mb)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,36 +8,485 @@ Usage:
 
 Arguments:
     --query: Gmail search query (default: "is:unread")
-    --max-results: Maximum number of emails to fetch (default: 100)
+    --max-results: Maximum number of emails to fetch, 0 for no limit (default: 100)
+    --batch-size: Messages per Gmail batch request (default: 50, max: 100)
+    --no-batch: Fetch message details one request at a time.
+    --commit-every: New emails stored per database commit (default: 500)
+    --workers: Threads fetching message details in parallel (default: 1)
+    --incremental: Only sync changes since the last run using the Gmail history
+        API, falling back to a full resync when there is no valid checkpoint.
+        Incremental syncs mirror all mailbox changes and ignore --query and
+        --max-results; the full resync covers the whole mailbox.
+    --async: Fetch message details concurrently with the asyncio client
+        (requires httpx). Ignored with --incremental.
+    --concurrency: Requests in flight at once with --async (default: 10)
+    --format: "full" (default), "metadata" to store headers and labels only
+        (bodies are fetched by process when a rule reads them), or "raw" to
+        scan the RFC 822 message in chunks, skipping attachments.
+    --max-body-bytes: Truncate stored bodies to this many bytes, 0 for no
+        limit (default: 1048576)
 """
 
 import argparse
+import asyncio
+import json
 import logging
 import os
 import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Set
 
 # Add the src directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
+from google.oauth2.credentials import Credentials
+from sqlalchemy import select
+
 from gmail_automation.auth.gmail_auth import GmailAuth
 from gmail_automation.database.connection import Database, get_db_url
-from gmail_automation.database.models import Email
-from gmail_automation.gmail.client import GmailClient
+from gmail_automation.database.models import Email, SyncState
+from gmail_automation.database.store import (
+    DEFAULT_COMMIT_EVERY,
+    MAX_IN_PARAMS,
+    EmailStore,
+    EmailWriter,
+    delete_emails,
+    set_labels,
+)
+from gmail_automation.gmail import async_client
+from gmail_automation.gmail.async_client import (
+    DEFAULT_MAX_CONCURRENCY,
+    AsyncGmailClient,
+)
+from gmail_automation.gmail.client import (
+    DEFAULT_BATCH_SIZE,
+    BatchFetchResult,
+    GmailClient,
+    HistoryExpiredError,
+)
+from gmail_automation.gmail.parallel import ParallelFetcher
+from gmail_automation.gmail.parser import (
+    DEFAULT_MAX_BODY_BYTES,
+    FORMAT_FULL,
+    FORMAT_METADATA,
+    MESSAGE_FORMATS,
+)
+from gmail_automation.gmail.ratelimit import RateLimiter
+from gmail_automation.utils.helpers import chunked, positive_int
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
+# Sync checkpoints are keyed by account; the client always acts as "me".
+SYNC_ACCOUNT = "me"
+
+
+class HistoryUnavailableError(Exception):
+    """Raised when the mailbox history cannot be read, for a reason other than
+    an expired checkpoint, so the sync must be retried later."""
+
+
+def fetch_details(
+    gmail_client: GmailClient,
+    message_ids: List[str],
+    args: argparse.Namespace,
+    message_format: Optional[str] = None,
+) -> BatchFetchResult:
+    """
+    Fetch and parse the details for a list of message IDs.
+
+    Args:
+        gmail_client (GmailClient): The Gmail API client.
+        message_ids (List[str]): IDs of the messages to fetch.
+        args (argparse.Namespace): Parsed command-line arguments.
+        message_format (Optional[str]): The format to fetch the messages in
+            (default: --format).
+
+    Returns:
+        BatchFetchResult: Successfully parsed emails and per-ID failures.
+    """
+    message_format = message_format or args.format
+    if not message_ids:
+        return BatchFetchResult(emails=[], failures={})
+    if args.no_batch:
+        emails = []
+        failures = {}
+        for message_id in message_ids:
+            email = gmail_client.get_message_details(message_id, message_format)
+            if email is None:
+                failures[message_id] = "Could not fetch message"
+            else:
+                emails.append(email)
+        result = BatchFetchResult(emails=emails, failures=failures)
+    else:
+        result = gmail_client.get_messages_details(
+            message_ids, batch_size=args.batch_size, message_format=message_format
+        )
+    if result.failures:
+        logger.warning(
+            f"Failed to fetch {len(result.failures)} of {len(message_ids)} messages."
+        )
+    return result
+
+
+def full_sync(
+    gmail_client: GmailClient,
+    database: Database,
+    args: argparse.Namespace,
+    fetcher: Optional[ParallelFetcher] = None,
+) -> Dict[str, str]:
+    """
+    List messages by query and store the ones missing from the database.
+
+    Args:
+        gmail_client (GmailClient): The Gmail API client.
+        database (Database): The database connection manager.
+        args (argparse.Namespace): Parsed command-line arguments.
+        fetcher (Optional[ParallelFetcher]): Fetch details on worker threads.
+
+    Returns:
+        Dict[str, str]: Error message for each message that failed to fetch.
+    """
+    # 1. Stream message IDs page by page
+    message_ids = gmail_client.iter_message_ids(
+        query=args.query, limit=args.max_results or None
+    )
+
+    found_count = 0
+
+    def new_id_chunks() -> Iterator[List[str]]:
+        nonlocal found_count
+        for chunk in chunked(message_ids, args.batch_size):
+            found_count += len(chunk)
+            # Skip emails already present in the database with one query
+            new_ids = store.filter_new_ids(chunk)
+            logger.debug(f"Skipping {len(chunk) - len(new_ids)} existing emails.")
+            yield new_ids
+
+    store = EmailStore(database, commit_every=args.commit_every)
+    # 2. Get the full details for the new messages, one chunk at a time
+    failures = store_messages(gmail_client, store, new_id_chunks(), args, fetcher)
+    saved_count = store.inserted
+
+    if not found_count:
+        logger.info("No new messages to process.")
+        return failures
+
+    logger.info(f"Found {found_count} messages to process.")
+    if saved_count > 0:
+        logger.info(f"Successfully fetched and stored {saved_count} new emails.")
+    else:
+        logger.info("No new emails were stored (all were duplicates).")
+    return failures
+
+
+def full_resync(
+    gmail_client: GmailClient,
+    database: Database,
+    args: argparse.Namespace,
+    fetcher: Optional[ParallelFetcher] = None,
+) -> bool:
+    """
+    Mirror the whole mailbox when there is no usable history checkpoint.
+
+    Every message is listed, including spam and trash, whatever --query and
+    --max-results say. Missing messages are fetched and stored, stored ones
+    get their labels and read state refreshed, and stored rows no longer in
+    the mailbox are deleted.
+
+    Args:
+        gmail_client (GmailClient): The Gmail API client.
+        database (Database): The database connection manager.
+        args (argparse.Namespace): Parsed command-line arguments.
+        fetcher (Optional[ParallelFetcher]): Fetch details on worker threads.
+
+    Returns:
+        bool: True if every message was synced, so a checkpoint can be saved.
+
+    Raises:
+        HttpError: If listing the mailbox fails, before anything is deleted.
+    """
+    listed: Set[str] = set()
+    failures: Dict[str, str] = {}
+    refreshed_count = 0
+
+    def new_id_chunks() -> Iterator[List[str]]:
+        nonlocal refreshed_count
+        message_ids = gmail_client.iter_message_ids(
+            query="", include_spam_trash=True, raise_errors=True
+        )
+        for chunk in chunked(message_ids, args.batch_size):
+            listed.update(chunk)
+            new_ids = store.filter_new_ids(chunk)
+            new_set = set(new_ids)
+            stored_ids = [
+                message_id for message_id in chunk if message_id not in new_set
+            ]
+            # Metadata responses carry the labels without the bodies.
+            result = fetch_details(gmail_client, stored_ids, args, FORMAT_METADATA)
+            failures.update(result.failures)
+            with database.get_session() as session:
+                set_labels(
+                    session,
+                    {
+                        email.id: json.loads(email.labels or "[]")
+                        for email in result.emails
+                    },
+                    update_read_state=True,
+                )
+            refreshed_count += len(result.emails)
+            yield new_ids
+
+    store = EmailStore(database, commit_every=args.commit_every)
+    failures.update(store_messages(gmail_client, store, new_id_chunks(), args, fetcher))
+
+    # Listing raised on error, so every message still in the mailbox is listed.
+    with database.get_session() as session:
+        stale_ids = [
+            email_id
+            for email_id in session.scalars(select(Email.id))
+            if email_id not in listed
+        ]
+        delete_emails(session, stale_ids)
+
+    logger.info(
+        f"Full resync listed {len(listed)} messages, stored {store.inserted} new "
+        f"emails, refreshed labels on {refreshed_count} and removed "
+        f"{len(stale_ids)}."
+    )
+    return not failures
+
+
+def store_messages(
+    gmail_client: GmailClient,
+    store: EmailStore,
+    id_chunks: Iterable[List[str]],
+    args: argparse.Namespace,
+    fetcher: Optional[ParallelFetcher] = None,
+) -> Dict[str, str]:
+    """
+    Fetch chunks of new messages and store them, flushing the store at the end.
+
+    With a fetcher, chunks are fetched on its worker threads and a single
+    writer thread stores the results as they arrive.
+
+    Args:
+        gmail_client (GmailClient): The Gmail API client.
+        store (EmailStore): The email store.
+        id_chunks (Iterable[List[str]]): Chunks of IDs of messages to fetch.
+        args (argparse.Namespace): Parsed command-line arguments.
+        fetcher (Optional[ParallelFetcher]): Fetch details on worker threads.
+
+    Returns:
+        Dict[str, str]: Error message for each message that failed to fetch.
+    """
+    failures: Dict[str, str] = {}
+    if fetcher is None:
+        with store:
+            for chunk in id_chunks:
+                result = fetch_details(gmail_client, chunk, args)
+                failures.update(result.failures)
+                store.add(result.emails)
+        return failures
+
+    with EmailWriter(store) as writer:
+        for result in fetcher.fetch(id_chunks):
+            if result.failures:
+                logger.warning(f"Failed to fetch {len(result.failures)} messages.")
+                failures.update(result.failures)
+            writer.put(result.emails)
+    return failures
+
+
+async def async_full_sync(
+    credentials: Credentials, database: Database, args: argparse.Namespace
+) -> None:
+    """
+    List messages by query and store the ones missing from the database,
+    fetching their details concurrently.
+
+    Args:
+        credentials (Credentials): Google OAuth2 credentials.
+        database (Database): The database connection manager.
+        args (argparse.Namespace): Parsed command-line arguments.
+    """
+    found_count = 0
+    store = EmailStore(database, commit_every=args.commit_every)
+    async with AsyncGmailClient(
+        credentials,
+        max_concurrency=args.concurrency,
+        max_body_bytes=args.max_body_bytes or None,
+    ) as gmail_client:
+        message_ids = gmail_client.iter_message_ids(
+            query=args.query, limit=args.max_results or None
+        )
+        with store:
+            chunk: List[str] = []
+            async for message_id in message_ids:
+                chunk.append(message_id)
+                if len(chunk) == args.batch_size:
+                    found_count += len(chunk)
+                    await _store_new(gmail_client, store, chunk, args.format)
+                    chunk = []
+            found_count += len(chunk)
+            await _store_new(gmail_client, store, chunk, args.format)
+    saved_count = store.inserted
+
+    if not found_count:
+        logger.info("No new messages to process.")
+        return
+    logger.info(f"Found {found_count} messages, stored {saved_count} new emails.")
+
+
+async def _store_new(
+    gmail_client: AsyncGmailClient,
+    store: EmailStore,
+    message_ids: List[str],
+    message_format: str = FORMAT_FULL,
+) -> None:
+    """
+    Fetch the messages missing from the database concurrently and store them.
+
+    Args:
+        gmail_client (AsyncGmailClient): The async Gmail API client.
+        store (EmailStore): The email store.
+        message_ids (List[str]): IDs of listed messages.
+        message_format (str): The format to fetch the messages in.
+    """
+    new_ids = store.filter_new_ids(message_ids)
+    if not new_ids:
+        return
+    result = await gmail_client.get_messages_details(new_ids, message_format)
+    if result.failures:
+        logger.warning(
+            f"Failed to fetch {len(result.failures)} of {len(new_ids)} messages."
+        )
+    store.add(result.emails)
+
+
+def incremental_sync(
+    gmail_client: GmailClient,
+    database: Database,
+    args: argparse.Namespace,
+    fetcher: Optional[ParallelFetcher] = None,
+) -> bool:
+    """
+    Apply mailbox changes since the stored history checkpoint.
+
+    Added messages are fetched and stored, deleted messages are removed and
+    label changes are applied to stored rows. The checkpoint is advanced only
+    after all changes are committed, and kept when any added message failed
+    to fetch, so the next run retries it.
+
+    Args:
+        gmail_client (GmailClient): The Gmail API client.
+        database (Database): The database connection manager.
+        args (argparse.Namespace): Parsed command-line arguments.
+        fetcher (Optional[ParallelFetcher]): Fetch details on worker threads.
+
+    Returns:
+        bool: True if the sync completed, False if a full resync is needed
+        because there is no checkpoint or it has expired.
+
+    Raises:
+        HistoryUnavailableError: If the history could not be read for another
+            reason, such as a server, quota or network error. The checkpoint
+            is kept so the next run retries the incremental sync.
+    """
+    with database.get_session() as session:
+        state = session.get(SyncState, SYNC_ACCOUNT)
+        start_history_id = state.history_id if state else None
+
+    if not start_history_id:
+        logger.info("No sync checkpoint found.")
+        return False
+
+    try:
+        changes = gmail_client.list_history(start_history_id)
+    except HistoryExpiredError as error:
+        logger.warning(f"Sync checkpoint expired: {error}")
+        return False
+    if changes is None:
+        raise HistoryUnavailableError(
+            f"Could not read the mailbox history; keeping the sync checkpoint "
+            f"at history ID {start_history_id}."
+        )
+
+    with database.get_session() as session:
+        delete_emails(session, changes.deleted)
+
+        stored_ids: Set[str] = set()
+        for chunk in chunked(changes.label_updates, MAX_IN_PARAMS):
+            stored_ids.update(
+                session.scalars(select(Email.id).where(Email.id.in_(chunk)))
+            )
+        set_labels(
+            session,
+            {email_id: changes.label_updates[email_id] for email_id in stored_ids},
+            update_read_state=True,
+        )
+
+    new_ids = [
+        message_id for message_id in changes.added if message_id not in stored_ids
+    ]
+    store = EmailStore(database, commit_every=args.commit_every)
+    failures = store_messages(
+        gmail_client,
+        store,
+        chunked(store.filter_new_ids(new_ids), args.batch_size),
+        args,
+        fetcher,
+    )
+    saved_count = store.inserted
+
+    if failures:
+        # Replaying from the old checkpoint retries them; the rest is idempotent.
+        logger.warning(
+            f"Keeping the sync checkpoint at history ID {start_history_id}: "
+            f"{len(failures)} added messages failed to fetch and will be retried."
+        )
+        return True
+    save_checkpoint(database, changes.history_id)
+    logger.info(
+        f"Incremental sync stored {saved_count} new emails, removed "
+        f"{len(changes.deleted)} and updated labels on "
+        f"{len(stored_ids)} (history ID {changes.history_id})."
+    )
+    return True
+
+
+def save_checkpoint(database: Database, history_id: str) -> None:
+    """
+    Store the history ID the next incremental sync should start from.
+
+    Args:
+        database (Database): The database connection manager.
+        history_id (str): The mailbox history ID.
+    """
+    with database.get_session() as session:
+        session.merge(SyncState(account=SYNC_ACCOUNT, history_id=history_id))
+    logger.info(f"Saved sync checkpoint at history ID {history_id}.")
+
 
 def main():
     """
     Fetch emails from Gmail and store them in the database.
 
     - Authenticates with Gmail using OAuth2 credentials.
-    - Fetches emails matching the provided query and up to the specified max results.
-    - Skips emails already present in the database.
-    - Stores new emails in the database.
+    - Streams IDs of emails matching the provided query, page by page, up to the
+      specified max results.
+    - Skips emails already present in the database, one query per chunk.
+    - Fetches details for new emails with Gmail batch requests, one chunk at a
+      time, so details are requested before listing finishes.
+    - Bulk-inserts new emails, committing every --commit-every rows.
+    - With --workers N, fetches chunks on N threads, each with its own Gmail
+      service, while one writer thread stores the results.
+    - With --async, fetches details with concurrent requests instead.
+    - With --incremental, applies only the changes since the stored history
+      checkpoint instead, falling back to a full resync of the whole mailbox
+      when there is no checkpoint or it has expired. Other history errors
+      keep the checkpoint and exit with code 1.
 
     Exits with code 1 on error or if credentials are missing.
     """
@@ -49,10 +498,73 @@ def main():
         "--max-results",
         type=int,
         default=100,
-        help="Maximum number of emails to fetch.",
+        help="Maximum number of emails to fetch (0 for no limit).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=positive_int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Number of messages per Gmail batch request.",
+    )
+    parser.add_argument(
+        "--no-batch",
+        action="store_true",
+        help="Fetch message details one request at a time.",
+    )
+    parser.add_argument(
+        "--commit-every",
+        type=positive_int,
+        default=DEFAULT_COMMIT_EVERY,
+        help="Number of new emails to store per database commit.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Sync changes since the last checkpoint via the Gmail history API.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        default=1,
+        help="Threads fetching message details in parallel.",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Fetch message details concurrently with the asyncio client.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=positive_int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="Number of requests in flight at once with --async.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=MESSAGE_FORMATS,
+        default=FORMAT_FULL,
+        help="Fetch full messages, or headers and labels only (metadata); "
+        "bodies are then fetched by process when a rule reads them. raw "
+        "fetches the RFC 822 message and scans it in chunks, skipping "
+        "attachments.",
+    )
+    parser.add_argument(
+        "--max-body-bytes",
+        type=int,
+        default=DEFAULT_MAX_BODY_BYTES,
+        help="Truncate stored bodies to this many bytes, 0 for no limit "
+        f"(default: {DEFAULT_MAX_BODY_BYTES}).",
     )
     args = parser.parse_args()
 
+    if args.use_async and not async_client.is_available():
+        logger.warning("httpx is not installed; fetching without --async")
+        args.use_async = False
+    elif args.use_async and args.incremental:
+        logger.warning("--async is not supported with --incremental; ignoring it")
+        args.use_async = False
+
     logger.info("Starting email fetch process")
     try:
         auth = GmailAuth()
@@ -61,50 +573,58 @@ def main():
             logger.error("Failed to get credentials.")
             sys.exit(1)
 
-        gmail_client = GmailClient(credentials)
         database = Database(get_db_url())
 
         # Create tables if they don't exist
         database.create_tables()
 
-        # 1. Get the list of message IDs
-        message_list = gmail_client.list_messages(
-            query=args.query, max_results=args.max_results
-        )
-
-        if not message_list:
-            logger.info("No new messages to process.")
+        if args.use_async:
+            asyncio.run(async_full_sync(credentials, database, args))
             return
 
-        logger.info(f"Found {len(message_list)} messages to process.")
-
-        saved_count = 0
-        with database.get_session() as session:
-            for message_info in message_list:
-                message_id = message_info["id"]
-
-                # Check if email already exists in the database
-                exists = session.query(Email).filter_by(id=message_id).first()
-                if exists:
-                    logger.debug(
-                        f"Skipping already existing email with ID: {message_id}"
+        # One limiter for every client, so worker threads share the quota.
+        rate_limiter = RateLimiter(max_concurrency=args.workers)
+        max_body_bytes = args.max_body_bytes or None
+        gmail_client = GmailClient(
+            credentials, rate_limiter=rate_limiter, max_body_bytes=max_body_bytes
+        )
+        fetcher = None
+        if args.workers > 1:
+            # Each worker thread builds its own service and HTTP transport.
+            fetcher = ParallelFetcher(
+                lambda: GmailClient(
+                    credentials,
+                    rate_limiter=rate_limiter,
+                    max_body_bytes=max_body_bytes,
+                ),
+                workers=args.workers,
+                batch_size=args.batch_size,
+                use_batch=not args.no_batch,
+                message_format=args.format,
+            )
+        try:
+            if args.incremental:
+                if incremental_sync(gmail_client, database, args, fetcher):
+                    return
+                logger.info("Falling back to a full resync.")
+                # Capture the checkpoint before listing so no change is missed.
+                history_id = gmail_client.get_history_id()
+                if not full_resync(gmail_client, database, args, fetcher):
+                    logger.warning(
+                        "Some messages failed to sync; not saving a checkpoint, "
+                        "so the next run resyncs again."
                     )
-                    continue
-
-                # 2. Get the full details for each new message
-                email_details = gmail_client.get_message_details(message_id)
-
-                if email_details:
-                    session.add(email_details)
-                    saved_count += 1
-
-            if saved_count > 0:
-                logger.info(
-                    f"Successfully fetched and stored {saved_count} new emails."
-                )
+                elif history_id:
+                    save_checkpoint(database, history_id)
             else:
-                logger.info("No new emails were stored (all were duplicates).")
+                full_sync(gmail_client, database, args, fetcher)
+        finally:
+            if fetcher is not None:
+                fetcher.close()
 
+    except HistoryUnavailableError as e:
+        logger.error(f"{e} Run the sync again later.")
+        sys.exit(1)
     except Exception as e:
         logger.error(
             f"An error occurred during the email fetch process: {e}", exc_info=True
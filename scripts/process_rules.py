@@ -10,38 +10,278 @@ Usage:
 Arguments:
     --rules: Path to the rules JSON file (default: config/rules.json)
     --dry-run: If set, actions will not be executed, only logged.
+    --optimize: Evaluate cheap conditions first, refined by observed selectivity.
+    --vectorize: Evaluate rules column-wise over batches of emails with NumPy.
+    --batch-size: Emails loaded and evaluated per batch (default: 10000)
+    --full: Evaluate every email, ignoring the stored processing watermark.
+    --async: Send label changes concurrently with the asyncio client (httpx).
+    --concurrency: Requests in flight at once with --async (default: 10)
+    --create-labels: Create missing destination labels, in one batch, first.
     --log-level: Logging verbosity (DEBUG, INFO, WARNING, ERROR)
 """
 
 import argparse
+import asyncio
 import logging
 import os
 import sys
+from datetime import datetime
+from typing import List, Optional, Tuple
 
 # Add the src directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
+from google.oauth2.credentials import Credentials
+from sqlalchemy import ColumnElement
+
 from gmail_automation.auth.gmail_auth import GmailAuth
-from gmail_automation.database.connection import get_database
-from gmail_automation.database.models import Email
+from gmail_automation.database.connection import Database, get_database
+from gmail_automation.database.models import Email, RuleRunState
+from gmail_automation.database.search import has_search_index
+from gmail_automation.database.store import iter_emails, set_bodies
+from gmail_automation.gmail import async_client
+from gmail_automation.gmail.async_client import (
+    DEFAULT_MAX_CONCURRENCY,
+    AsyncGmailClient,
+)
 from gmail_automation.gmail.client import GmailClient
-from gmail_automation.rules.actions import ActionExecutor
+from gmail_automation.gmail.labels import SYSTEM_LABELS
+from gmail_automation.rules import batch
+from gmail_automation.rules.actions import ActionExecutor, ExecutionStats
 from gmail_automation.rules.engine import RuleEngine
-from gmail_automation.utils.helpers import load_env_file, setup_logging
+from gmail_automation.utils.helpers import load_env_file, positive_int, setup_logging
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_BATCH_SIZE = 10_000
+
+
+def load_watermark(database: Database, rules_hash: str) -> Optional[datetime]:
+    """
+    Get the start time of the last completed run of a rule set version.
+
+    Args:
+        database (Database): The database connection manager.
+        rules_hash (str): The rule set version, see ``RuleEngine.version()``.
+
+    Returns:
+        Optional[datetime]: The watermark, or None if these rules never ran.
+    """
+    with database.get_session() as session:
+        state = session.get(RuleRunState, rules_hash)
+        return state.watermark if state else None
+
+
+def save_watermark(database: Database, rules_hash: str, watermark: datetime) -> None:
+    """
+    Store the start time of a completed run of a rule set version.
+
+    Args:
+        database (Database): The database connection manager.
+        rules_hash (str): The rule set version, see ``RuleEngine.version()``.
+        watermark (datetime): When the run started, as naive UTC.
+    """
+    with database.get_session() as session:
+        session.merge(RuleRunState(rules_hash=rules_hash, watermark=watermark))
+    logger.info(f"Saved processing watermark {watermark.isoformat()}.")
+
+
+def rule_destinations(rule_engine: RuleEngine) -> List[str]:
+    """
+    Get the destination labels of the rules' move_message actions.
+
+    Args:
+        rule_engine (RuleEngine): The rule engine.
+
+    Returns:
+        List[str]: The distinct label names, in rule order.
+    """
+    return list(
+        dict.fromkeys(
+            action.destination
+            for rule in rule_engine.rules
+            for action in rule.actions
+            if action.type == "move_message" and action.destination
+        )
+    )
+
+
+def hydrate_bodies(
+    gmail_client: GmailClient, database: Database, emails: List[Email]
+) -> List[Email]:
+    """
+    Fetch and store the bodies of emails fetched with format=metadata.
+
+    Args:
+        gmail_client (GmailClient): The Gmail API client.
+        database (Database): The database connection manager.
+        emails (List[Email]): Loaded emails, with ``body`` and
+            ``body_fetched`` loaded.
+
+    Returns:
+        List[Email]: The emails that have their body, leaving out those whose
+        body could not be fetched.
+    """
+    missing = [email.id for email in emails if not email.body_fetched]
+    if not missing:
+        return emails
+
+    result = gmail_client.get_messages_details(missing)
+    bodies = {email.id: email.body or "" for email in result.emails}
+    with database.get_session() as session:
+        set_bodies(session, bodies)
+    for email in emails:
+        if email.id in bodies:
+            email.body = bodies[email.id]
+            email.body_fetched = True
+    logger.info(f"Fetched {len(bodies)} email bodies")
+    if result.failures:
+        logger.warning(
+            f"Skipping {len(result.failures)} emails whose body could not be fetched"
+        )
+    return [email for email in emails if email.body_fetched]
+
+
+def evaluate_and_plan(
+    rule_engine: RuleEngine,
+    database: Database,
+    action_executor: ActionExecutor,
+    candidate_filter: Optional[ColumnElement[bool]],
+    args: argparse.Namespace,
+    body_client: Optional[GmailClient] = None,
+) -> Tuple[int, int, int, int]:
+    """
+    Evaluate the candidate emails and plan their actions, or log them in a
+    dry run.
+
+    Args:
+        rule_engine (RuleEngine): The rule engine, with the run started.
+        database (Database): The database connection manager.
+        action_executor (ActionExecutor): Plans the triggered actions.
+        candidate_filter (Optional[ColumnElement[bool]]): Filter selecting the
+            emails to evaluate, or None for all.
+        args (argparse.Namespace): Parsed command-line arguments.
+        body_client (Optional[GmailClient]): Fetches missing bodies before
+            evaluation, when some rule reads the message body.
+
+    Returns:
+        Tuple[int, int, int, int]: The number of emails that triggered
+        actions, the number of actions, the number of emails skipped because
+        their body could not be fetched and the number of emails with actions
+        that could not be planned.
+    """
+    processed_count = 0
+    action_count = 0
+    loaded_count = 0
+    skipped_count = 0
+    unplanned_count = 0
+
+    for chunk in iter_emails(
+        database,
+        candidate_filter,
+        page_size=args.batch_size,
+        columns=rule_engine.referenced_fields(),
+    ):
+        loaded_count += len(chunk)
+        if body_client is not None:
+            evaluated = hydrate_bodies(body_client, database, chunk)
+            skipped_count += len(chunk) - len(evaluated)
+            chunk = evaluated
+        # Evaluate the chunk against rules
+        chunk_actions = rule_engine.evaluate_emails(chunk, vectorize=args.vectorize)
+
+        for email, actions in zip(chunk, chunk_actions):
+            if not actions:
+                continue
+
+            processed_count += 1
+            action_count += len(actions)
+
+            if args.dry_run:
+                logger.info(
+                    f"[DRY RUN] Email {email.id} would execute {len(actions)} actions"
+                )
+                for action in actions:
+                    logger.info(f"  - {action.type} {action.destination}")
+            else:
+                # Plan actions; they are applied in bulk afterwards
+                if not action_executor.plan_actions(email, actions):
+                    unplanned_count += 1
+                    logger.warning(
+                        f"Some actions could not be planned for email {email.id}"
+                    )
+
+    logger.info(f"Evaluated {loaded_count} candidate emails")
+    return processed_count, action_count, skipped_count, unplanned_count
+
+
+async def process_async(
+    credentials: Credentials,
+    database: Database,
+    rule_engine: RuleEngine,
+    candidate_filter: Optional[ColumnElement[bool]],
+    args: argparse.Namespace,
+    body_client: Optional[GmailClient] = None,
+) -> Tuple[int, int, int, int, Optional[ExecutionStats]]:
+    """
+    Evaluate and plan like the synchronous path, then send all label changes
+    concurrently through the asyncio client.
+
+    Args:
+        credentials (Credentials): Google OAuth2 credentials.
+        database (Database): The database connection manager.
+        rule_engine (RuleEngine): The rule engine, with the run started.
+        candidate_filter (Optional[ColumnElement[bool]]): Filter selecting the
+            emails to evaluate, or None for all.
+        args (argparse.Namespace): Parsed command-line arguments.
+        body_client (Optional[GmailClient]): Fetches missing bodies before
+            evaluation.
+
+    Returns:
+        Tuple[int, int, int, int, Optional[ExecutionStats]]: The email,
+        action, skipped email and unplanned email counts, and the flush
+        statistics (None in a dry run).
+    """
+    async with AsyncGmailClient(
+        credentials, max_concurrency=args.concurrency
+    ) as gmail_client:
+        # The async client resolves label IDs the same way while planning.
+        # Only user labels need the label list; system labels are their IDs.
+        if any(name not in SYSTEM_LABELS for name in rule_destinations(rule_engine)):
+            await gmail_client.load_labels()
+        action_executor = ActionExecutor(gmail_client, database)
+        counts = evaluate_and_plan(
+            rule_engine, database, action_executor, candidate_filter, args, body_client
+        )
+        if args.dry_run:
+            return (*counts, None)
+        stats = await action_executor.flush_async(gmail_client)
+    return (*counts, stats)
+
 
 def main():
     """
     Main function to process emails with rules.
 
     - Loads environment variables and sets up logging.
-    - Authenticates with Gmail and initializes the database.
+    - Authenticates with Gmail and initializes the database, creating and
+      migrating its tables.
     - Loads rules from the specified JSON file.
-    - For each email in the database:
+    - With --create-labels, creates the missing destination labels in one batch.
+    - Unless --full is given, narrows those to emails updated since the last
+      completed run of the same rules, so unchanged mailboxes are skipped.
+    - Streams only the emails some rule could match, using a SQL filter
+      translated from the rules where possible, in batches that are released
+      once evaluated. Only the columns the rules reference are loaded.
+    - If a rule reads the message body, fetches and stores the bodies of
+      emails that were fetched with --format metadata.
+    - For each loaded email:
         - Evaluates the email against all rules.
-        - If any actions are triggered, either logs them (dry run) or executes them.
+        - If any actions are triggered, either logs them (dry run) or plans them.
+    - Applies all planned label changes in bulk, grouping emails that share the
+      same change into batchModify calls, sent concurrently with --async.
+    - Records the run's start time as the watermark for the next run, unless
+      some emails were skipped, could not be planned or failed to update.
     - Logs a summary of processed emails and actions.
     """
     parser = argparse.ArgumentParser(description="Process emails with rules")
@@ -55,6 +295,44 @@ def main():
         action="store_true",
         help="Show what would be done without executing actions",
     )
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="Order rule conditions by observed cost and selectivity",
+    )
+    parser.add_argument(
+        "--vectorize",
+        action="store_true",
+        help="Evaluate rules over batches of emails with NumPy",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=positive_int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Emails loaded and evaluated per batch (default: 10000)",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Evaluate all emails, not only those changed since the last run",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Send label changes concurrently with the asyncio client",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=positive_int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help="Requests in flight at once with --async (default: 10)",
+    )
+    parser.add_argument(
+        "--create-labels",
+        action="store_true",
+        help="Create missing move_message destination labels before processing",
+    )
     parser.add_argument(
         "--log-level",
         default="INFO",
@@ -68,6 +346,13 @@ def main():
     load_env_file()
     setup_logging(args.log_level)
 
+    if args.vectorize and not batch.is_available():
+        logger.warning("NumPy is not installed; evaluating emails one at a time")
+        args.vectorize = False
+    if args.use_async and not async_client.is_available():
+        logger.warning("httpx is not installed; sending label changes without --async")
+        args.use_async = False
+
     try:
         logger.info("Starting rule processing")
 
@@ -79,52 +364,89 @@ def main():
             logger.error("Failed to get Gmail credentials")
             return
 
-        gmail_client = GmailClient(credentials)
         database = get_database()
-        rule_engine = RuleEngine(args.rules)
-        action_executor = ActionExecutor(gmail_client, database)
+        # Create tables and indexes added since the database was created
+        database.create_tables()
+        rule_engine = RuleEngine(args.rules, optimize=args.optimize)
+        # Resolve relative dates once so they do not drift during the run
+        run = rule_engine.start_run()
+        rules_hash = rule_engine.version()
+        watermark = None if args.full else load_watermark(database, rules_hash)
 
-        # Get all emails from database
-        with database.get_session() as session:
-            emails = session.query(Email).all()
-            logger.info(f"Processing {len(emails)} emails")
-
-            processed_count = 0
-            action_count = 0
-
-            for email in emails:
-                # Evaluate email against rules
-                actions = rule_engine.evaluate_email(email)
-
-                if actions:
-                    processed_count += 1
-                    action_count += len(actions)
-
-                    if args.dry_run:
-                        logger.info(
-                            f"[DRY RUN] Email {email.id} would execute "
-                            f"{len(actions)} actions"
-                        )
-                        for action in actions:
-                            logger.info(f"  - {action.type} {action.destination}")
-                    else:
-                        # Execute actions
-                        success = action_executor.execute_actions(email, actions)
-                        if success:
-                            logger.info(f"Successfully processed email {email.id}")
-                        else:
-                            logger.warning(f"Some actions failed for email {email.id}")
+        # Get the emails some rule could match from the database
+        candidate_filter = rule_engine.sql_filter(
+            full_text=has_search_index(database.engine)
+        )
+        if watermark is not None:
+            logger.info(f"Evaluating emails changed since {watermark.isoformat()}")
+            changed = rule_engine.changed_filter(watermark)
+            candidate_filter = (
+                changed if candidate_filter is None else candidate_filter & changed
+            )
 
-            if args.dry_run:
-                logger.info(
-                    f"[DRY RUN] Would process {processed_count} emails with "
-                    f"{action_count} total actions"
+        # Labels are looked up lazily and cached in the database between runs
+        gmail_client = GmailClient(credentials, database=database)
+        if args.create_labels and not args.dry_run:
+            gmail_client.labels.ensure(rule_destinations(rule_engine))
+
+        needs_bodies = "body" in rule_engine.referenced_fields()
+        body_client = gmail_client if needs_bodies else None
+        if args.use_async:
+            (
+                processed_count,
+                action_count,
+                skipped_count,
+                unplanned_count,
+                stats,
+            ) = asyncio.run(
+                process_async(
+                    credentials,
+                    database,
+                    rule_engine,
+                    candidate_filter,
+                    args,
+                    body_client,
                 )
+            )
+        else:
+            action_executor = ActionExecutor(gmail_client, database)
+            (
+                processed_count,
+                action_count,
+                skipped_count,
+                unplanned_count,
+            ) = evaluate_and_plan(
+                rule_engine,
+                database,
+                action_executor,
+                candidate_filter,
+                args,
+                body_client,
+            )
+            stats = None if args.dry_run else action_executor.flush()
+
+        if stats is not None:
+            if skipped_count:
+                # Keep the old watermark so skipped emails are evaluated later
+                logger.warning(f"Skipped {skipped_count} emails without a body")
+            elif unplanned_count:
+                # Keep the old watermark so the actions are planned again later
+                logger.warning(f"Could not plan actions for {unplanned_count} emails")
+            elif stats.emails_failed:
+                # Keep the old watermark so failed emails are retried
+                logger.warning(f"Actions failed for {stats.emails_failed} emails")
             else:
-                logger.info(
-                    f"Processed {processed_count} emails with "
-                    f"{action_count} total actions"
-                )
+                save_watermark(database, rules_hash, run.now)
+
+        if args.dry_run:
+            logger.info(
+                f"[DRY RUN] Would process {processed_count} emails with "
+                f"{action_count} total actions"
+            )
+        else:
+            logger.info(
+                f"Processed {processed_count} emails with {action_count} total actions"
+            )
 
     except Exception as e:
         logger.error(f"Error during rule processing: {e}", exc_info=True)
@@ -0,0 +1,89 @@
+"""Script to search stored emails with the full-text index.
+
+This script looks up emails whose subject, body or sender contains the given
+text, using the SQLite FTS5 index maintained alongside the emails table, and
+prints the newest matches.
+
+Usage:
+    python search_emails.py "invoice" --limit 20
+
+Arguments:
+    query: Text to find, at least three characters long.
+    --limit: Maximum number of emails to show (default: 20)
+    --field: Only search one field: subject, body or sender.
+    --raw: Treat the query as an FTS5 query expression (e.g. 'invoice AND paid').
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# Add the src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy.exc import OperationalError
+
+from gmail_automation.database.connection import Database, get_db_url
+from gmail_automation.database.search import (
+    FTS_COLUMNS,
+    MIN_FTS_QUERY_LENGTH,
+    has_search_index,
+    search_emails,
+)
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """
+    Search stored emails and print the matches, newest first.
+
+    Exits with code 1 if the full-text index is unavailable or the query is
+    invalid.
+    """
+    parser = argparse.ArgumentParser(description="Search stored emails.")
+    parser.add_argument("query", help="Text to search for.")
+    parser.add_argument(
+        "--limit", type=int, default=20, help="Maximum number of results."
+    )
+    parser.add_argument("--field", choices=FTS_COLUMNS, help="Only search one field.")
+    parser.add_argument(
+        "--raw", action="store_true", help="Treat the query as an FTS5 expression."
+    )
+    args = parser.parse_args()
+
+    if not args.raw and len(args.query) < MIN_FTS_QUERY_LENGTH:
+        logger.error(
+            f"Search text must be at least {MIN_FTS_QUERY_LENGTH} characters long."
+        )
+        sys.exit(1)
+
+    database = Database(get_db_url())
+    # Create tables, and the search index over any emails already stored
+    database.create_tables()
+    if not has_search_index(database.engine):
+        logger.error("Full-text search requires a SQLite database with FTS5.")
+        sys.exit(1)
+
+    try:
+        with database.get_session() as session:
+            emails = search_emails(
+                session, args.query, args.limit, attribute=args.field, raw=args.raw
+            )
+            for email in emails:
+                print(
+                    f"{email.received_at}  {email.id}  {email.sender}  {email.subject}"
+                )
+    except OperationalError as e:
+        logger.error(f"Invalid search query: {e.orig}")
+        sys.exit(1)
+
+    logger.info(f"Found {len(emails)} matching emails.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 """
 Script to set up the database schema for the Gmail automation project.
 
-This script creates all tables defined in the SQLAlchemy models.
+This script creates all tables defined in the SQLAlchemy models. Running it
+against an existing database adds missing indexes and backfills the
+email_labels table.
 Usage:
     python setup_db.py <database_url>
 
@@ -11,20 +13,18 @@ Arguments:
 
 import sys
 
-from sqlalchemy import create_engine
-
-from gmail_automation.database.models import Base
+from gmail_automation.database.connection import Database
 
 
 def setup_database(db_url: str):
     """
-    Create all tables in the database as defined by the SQLAlchemy models.
+    Create all tables in the database as defined by the SQLAlchemy models, and
+    migrate a database created by an older version.
 
     Args:
         db_url (str): SQLAlchemy database URL.
     """
-    engine = create_engine(db_url)
-    Base.metadata.create_all(engine)
+    Database(db_url).create_tables()
     print("Database setup complete.")
 
 
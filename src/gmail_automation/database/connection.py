@@ -1,13 +1,27 @@
 """Database connection and session management."""
 
+import json
+import logging
 import os
 from contextlib import contextmanager
 from typing import Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import Connection, create_engine, insert, inspect, select, text
 from sqlalchemy.orm import Session, sessionmaker
 
-from .models import Base
+from .models import Base, Email, EmailLabel
+from .search import create_search_index
+
+logger = logging.getLogger(__name__)
+
+# Emails read per chunk while backfilling the email_labels table.
+BACKFILL_CHUNK_SIZE = 1000
+
+# Indexes replaced by newer ones, per table, dropped from existing databases.
+OBSOLETE_INDEXES = {
+    # Superseded by the composite ix_emails_received_at_id.
+    "emails": frozenset({"ix_emails_received_at"}),
+}
 
 
 def get_db_url() -> str:
@@ -38,9 +52,103 @@ class Database:
 
     def create_tables(self) -> None:
         """
-        Create all database tables.
+        Create all database tables, migrate existing ones, and create the
+        full-text search index on SQLite.
         """
         Base.metadata.create_all(bind=self.engine)
+        self.migrate()
+        create_search_index(self.engine)
+
+    def migrate(self) -> None:
+        """
+        Bring a database created by an older version up to date.
+
+        ``create_all`` only creates missing tables, so columns and indexes
+        added to existing tables are created here, indexes that newer ones
+        replaced are dropped, and the email_labels table is backfilled from
+        the ``labels`` JSON column when it is empty. Safe to run repeatedly.
+        """
+        with self.engine.begin() as connection:
+            self._add_missing_columns(connection)
+            self._drop_obsolete_indexes(connection)
+
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=self.engine, checkfirst=True)
+
+        with self.engine.begin() as connection:
+            if connection.scalar(select(EmailLabel.email_id).limit(1)) is not None:
+                return
+            result = connection.execution_options(
+                yield_per=BACKFILL_CHUNK_SIZE
+            ).execute(select(Email.id, Email.labels).where(Email.labels.is_not(None)))
+            backfilled = 0
+            for partition in result.partitions():
+                rows = [
+                    {"email_id": email_id, "label_id": label_id}
+                    for email_id, labels in partition
+                    for label_id in dict.fromkeys(json.loads(labels or "[]"))
+                ]
+                if rows:
+                    connection.execute(insert(EmailLabel), rows)
+                    backfilled += len(rows)
+        if backfilled:
+            logger.info(f"Backfilled {backfilled} email labels.")
+
+    def _add_missing_columns(self, connection: Connection) -> None:
+        """
+        Add model columns missing from existing tables.
+
+        New columns must be nullable or have a server default, so existing
+        rows get a value.
+
+        Args:
+            connection (Connection): The connection to migrate with.
+        """
+        inspector = inspect(connection)
+        dialect = connection.dialect
+        preparer = dialect.identifier_preparer
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                definition = (
+                    f"{preparer.format_column(column)} "
+                    f"{column.type.compile(dialect=dialect)}"
+                )
+                default = column.server_default
+                if default is not None:
+                    value = default.arg.compile(dialect=dialect)  # type: ignore[attr-defined]
+                    definition += f" DEFAULT {value}"
+                if not column.nullable:
+                    definition += " NOT NULL"
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {preparer.format_table(table)} "
+                        f"ADD COLUMN {definition}"
+                    )
+                )
+                logger.info(f"Added column {table.name}.{column.name}.")
+
+    def _drop_obsolete_indexes(self, connection: Connection) -> None:
+        """
+        Drop indexes listed in ``OBSOLETE_INDEXES`` that still exist.
+
+        Args:
+            connection (Connection): The connection to migrate with.
+        """
+        inspector = inspect(connection)
+        preparer = connection.dialect.identifier_preparer
+        for table_name, names in OBSOLETE_INDEXES.items():
+            if not inspector.has_table(table_name):
+                continue
+            for index in inspector.get_indexes(table_name):
+                if index["name"] in names:
+                    connection.execute(
+                        text(f"DROP INDEX {preparer.quote(index['name'])}")
+                    )
+                    logger.info(f"Dropped obsolete index {index['name']}.")
 
     @contextmanager
     def get_session(self) -> Generator[Session, None, None]:
@@ -4,7 +4,17 @@ import json
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import Boolean, DateTime, String, Text
+from sqlalchemy import (
+    Boolean,
+    ColumnElement,
+    DateTime,
+    ForeignKey,
+    Index,
+    String,
+    Text,
+    select,
+    true,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -18,23 +28,34 @@ class Email(Base):
     """Email model for storing Gmail messages."""
 
     __tablename__ = "emails"
+    # Serves received_at range filters and keyset pagination in received order.
+    __table_args__ = (Index("ix_emails_received_at_id", "received_at", "id"),)
 
     id: Mapped[str] = mapped_column(String(50), primary_key=True)
-    thread_id: Mapped[str] = mapped_column(String(50), nullable=False)
+    thread_id: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
     message_id: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
-    sender: Mapped[str] = mapped_column(String(255), nullable=False)
+    sender: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
     recipient: Mapped[Optional[str]] = mapped_column(String(255))
     subject: Mapped[Optional[str]] = mapped_column(String(500))
     body: Mapped[Optional[str]] = mapped_column(Text)
+    # False for emails fetched with format=metadata until their body is fetched
+    body_fetched: Mapped[bool] = mapped_column(
+        Boolean, default=True, server_default=true(), nullable=False
+    )
     received_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
-    is_read: Mapped[bool] = mapped_column(Boolean, default=False)
-    labels: Mapped[Optional[str]] = mapped_column(Text)  # Storing as a JSON string
+    is_read: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
+    # JSON list of label IDs, kept as a denormalized copy of email_labels
+    labels: Mapped[Optional[str]] = mapped_column(Text)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, nullable=False
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+        index=True,
     )
 
     def __repr__(self) -> str:
@@ -50,9 +71,119 @@ class Email(Base):
         """
         Returns the labels from the JSON string.
 
+        The parsed list is cached until ``labels`` changes.
+
         Returns:
             List[str]: List of label names or IDs.
         """
-        if self.labels:
-            return json.loads(self.labels)
-        return []
+        if not self.labels:
+            return []
+        cached = self.__dict__.get("_parsed_labels")
+        if cached is None or cached[0] != self.labels:
+            cached = (self.labels, json.loads(self.labels))
+            self.__dict__["_parsed_labels"] = cached
+        return list(cached[1])
+
+    @staticmethod
+    def has_label(label_id: str) -> ColumnElement[bool]:
+        """
+        Build a filter selecting emails with a label, via the email_labels index.
+
+        Args:
+            label_id (str): The Gmail label ID.
+
+        Returns:
+            ColumnElement[bool]: The filter.
+        """
+        return Email.id.in_(
+            select(EmailLabel.email_id).where(EmailLabel.label_id == label_id)
+        )
+
+
+class EmailLabel(Base):
+    """Association between an email and one of its Gmail label IDs."""
+
+    __tablename__ = "email_labels"
+    __table_args__ = (Index("ix_email_labels_label_id", "label_id", "email_id"),)
+
+    email_id: Mapped[str] = mapped_column(
+        String(50), ForeignKey("emails.id", ondelete="CASCADE"), primary_key=True
+    )
+    label_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+
+    def __repr__(self) -> str:
+        """
+        String representation of the EmailLabel object.
+
+        Returns:
+            str: Readable representation with email and label IDs.
+        """
+        return f"<EmailLabel(email_id='{self.email_id}', label_id='{self.label_id}')>"
+
+
+class SyncState(Base):
+    """Incremental sync checkpoint for a Gmail account."""
+
+    __tablename__ = "sync_state"
+
+    account: Mapped[str] = mapped_column(String(255), primary_key=True)
+    history_id: Mapped[str] = mapped_column(String(50), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    def __repr__(self) -> str:
+        """
+        String representation of the SyncState object.
+
+        Returns:
+            str: Readable representation with account and history ID.
+        """
+        return f"<SyncState(account='{self.account}', history_id='{self.history_id}')>"
+
+
+class RuleRunState(Base):
+    """Processing watermark for one version of the rule set."""
+
+    __tablename__ = "rule_run_state"
+
+    # SHA-256 of the rule definitions, see RuleEngine.version()
+    rules_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # Emails updated after this time have not been evaluated by these rules
+    watermark: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    def __repr__(self) -> str:
+        """
+        String representation of the RuleRunState object.
+
+        Returns:
+            str: Readable representation with rules hash and watermark.
+        """
+        return (
+            f"<RuleRunState(rules_hash='{self.rules_hash}', "
+            f"watermark='{self.watermark}')>"
+        )
+
+
+class Label(Base):
+    """Cached Gmail label, see gmail.labels.LabelRegistry."""
+
+    __tablename__ = "labels"
+
+    id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    name: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
+    # "system" or "user"
+    type: Mapped[Optional[str]] = mapped_column(String(20))
+    fetched_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        """
+        String representation of the Label object.
+
+        Returns:
+            str: Readable representation with ID and name.
+        """
+        return f"<Label(id='{self.id}', name='{self.name}')>"
@@ -0,0 +1,209 @@
+"""Full-text search over stored emails with SQLite FTS5."""
+
+import logging
+from typing import List, Optional
+
+from sqlalchemy import (
+    ColumnElement,
+    Engine,
+    column,
+    inspect,
+    literal,
+    literal_column,
+    select,
+    table,
+)
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from .models import Email
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "emails_fts"
+
+# Email attributes indexed by the full-text table.
+FTS_COLUMNS = ("subject", "body", "sender")
+
+# The trigram tokenizer cannot look up shorter substrings.
+MIN_FTS_QUERY_LENGTH = 3
+
+# External-content table: the text stays in "emails" and the index is keyed by
+# its implicit rowid, kept in sync by triggers. The trigram tokenizer makes any
+# substring of three or more characters searchable, case-insensitively.
+FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        subject, body, sender,
+        content='emails', content_rowid='rowid', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON emails BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, subject, body, sender)
+        VALUES (new.rowid, new.subject, new.body, new.sender);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON emails BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, subject, body, sender)
+        VALUES ('delete', old.rowid, old.subject, old.body, old.sender);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF subject, body, sender ON emails
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, subject, body, sender)
+        VALUES ('delete', old.rowid, old.subject, old.body, old.sender);
+        INSERT INTO {FTS_TABLE}(rowid, subject, body, sender)
+        VALUES (new.rowid, new.subject, new.body, new.sender);
+    END
+    """,
+]
+
+_fts = table(FTS_TABLE, column("rowid"))
+
+
+def create_search_index(engine: Engine) -> bool:
+    """
+    Create the full-text index and its sync triggers if they do not exist.
+
+    Only SQLite is supported, and the emails table must exist. A newly
+    created index is populated from the
+    emails already stored. SQLite's VACUUM may renumber the rowids the index
+    is keyed by, so call :func:`rebuild_search_index` after vacuuming.
+
+    Args:
+        engine (Engine): The database engine.
+
+    Returns:
+        bool: True if the index exists afterwards.
+    """
+    if engine.dialect.name != "sqlite" or not inspect(engine).has_table("emails"):
+        return False
+    if has_search_index(engine):
+        return True
+
+    try:
+        with engine.begin() as connection:
+            for statement in FTS_DDL:
+                connection.exec_driver_sql(statement)
+    except OperationalError as e:
+        logger.warning(f"Full-text search is unavailable: {e}")
+        # SQLite may have committed part of the DDL; don't leave an index
+        # without its sync triggers behind.
+        with engine.begin() as connection:
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        return False
+    rebuild_search_index(engine)
+    return True
+
+
+def rebuild_search_index(engine: Engine) -> None:
+    """
+    Re-index every stored email.
+
+    Args:
+        engine (Engine): The database engine.
+    """
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+    logger.info("Rebuilt the full-text search index.")
+
+
+def has_search_index(engine: Engine) -> bool:
+    """
+    Check whether the full-text index exists.
+
+    Args:
+        engine (Engine): The database engine.
+
+    Returns:
+        bool: True if the index table exists.
+    """
+    return engine.dialect.name == "sqlite" and inspect(engine).has_table(FTS_TABLE)
+
+
+def phrase_query(value: str, attribute: Optional[str] = None) -> str:
+    """
+    Build an FTS5 query matching a literal substring.
+
+    Args:
+        value (str): The text to find.
+        attribute (Optional[str]): Restrict the match to one indexed column.
+
+    Returns:
+        str: The FTS5 query.
+    """
+    phrase = '"' + value.replace('"', '""') + '"'
+    if attribute is None:
+        return phrase
+    return f"{{{attribute}}} : {phrase}"
+
+
+def contains_filter(attribute: str, value: str) -> Optional[ColumnElement[bool]]:
+    """
+    Build a filter selecting emails whose field contains a substring, using
+    the full-text index.
+
+    Args:
+        attribute (str): An indexed Email attribute.
+        value (str): The substring to find.
+
+    Returns:
+        Optional[ColumnElement[bool]]: The filter, or None if the index
+        cannot answer the lookup.
+    """
+    if attribute not in FTS_COLUMNS or len(value) < MIN_FTS_QUERY_LENGTH:
+        return None
+    return _matching(phrase_query(value, attribute))
+
+
+def search_emails(
+    session: Session,
+    query: str,
+    limit: int = 20,
+    attribute: Optional[str] = None,
+    raw: bool = False,
+) -> List[Email]:
+    """
+    Find stored emails containing a substring, newest first.
+
+    Args:
+        session (Session): The database session.
+        query (str): The text to find, at least three characters long.
+        limit (int): Maximum number of emails to return.
+        attribute (Optional[str]): Only search this indexed column.
+        raw (bool): Treat ``query`` as an FTS5 query expression instead of a
+            literal substring.
+
+    Returns:
+        List[Email]: The matching emails.
+    """
+    if raw:
+        expression = query if attribute is None else f"{{{attribute}}} : ({query})"
+    else:
+        expression = phrase_query(query, attribute)
+    statement = (
+        select(Email)
+        .where(_matching(expression))
+        .order_by(Email.received_at.desc())
+        .limit(limit)
+    )
+    return list(session.scalars(statement))
+
+
+def _matching(expression: str) -> ColumnElement[bool]:
+    """
+    Build a filter selecting emails the index matches for an FTS5 query.
+
+    Args:
+        expression (str): The FTS5 query.
+
+    Returns:
+        ColumnElement[bool]: The filter.
+    """
+    match = literal_column(FTS_TABLE).op("MATCH")(literal(expression))
+    return literal_column("emails.rowid").in_(select(_fts.c.rowid).where(match))
@@ -0,0 +1,453 @@
+"""Bulk email storage and retrieval."""
+
+import json
+import logging
+import queue
+import threading
+from datetime import datetime
+from types import TracebackType
+from typing import (
+    Any,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Type,
+    Union,
+)
+
+from sqlalchemy import (
+    ColumnElement,
+    Connection,
+    Insert,
+    bindparam,
+    delete,
+    insert,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, load_only
+
+from ..utils.helpers import chunked
+from .connection import Database
+from .models import Email, EmailLabel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMMIT_EVERY = 500
+
+# Keep IN (...) lists below SQLite's default bound-parameter limit.
+MAX_IN_PARAMS = 900
+
+# Emails loaded per page by iter_emails.
+DEFAULT_PAGE_SIZE = 1000
+
+# Columns iter_emails always loads: the keyset and the state actions update.
+_REQUIRED_COLUMNS = ("id", "received_at", "is_read", "labels", "body_fetched")
+
+_EMAILS = Email.metadata.tables[Email.__tablename__]
+
+_EMAIL_COLUMNS = [
+    column.key
+    for column in Email.__table__.columns
+    if column.key not in ("created_at", "updated_at")
+]
+
+# Scalar column defaults, applied to unset attributes like an ORM flush would.
+_EMAIL_DEFAULTS = {
+    column.key: column.default.arg
+    for column in Email.__table__.columns
+    if column.key in _EMAIL_COLUMNS
+    and column.default is not None
+    and column.default.is_scalar
+}
+
+
+class EmailStore:
+    """Deduplicate and bulk-insert fetched emails, committing in chunks.
+
+    Emails passed to :meth:`add` are buffered and written with a single Core
+    ``INSERT`` per chunk of ``commit_every`` rows, each in its own transaction,
+    so a crash mid-run only loses the current chunk. On SQLite and PostgreSQL
+    rows that already exist are skipped with ``ON CONFLICT DO NOTHING``.
+
+    Can be used as a context manager, which flushes pending rows on exit.
+    """
+
+    def __init__(self, database: Database, commit_every: int = DEFAULT_COMMIT_EVERY):
+        """
+        Initialize the EmailStore.
+
+        Args:
+            database (Database): The database connection manager.
+            commit_every (int): Number of rows to buffer before committing.
+        """
+        self.engine = database.engine
+        self.commit_every = max(1, commit_every)
+        self.inserted = 0
+        self._pending: Dict[str, Dict[str, Any]] = {}
+
+    def __enter__(self) -> "EmailStore":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            self.flush()
+
+    def existing_ids(self, message_ids: Iterable[str]) -> Set[str]:
+        """
+        Find which message IDs are already stored, with one query per chunk.
+
+        Args:
+            message_ids (Iterable[str]): Gmail message IDs to check.
+
+        Returns:
+            Set[str]: The IDs that already exist in the database.
+        """
+        ids = list(message_ids)
+        found: Set[str] = set()
+        with self.engine.connect() as connection:
+            for start in range(0, len(ids), MAX_IN_PARAMS):
+                chunk = ids[start : start + MAX_IN_PARAMS]
+                found.update(
+                    connection.scalars(select(Email.id).where(Email.id.in_(chunk)))
+                )
+        return found
+
+    def filter_new_ids(self, message_ids: Iterable[str]) -> List[str]:
+        """
+        Drop message IDs that are already stored or waiting to be written.
+
+        Args:
+            message_ids (Iterable[str]): Gmail message IDs to check.
+
+        Returns:
+            List[str]: IDs that still need to be fetched, in input order.
+        """
+        ids = [
+            message_id for message_id in message_ids if message_id not in self._pending
+        ]
+        existing = self.existing_ids(ids)
+        return [message_id for message_id in ids if message_id not in existing]
+
+    def add(self, emails: Iterable[Email]) -> None:
+        """
+        Buffer emails for insertion, committing whenever a chunk is full.
+
+        Args:
+            emails (Iterable[Email]): Parsed emails to store.
+        """
+        for email in emails:
+            row = {key: getattr(email, key) for key in _EMAIL_COLUMNS}
+            for key, default in _EMAIL_DEFAULTS.items():
+                if row[key] is None:
+                    row[key] = default
+            self._pending[email.id] = row
+            if len(self._pending) >= self.commit_every:
+                self.flush()
+
+    def flush(self) -> int:
+        """
+        Write all buffered emails in a single transaction.
+
+        Returns:
+            int: Number of rows actually inserted.
+        """
+        if not self._pending:
+            return 0
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                **row,
+                "is_read": bool(row["is_read"]),
+                "created_at": now,
+                "updated_at": now,
+            }
+            for row in self._pending.values()
+        ]
+        self._pending.clear()
+
+        dialect = self.engine.dialect.name
+        statement: Insert
+        if dialect == "sqlite":
+            statement = sqlite.insert(Email).on_conflict_do_nothing()
+        elif dialect == "postgresql":
+            statement = postgresql.insert(Email).on_conflict_do_nothing()
+        else:
+            existing = self.existing_ids(row["id"] for row in rows)
+            rows = [row for row in rows if row["id"] not in existing]
+            statement = insert(Email)
+
+        if not rows:
+            return 0
+        with self.engine.begin() as connection:
+            if dialect in ("sqlite", "postgresql"):
+                # Skipped conflicts are not returned, so only new rows get labels.
+                result = connection.execute(statement.returning(Email.id), rows)
+                inserted_ids = set(result.scalars())
+            else:
+                connection.execute(statement, rows)
+                inserted_ids = {row["id"] for row in rows}
+            _insert_label_rows(
+                connection,
+                {
+                    row["id"]: json.loads(row["labels"]) if row["labels"] else []
+                    for row in rows
+                    if row["id"] in inserted_ids
+                },
+            )
+
+        self.inserted += len(inserted_ids)
+        logger.debug(f"Committed {len(inserted_ids)} new emails.")
+        return len(inserted_ids)
+
+
+class EmailWriter:
+    """Drain emails into an :class:`EmailStore` from one background thread.
+
+    Lets fetch workers hand off parsed emails without waiting for the
+    database: :meth:`put` queues a batch and returns, and a single writer
+    thread adds the batches to the store in order, so the store and its
+    database connection are only ever written from that thread. At most
+    ``max_pending`` batches are queued before :meth:`put` blocks.
+
+    Used as a context manager: entering starts the thread, and exiting waits
+    for every queued batch and flushes the store. An error raised by the
+    store is re-raised from :meth:`put` or on exit.
+    """
+
+    def __init__(self, store: EmailStore, max_pending: int = 16):
+        """
+        Initialize the writer.
+
+        Args:
+            store (EmailStore): The store to write to.
+            max_pending (int): Batches queued before :meth:`put` blocks.
+        """
+        self.store = store
+        self._queue: "queue.Queue[Optional[List[Email]]]" = queue.Queue(
+            maxsize=max(1, max_pending)
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="email-writer", daemon=True
+        )
+        self._error: Optional[BaseException] = None
+
+    def __enter__(self) -> "EmailWriter":
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        if exc_type is None:
+            self._raise_error()
+
+    def put(self, emails: List[Email]) -> None:
+        """
+        Queue a batch of emails to be stored.
+
+        Args:
+            emails (List[Email]): Parsed emails.
+        """
+        self._raise_error()
+        if emails:
+            self._queue.put(emails)
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError("Storing fetched emails failed") from self._error
+
+    def _run(self) -> None:
+        """Add queued batches to the store until the end marker arrives."""
+        while True:
+            emails = self._queue.get()
+            if emails is None:
+                break
+            # After an error, keep draining so producers never block.
+            if self._error is None:
+                try:
+                    self.store.add(emails)
+                except Exception as error:
+                    logger.error(f"Failed to store fetched emails: {error}")
+                    self._error = error
+        if self._error is None:
+            try:
+                self.store.flush()
+            except Exception as error:
+                logger.error(f"Failed to store fetched emails: {error}")
+                self._error = error
+
+
+def iter_emails(
+    database: Database,
+    criterion: Optional[ColumnElement[bool]] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    columns: Optional[Collection[str]] = None,
+) -> Iterator[List[Email]]:
+    """
+    Stream stored emails in pages ordered by ``(received_at, id)``.
+
+    Each page is read with keyset pagination in its own short session and
+    yielded detached, so memory is bounded by the page size rather than the
+    mailbox and no read transaction stays open while the caller works.
+
+    Args:
+        database (Database): The database to read from.
+        criterion (Optional[ColumnElement[bool]]): Only yield emails matching
+            this filter.
+        page_size (int): Emails per page.
+        columns (Optional[Collection[str]]): Only load these Email attributes,
+            plus the ID, received date, read state and labels. Accessing any
+            other attribute on a yielded email raises. Defaults to all.
+
+    Yields:
+        List[Email]: The next page of detached emails.
+    """
+    statement = select(Email).order_by(Email.received_at, Email.id).limit(page_size)
+    if criterion is not None:
+        statement = statement.where(criterion)
+    if columns is not None:
+        names = dict.fromkeys((*_REQUIRED_COLUMNS, *columns))
+        statement = statement.options(
+            load_only(*(getattr(Email, name) for name in names), raiseload=True)
+        )
+
+    last = None
+    while True:
+        page_statement = statement
+        if last is not None:
+            page_statement = statement.where(
+                tuple_(Email.received_at, Email.id) > tuple_(*last)
+            )
+        with database.get_session() as session:
+            page = list(session.scalars(page_statement))
+            session.expunge_all()
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        last = (page[-1].received_at, page[-1].id)
+
+
+def set_labels(
+    executor: Union[Session, Connection],
+    labels_by_id: Mapping[str, Sequence[str]],
+    update_read_state: bool = False,
+) -> None:
+    """
+    Replace the labels of stored emails, keeping the ``labels`` JSON column
+    and the email_labels table in sync.
+
+    Args:
+        executor (Union[Session, Connection]): The session or connection to
+            write with, inside the caller's transaction.
+        labels_by_id (Mapping[str, Sequence[str]]): New label IDs per email ID.
+        update_read_state (bool): Also set ``is_read`` from the UNREAD label.
+    """
+    if not labels_by_id:
+        return
+    for chunk in chunked(labels_by_id, MAX_IN_PARAMS):
+        executor.execute(delete(EmailLabel).where(EmailLabel.email_id.in_(chunk)))
+    _insert_label_rows(executor, labels_by_id)
+
+    values: Dict[str, Any] = {"labels": bindparam("new_labels")}
+    if update_read_state:
+        values["is_read"] = bindparam("new_is_read")
+    executor.execute(
+        update(_EMAILS).where(_EMAILS.c.id == bindparam("email_id")).values(**values),
+        [
+            {
+                "email_id": email_id,
+                "new_labels": json.dumps(list(label_ids)),
+                "new_is_read": "UNREAD" not in label_ids,
+            }
+            for email_id, label_ids in labels_by_id.items()
+        ],
+    )
+
+
+def set_bodies(
+    executor: Union[Session, Connection], bodies_by_id: Mapping[str, str]
+) -> None:
+    """
+    Store the bodies of emails fetched without one and mark them fetched.
+
+    ``updated_at`` is left unchanged: the message itself did not change, so
+    rules that already evaluated the email need not evaluate it again.
+
+    Args:
+        executor (Union[Session, Connection]): The session or connection to
+            write with, inside the caller's transaction.
+        bodies_by_id (Mapping[str, str]): Body per email ID.
+    """
+    if not bodies_by_id:
+        return
+    executor.execute(
+        update(_EMAILS)
+        .where(_EMAILS.c.id == bindparam("email_id"))
+        .values(
+            body=bindparam("new_body"),
+            body_fetched=True,
+            updated_at=_EMAILS.c.updated_at,
+        ),
+        [
+            {"email_id": email_id, "new_body": body}
+            for email_id, body in bodies_by_id.items()
+        ],
+    )
+
+
+def delete_emails(
+    executor: Union[Session, Connection], email_ids: Iterable[str]
+) -> None:
+    """
+    Delete stored emails and their label rows.
+
+    Args:
+        executor (Union[Session, Connection]): The session or connection to
+            write with, inside the caller's transaction.
+        email_ids (Iterable[str]): IDs of the emails to delete.
+    """
+    for chunk in chunked(email_ids, MAX_IN_PARAMS):
+        executor.execute(delete(EmailLabel).where(EmailLabel.email_id.in_(chunk)))
+        executor.execute(delete(Email).where(Email.id.in_(chunk)))
+
+
+def _insert_label_rows(
+    executor: Union[Session, Connection], labels_by_id: Mapping[str, Sequence[str]]
+) -> None:
+    """
+    Insert email_labels rows for emails that have none yet.
+
+    Args:
+        executor (Union[Session, Connection]): The session or connection to
+            write with.
+        labels_by_id (Mapping[str, Sequence[str]]): Label IDs per email ID.
+    """
+    rows = [
+        {"email_id": email_id, "label_id": label_id}
+        for email_id, label_ids in labels_by_id.items()
+        for label_id in dict.fromkeys(label_ids)
+    ]
+    if rows:
+        executor.execute(insert(EmailLabel), rows)
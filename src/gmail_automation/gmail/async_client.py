@@ -0,0 +1,492 @@
+"""Asynchronous Gmail API client for concurrent fetch and modify."""
+
+import asyncio
+import logging
+from types import TracebackType
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Type
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+
+try:
+    import httpx
+except ImportError:  # Optional dependency: pip install gmail-automation[async]
+    httpx = None  # type: ignore[assignment]
+
+from ..database.models import Email
+from .client import MAX_BATCH_MODIFY_SIZE, MAX_PAGE_SIZE, BatchFetchResult
+from .labels import SYSTEM_LABELS
+from .parser import (
+    DEFAULT_MAX_BODY_BYTES,
+    FORMAT_FULL,
+    message_params,
+    parse_message,
+)
+
+logger = logging.getLogger(__name__)
+
+GMAIL_API_URL = "https://gmail.googleapis.com/gmail/v1/users/me"
+
+# Requests in flight at once; also the size of the connection pool.
+DEFAULT_MAX_CONCURRENCY = 10
+
+DEFAULT_TIMEOUT = 30.0
+
+
+class GmailAPIError(Exception):
+    """Raised when the Gmail API answers a request with an error status."""
+
+    def __init__(self, status: int, message: str):
+        """
+        Initialize the error.
+
+        Args:
+            status (int): The HTTP status code.
+            message (str): The error message returned by the API.
+        """
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+def is_available() -> bool:
+    """
+    Check whether the optional httpx dependency is installed.
+
+    Returns:
+        bool: True if :class:`AsyncGmailClient` can be used.
+    """
+    return httpx is not None
+
+
+class AsyncGmailClient:
+    """An asyncio client to interact with the Gmail API.
+
+    Mirrors the surface of :class:`GmailClient`, but every API call is a
+    coroutine. Calls share one pooled HTTP connection set, and at most
+    ``max_concurrency`` are in flight at once, so many messages can be
+    fetched or modified concurrently with ``asyncio.gather``. Use it as an
+    async context manager, which closes the connection pool::
+
+        async with AsyncGmailClient(credentials) as client:
+            result = await client.get_messages_details(ids)
+
+    System labels resolve to their own IDs without a request. Call
+    :meth:`load_labels` before resolving user label names.
+    """
+
+    def __init__(
+        self,
+        credentials: Optional[Credentials],
+        transport: Any = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        base_url: str = GMAIL_API_URL,
+        max_body_bytes: Optional[int] = DEFAULT_MAX_BODY_BYTES,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            credentials (Optional[Credentials]): Google OAuth2 credentials,
+                refreshed when they expire. None sends no Authorization header.
+            transport (Any): Optional httpx transport, e.g. an
+                ``httpx.MockTransport`` in tests.
+            max_concurrency (int): Maximum number of requests in flight.
+            base_url (str): The Gmail API user endpoint.
+            max_body_bytes (Optional[int]): Cut parsed bodies to this many
+                bytes (None for no limit).
+
+        Raises:
+            ImportError: If httpx is not installed.
+        """
+        if httpx is None:
+            raise ImportError(
+                "AsyncGmailClient requires httpx; install the 'async' extra."
+            )
+        self.credentials = credentials
+        self.max_body_bytes = max_body_bytes
+        self.max_concurrency = max(1, max_concurrency)
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            transport=transport,
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+        )
+        # Created on first use so it binds to the running event loop.
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._label_cache: Dict[str, str] = {}
+
+    async def __aenter__(self) -> "AsyncGmailClient":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the connection pool."""
+        await self._http.aclose()
+
+    async def _headers(self) -> Dict[str, str]:
+        """
+        Build the Authorization header, refreshing expired credentials once
+        for all concurrent callers.
+
+        Returns:
+            Dict[str, str]: The request headers.
+        """
+        if self.credentials is None:
+            return {}
+        if not self.credentials.valid:
+            if self._refresh_lock is None:
+                self._refresh_lock = asyncio.Lock()
+            async with self._refresh_lock:
+                if not self.credentials.valid:
+                    await asyncio.to_thread(self.credentials.refresh, Request())
+        return {"Authorization": f"Bearer {self.credentials.token}"}
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        body: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Send one API request, waiting for a free concurrency slot.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path below the user endpoint, e.g. "/labels".
+            params (Optional[Dict[str, Any]]): Query parameters; None values
+                are dropped.
+            body (Optional[Dict[str, Any]]): JSON request body.
+
+        Returns:
+            Dict[str, Any]: The decoded JSON response, empty if there is none.
+
+        Raises:
+            GmailAPIError: If the API answers with an error status.
+            httpx.HTTPError: If the request could not be sent.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if params is not None:
+            params = {key: value for key, value in params.items() if value is not None}
+        async with self._semaphore:
+            response = await self._http.request(
+                method, path, params=params, json=body, headers=await self._headers()
+            )
+        if response.status_code >= 400:
+            raise GmailAPIError(response.status_code, response.text)
+        return response.json() if response.content else {}
+
+    async def load_labels(self) -> None:
+        """Fetches all user labels and caches their names and IDs."""
+        try:
+            results = await self._request("GET", "/labels")
+            labels = results.get("labels", [])
+            self._label_cache = {label["name"]: label["id"] for label in labels}
+            logger.info("Successfully cached user labels.")
+        except (GmailAPIError, httpx.HTTPError) as error:
+            logger.error(f"An error occurred fetching labels: {error}")
+
+    def get_label_id_by_name(self, label_name: str) -> Optional[str]:
+        """
+        Gets a label ID by its name from the cache.
+
+        System labels are their own IDs; user labels are only found after
+        :meth:`load_labels`.
+
+        Args:
+            label_name (str): The name of the label.
+
+        Returns:
+            Optional[str]: The label ID if found, else None.
+        """
+        if label_name in SYSTEM_LABELS:
+            return label_name
+        return self._label_cache.get(label_name)
+
+    async def list_messages(
+        self, query: str = "is:unread", max_results: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Lists basic message info (like IDs) based on a query.
+
+        Args:
+            query (str): Gmail search query string.
+            max_results (int): Maximum number of messages to return.
+
+        Returns:
+            List[Dict[str, Any]]: List of message metadata dictionaries.
+        """
+        messages = [
+            {"id": message_id}
+            async for message_id in self.iter_message_ids(query, limit=max_results)
+        ]
+        if not messages:
+            logger.info("No new messages found matching the query.")
+        return messages
+
+    async def iter_message_ids(
+        self,
+        query: str = "is:unread",
+        limit: Optional[int] = None,
+        page_size: int = MAX_PAGE_SIZE,
+    ) -> AsyncIterator[str]:
+        """
+        Lazily yields message IDs matching a query, one page at a time.
+
+        Args:
+            query (str): Gmail search query string.
+            limit (Optional[int]): Maximum number of IDs to yield (None for all).
+            page_size (int): Number of IDs requested per page (max 500).
+
+        Yields:
+            str: Gmail message IDs.
+        """
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        remaining = limit
+        page_token: Optional[str] = None
+        logger.info(f"Fetching message list with query: '{query}'")
+
+        while remaining is None or remaining > 0:
+            request_size = page_size if remaining is None else min(page_size, remaining)
+            try:
+                results = await self._request(
+                    "GET",
+                    "/messages",
+                    params={
+                        "q": query,
+                        "maxResults": request_size,
+                        "pageToken": page_token,
+                    },
+                )
+            except (GmailAPIError, httpx.HTTPError) as error:
+                logger.error(f"An error occurred fetching the email list: {error}")
+                return
+
+            messages = results.get("messages", [])
+            if remaining is not None:
+                messages = messages[:remaining]
+                remaining -= len(messages)
+            for message in messages:
+                yield message["id"]
+
+            page_token = results.get("nextPageToken")
+            if not page_token or not messages:
+                return
+
+    async def get_message_details(
+        self, message_id: str, message_format: str = FORMAT_FULL
+    ) -> Optional[Email]:
+        """
+        Gets the details for a single message and converts it to an Email.
+
+        Args:
+            message_id (str): The Gmail message ID.
+            message_format (str): "full", "metadata" to leave the body for
+                later, or "raw" to scan the RFC 822 message.
+
+        Returns:
+            Optional[Email]: The parsed Email object, or None on error.
+        """
+        try:
+            message = await self._request(
+                "GET", f"/messages/{message_id}", params=message_params(message_format)
+            )
+            return parse_message(message, message_format, self.max_body_bytes)
+        except (GmailAPIError, httpx.HTTPError, KeyError, TypeError, ValueError) as e:
+            logger.error(
+                f"An error occurred fetching details for message ID {message_id}: {e}"
+            )
+            return None
+
+    async def get_messages_details(
+        self, message_ids: Iterable[str], message_format: str = FORMAT_FULL
+    ) -> BatchFetchResult:
+        """
+        Gets the details for many messages concurrently.
+
+        One request is sent per message, with up to ``max_concurrency`` in
+        flight. A failing message is recorded in the result's failures
+        instead of aborting the others.
+
+        Args:
+            message_ids (Iterable[str]): The Gmail message IDs to fetch.
+            message_format (str): "full", "metadata" to leave the bodies
+                for later, or "raw" to scan the RFC 822 messages.
+
+        Returns:
+            BatchFetchResult: Parsed emails, in request order, and per-ID
+            failures.
+        """
+        ids = list(dict.fromkeys(message_ids))
+        failures: Dict[str, str] = {}
+
+        async def fetch(message_id: str) -> Optional[Email]:
+            try:
+                message = await self._request(
+                    "GET",
+                    f"/messages/{message_id}",
+                    params=message_params(message_format),
+                )
+            except (GmailAPIError, httpx.HTTPError) as error:
+                failures[message_id] = str(error)
+                return None
+            try:
+                return parse_message(message, message_format, self.max_body_bytes)
+            except (KeyError, TypeError, ValueError) as error:
+                failures[message_id] = f"Could not parse message: {error}"
+                return None
+
+        results = await asyncio.gather(*(fetch(message_id) for message_id in ids))
+
+        for message_id, reason in failures.items():
+            logger.error(
+                f"An error occurred fetching details for message ID "
+                f"{message_id}: {reason}"
+            )
+        return BatchFetchResult(
+            emails=[email for email in results if email is not None],
+            failures=failures,
+        )
+
+    async def mark_as_read(self, message_id: str) -> bool:
+        """
+        Mark a message as read by removing the 'UNREAD' label.
+
+        Args:
+            message_id (str): The Gmail message ID.
+
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        unread_label_id = self.get_label_id_by_name("UNREAD")
+        if not unread_label_id:
+            logger.error("Could not find the 'UNREAD' label ID.")
+            return False
+        return await self._modify_labels(message_id, remove_labels=[unread_label_id])
+
+    async def mark_as_unread(self, message_id: str) -> bool:
+        """
+        Mark a message as unread by adding the 'UNREAD' label.
+
+        Args:
+            message_id (str): The Gmail message ID.
+
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        unread_label_id = self.get_label_id_by_name("UNREAD")
+        if not unread_label_id:
+            logger.error("Could not find the 'UNREAD' label ID.")
+            return False
+        return await self._modify_labels(message_id, add_labels=[unread_label_id])
+
+    async def move_to_label(self, message_id: str, destination_label_name: str) -> bool:
+        """
+        Move a message to a new label and remove it from the inbox.
+
+        Args:
+            message_id (str): The Gmail message ID.
+            destination_label_name (str): The name of the destination label.
+
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        destination_label_id = self.get_label_id_by_name(destination_label_name)
+        inbox_label_id = self.get_label_id_by_name("INBOX")
+
+        if not destination_label_id:
+            logger.error(f"Destination label '{destination_label_name}' not found.")
+            return False
+
+        return await self._modify_labels(
+            message_id,
+            add_labels=[destination_label_id],
+            remove_labels=[inbox_label_id] if inbox_label_id else [],
+        )
+
+    async def _modify_labels(
+        self,
+        message_id: str,
+        add_labels: Optional[List[str]] = None,
+        remove_labels: Optional[List[str]] = None,
+    ) -> bool:
+        """
+        A helper function to add or remove labels from a message.
+
+        Args:
+            message_id (str): The Gmail message ID.
+            add_labels (Optional[List[str]]): List of label IDs to add.
+            remove_labels (Optional[List[str]]): List of label IDs to remove.
+
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        body = {
+            "addLabelIds": add_labels or [],
+            "removeLabelIds": remove_labels or [],
+        }
+        try:
+            await self._request("POST", f"/messages/{message_id}/modify", body=body)
+            logger.info(f"Successfully modified labels for message {message_id}.")
+            return True
+        except (GmailAPIError, httpx.HTTPError) as error:
+            logger.error(f"Failed to modify labels for message {message_id}: {error}")
+            return False
+
+    async def batch_modify_labels(
+        self,
+        message_ids: Iterable[str],
+        add_labels: Optional[List[str]] = None,
+        remove_labels: Optional[List[str]] = None,
+    ) -> List[str]:
+        """
+        Apply the same label change to many messages with ``batchModify``.
+
+        IDs are sent in chunks of up to 1,000, one concurrent API call per
+        chunk. A failed chunk is logged and skipped without affecting the
+        others.
+
+        Args:
+            message_ids (Iterable[str]): The Gmail message IDs to modify.
+            add_labels (Optional[List[str]]): List of label IDs to add.
+            remove_labels (Optional[List[str]]): List of label IDs to remove.
+
+        Returns:
+            List[str]: IDs of the messages that were modified successfully.
+        """
+        ids = list(dict.fromkeys(message_ids))
+
+        async def modify(chunk: List[str]) -> List[str]:
+            body = {
+                "ids": chunk,
+                "addLabelIds": add_labels or [],
+                "removeLabelIds": remove_labels or [],
+            }
+            try:
+                await self._request("POST", "/messages/batchModify", body=body)
+            except (GmailAPIError, httpx.HTTPError) as error:
+                logger.error(
+                    f"Failed to modify labels for {len(chunk)} messages: {error}"
+                )
+                return []
+            logger.info(f"Successfully modified labels for {len(chunk)} messages.")
+            return chunk
+
+        chunks = [
+            ids[start : start + MAX_BATCH_MODIFY_SIZE]
+            for start in range(0, len(ids), MAX_BATCH_MODIFY_SIZE)
+        ]
+        results = await asyncio.gather(*(modify(chunk) for chunk in chunks))
+        return [message_id for chunk in results for message_id in chunk]
@@ -1,63 +1,213 @@
 """Gmail API client for email operations."""
 
-import base64
-import json
 import logging
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
 
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import Resource, build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
 
+from ..database.connection import Database
 from ..database.models import Email
+from .labels import LabelList, LabelRegistry
+from .parser import (
+    DEFAULT_MAX_BODY_BYTES,
+    FORMAT_FULL,
+    message_params,
+    parse_message,
+)
+from .ratelimit import (
+    RateLimiter,
+    is_rate_limited,
+    is_retryable,
+    quota_units,
+    retry_after,
+)
 
 logger = logging.getLogger(__name__)
 
+# Gmail accepts up to 100 calls per batch, but batches larger than 50 are
+# likely to be rate limited, so 50 is the recommended size.
+MAX_BATCH_SIZE = 100
+DEFAULT_BATCH_SIZE = 50
+GMAIL_BATCH_URI = "https://gmail.googleapis.com/batch/gmail/v1"
+
+# messages.list returns at most 500 IDs per page.
+MAX_PAGE_SIZE = 500
+
+# messages.batchModify accepts at most 1,000 message IDs per call.
+MAX_BATCH_MODIFY_SIZE = 1000
+
+
+# History record types needed to mirror the mailbox incrementally.
+HISTORY_TYPES = ["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"]
+
+
+class HistoryExpiredError(Exception):
+    """Raised when a history checkpoint is too old for Gmail to sync from."""
+
+
+class HistoryChanges(NamedTuple):
+    """Mailbox changes since a history checkpoint.
+
+    Attributes:
+        history_id (str): The mailbox history ID the changes are current to.
+        added (List[str]): IDs of messages added since the checkpoint.
+        deleted (List[str]): IDs of messages deleted since the checkpoint.
+        label_updates (Dict[str, List[str]]): Latest label IDs of messages whose
+            labels changed since the checkpoint.
+    """
+
+    history_id: str
+    added: List[str]
+    deleted: List[str]
+    label_updates: Dict[str, List[str]]
+
+
+class BatchFetchResult(NamedTuple):
+    """Result of a batched message fetch.
+
+    Attributes:
+        emails (List[Email]): Successfully parsed emails, in request order.
+        failures (Dict[str, str]): Error message for each message ID that failed.
+    """
+
+    emails: List[Email]
+    failures: Dict[str, str]
+
 
 class GmailClient:
     """A client to interact with the Gmail API."""
 
-    def __init__(self, credentials: Credentials):
+    def __init__(
+        self,
+        credentials: Optional[Credentials],
+        http: Any = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        database: Optional[Database] = None,
+        max_body_bytes: Optional[int] = DEFAULT_MAX_BODY_BYTES,
+    ):
         """
         Initializes the Gmail client and authenticates.
 
         Args:
-            credentials (Credentials): Google OAuth2 credentials.
+            credentials (Optional[Credentials]): Google OAuth2 credentials.
+            http (Any): Optional pre-built httplib2-compatible transport. When
+                given, it is used instead of the credentials (e.g. in tests).
+            rate_limiter (Optional[RateLimiter]): Quota and retry policy for
+                every request. Share one between clients on several threads
+                so they are limited together.
+            database (Optional[Database]): Stores the label list between runs.
+            max_body_bytes (Optional[int]): Cut parsed bodies to this many
+                bytes (None for no limit).
         """
-        self.service = self._authenticate(credentials)
-        self._label_cache: Dict[str, str] = {}
-        self._populate_label_cache()
-
-    def _authenticate(self, credentials: Credentials) -> Resource:
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_body_bytes = max_body_bytes
+        self.service = self._authenticate(credentials, http)
+        # Labels are fetched on first use, so clients that never look one up
+        # make no labels.list call.
+        self.labels = LabelRegistry(self.list_labels, self.create_labels, database)
+
+    def _authenticate(self, credentials: Optional[Credentials], http: Any) -> Resource:
         """
         Authenticates the client using the provided credentials.
 
         Args:
-            credentials (Credentials): Google OAuth2 credentials.
+            credentials (Optional[Credentials]): Google OAuth2 credentials.
+            http (Any): Optional httplib2-compatible transport.
 
         Returns:
             Resource: Gmail API service resource.
         """
+        if http is not None:
+            return build("gmail", "v1", http=http)
         return build("gmail", "v1", credentials=credentials)
 
-    def _populate_label_cache(self):
+    def _execute(self, request: Any, units: Optional[int] = None) -> Any:
+        """
+        Execute an API request through the client's rate limiter.
+
+        All calls go through here, so they wait for quota and retry throttled
+        and transient failures before the caller sees an ``HttpError``.
+
+        Args:
+            request (Any): The request or batch to execute.
+            units (Optional[int]): Quota units the request costs; derived from
+                its method when omitted.
+
+        Returns:
+            Any: The API response.
+
+        Raises:
+            HttpError: If the request fails and cannot be retried.
+        """
+        return self.rate_limiter.execute(request, units)
+
+    def list_labels(self) -> Optional[LabelList]:
         """
-        Fetches all user labels and caches their names and IDs.
+        Fetches all user labels.
 
-        Populates the internal label cache for quick lookup.
+        Returns:
+            Optional[LabelList]: The label resources, or None on error.
         """
         try:
-            results = self.service.users().labels().list(userId="me").execute()
-            labels = results.get("labels", [])
-            self._label_cache = {label["name"]: label["id"] for label in labels}
-            logger.info("Successfully cached user labels.")
+            results = self._execute(self.service.users().labels().list(userId="me"))
+            return results.get("labels", [])
         except HttpError as error:
             logger.error(f"An error occurred fetching labels: {error}")
+            return None
+
+    def create_labels(self, names: Iterable[str]) -> LabelList:
+        """
+        Creates user labels in a single batch request.
+
+        Args:
+            names (Iterable[str]): Names of the labels to create.
+
+        Returns:
+            LabelList: The created label resources. Labels that could not be
+            created are logged and left out.
+        """
+        names = list(dict.fromkeys(names))
+        created: LabelList = []
+
+        def callback(
+            request_id: str, response: Optional[Dict[str, Any]], exception: Any
+        ) -> None:
+            if exception is not None:
+                name = names[int(request_id)]
+                logger.error(f"Failed to create label '{name}': {exception}")
+            elif response:
+                created.append(response)
+
+        units = quota_units("gmail.users.labels.create")
+        for start in range(0, len(names), MAX_BATCH_SIZE):
+            chunk = names[start : start + MAX_BATCH_SIZE]
+            batch = BatchHttpRequest(callback=callback, batch_uri=GMAIL_BATCH_URI)
+            for index, name in enumerate(chunk, start):
+                batch.add(
+                    self.service.users()
+                    .labels()
+                    .create(
+                        userId="me",
+                        body={
+                            "name": name,
+                            "labelListVisibility": "labelShow",
+                            "messageListVisibility": "show",
+                        },
+                    ),
+                    request_id=str(index),
+                )
+            try:
+                self._execute(batch, units=units * len(chunk))
+            except HttpError as error:
+                logger.error(f"Failed to create {len(chunk)} labels: {error}")
+        return created
 
     def get_label_id_by_name(self, label_name: str) -> Optional[str]:
         """
-        Gets a label ID by its name from the cache.
+        Gets a label ID by its name, see :class:`LabelRegistry`.
 
         Args:
             label_name (str): The name of the label.
@@ -65,7 +215,7 @@ class GmailClient:
         Returns:
             Optional[str]: The label ID if found, else None.
         """
-        return self._label_cache.get(label_name)
+        return self.labels.get_id(label_name)
 
     def list_messages(
         self, query: str = "is:unread", max_results: int = 100
@@ -73,6 +223,8 @@ class GmailClient:
         """
         Lists basic message info (like IDs) from the user's inbox based on a query.
 
+        Follows ``nextPageToken`` until ``max_results`` messages are collected.
+
         Args:
             query (str): Gmail search query string.
             max_results (int): Maximum number of messages to return.
@@ -80,40 +232,188 @@ class GmailClient:
         Returns:
             List[Dict[str, Any]]: List of message metadata dictionaries.
         """
-        try:
-            logger.info(f"Fetching message list with query: '{query}'")
-            results = (
-                self.service.users()
-                .messages()
-                .list(userId="me", q=query, maxResults=max_results)
-                .execute()
-            )
+        messages = [
+            {"id": message_id}
+            for message_id in self.iter_message_ids(query=query, limit=max_results)
+        ]
+        if not messages:
+            logger.info("No new messages found matching the query.")
+        return messages
+
+    def iter_message_ids(
+        self,
+        query: str = "is:unread",
+        limit: Optional[int] = None,
+        page_size: int = MAX_PAGE_SIZE,
+        include_spam_trash: bool = False,
+        raise_errors: bool = False,
+    ) -> Iterator[str]:
+        """
+        Lazily yields message IDs matching a query, one page at a time.
+
+        The next page is only requested once the caller has consumed the
+        current one, so callers can start working on the first IDs before
+        listing finishes.
+
+        Args:
+            query (str): Gmail search query string.
+            limit (Optional[int]): Maximum number of IDs to yield (None for all).
+            page_size (int): Number of IDs requested per page (max 500).
+            include_spam_trash (bool): Also list messages in SPAM and TRASH.
+            raise_errors (bool): Raise listing errors instead of logging them
+                and stopping early, for callers that need the complete list.
+
+        Yields:
+            str: Gmail message IDs.
+
+        Raises:
+            HttpError: If listing fails and ``raise_errors`` is set.
+        """
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        remaining = limit
+        page_token: Optional[str] = None
+        logger.info(f"Fetching message list with query: '{query}'")
+
+        while remaining is None or remaining > 0:
+            request_size = page_size if remaining is None else min(page_size, remaining)
+            try:
+                results = self._execute(
+                    self.service.users()
+                    .messages()
+                    .list(
+                        userId="me",
+                        q=query,
+                        maxResults=request_size,
+                        pageToken=page_token,
+                        includeSpamTrash=include_spam_trash,
+                    )
+                )
+            except HttpError as error:
+                if raise_errors:
+                    raise
+                logger.error(f"An error occurred fetching the email list: {error}")
+                return
+
             messages = results.get("messages", [])
-            if not messages:
-                logger.info("No new messages found matching the query.")
-            return messages
+            if remaining is not None:
+                messages = messages[:remaining]
+                remaining -= len(messages)
+            for message in messages:
+                yield message["id"]
+
+            page_token = results.get("nextPageToken")
+            if not page_token or not messages:
+                return
+
+    def get_history_id(self) -> Optional[str]:
+        """
+        Gets the mailbox's current history ID from the user's profile.
+
+        Returns:
+            Optional[str]: The current history ID, or None on error.
+        """
+        try:
+            profile = self._execute(self.service.users().getProfile(userId="me"))
+            return str(profile["historyId"])
         except HttpError as error:
-            logger.error(f"An error occurred fetching the email list: {error}")
-            return []
+            logger.error(f"An error occurred fetching the mailbox profile: {error}")
+            return None
 
-    def get_message_details(self, message_id: str) -> Optional[Email]:
+    def list_history(self, start_history_id: str) -> Optional[HistoryChanges]:
         """
-        Gets the full details for a single message and converts it to an Email object.
+        Lists mailbox changes since a history checkpoint via ``users.history.list``.
+
+        Records are folded in order, so a message added and later deleted in
+        the same window is only reported as deleted.
+
+        Args:
+            start_history_id (str): The checkpoint to sync from.
+
+        Returns:
+            Optional[HistoryChanges]: The folded changes, or None on error.
+
+        Raises:
+            HistoryExpiredError: If the checkpoint is no longer available and a
+                full resync is required.
+        """
+        added: Dict[str, None] = {}
+        deleted: Dict[str, None] = {}
+        label_updates: Dict[str, List[str]] = {}
+        history_id = start_history_id
+        page_token: Optional[str] = None
+
+        while True:
+            try:
+                results = self._execute(
+                    self.service.users()
+                    .history()
+                    .list(
+                        userId="me",
+                        startHistoryId=start_history_id,
+                        historyTypes=HISTORY_TYPES,
+                        maxResults=MAX_PAGE_SIZE,
+                        pageToken=page_token,
+                    )
+                )
+            except HttpError as error:
+                if error.resp.status == 404:
+                    raise HistoryExpiredError(
+                        f"History ID {start_history_id} is no longer available"
+                    ) from error
+                logger.error(f"An error occurred fetching mailbox history: {error}")
+                return None
+
+            for record in results.get("history", []):
+                for change in record.get("messagesAdded", []):
+                    message = change["message"]
+                    deleted.pop(message["id"], None)
+                    added[message["id"]] = None
+                    label_updates[message["id"]] = message.get("labelIds", [])
+                for change in record.get("messagesDeleted", []):
+                    message_id = change["message"]["id"]
+                    added.pop(message_id, None)
+                    label_updates.pop(message_id, None)
+                    deleted[message_id] = None
+                for key in ("labelsAdded", "labelsRemoved"):
+                    for change in record.get(key, []):
+                        message = change["message"]
+                        if message["id"] not in deleted:
+                            label_updates[message["id"]] = message.get("labelIds", [])
+
+            history_id = str(results.get("historyId", history_id))
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                break
+
+        return HistoryChanges(
+            history_id=history_id,
+            added=list(added),
+            deleted=list(deleted),
+            label_updates=label_updates,
+        )
+
+    def get_message_details(
+        self, message_id: str, message_format: str = FORMAT_FULL
+    ) -> Optional[Email]:
+        """
+        Gets the details for a single message and converts it to an Email object.
 
         Args:
             message_id (str): The Gmail message ID.
+            message_format (str): "full", "metadata" to fetch only the
+                headers the Email needs and leave the body for later, or
+                "raw" to stream the body out of the RFC 822 message.
 
         Returns:
             Optional[Email]: The parsed Email object, or None if not found.
         """
         try:
-            message = (
+            message = self._execute(
                 self.service.users()
                 .messages()
-                .get(userId="me", id=message_id, format="full")
-                .execute()
+                .get(userId="me", id=message_id, **message_params(message_format))
             )
-            return self._parse_message_to_email(message)
+            return parse_message(message, message_format, self.max_body_bytes)
         except HttpError as error:
             logger.error(
                 f"An error occurred fetching details for message ID "
@@ -121,66 +421,121 @@ class GmailClient:
             )
             return None
 
-    def _parse_message_to_email(self, message: Dict[str, Any]) -> Email:
+    def get_messages_details(
+        self,
+        message_ids: Iterable[str],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        message_format: str = FORMAT_FULL,
+    ) -> BatchFetchResult:
         """
-        Parses a raw Gmail API message into a structured Email object.
+        Gets the details for many messages using Gmail batch requests.
+
+        Message IDs are grouped into batches of at most ``batch_size`` calls, so
+        each batch costs a single HTTP round trip. A failing message is recorded
+        in the result's failures instead of aborting the rest of the batch.
+        Messages whose sub-request was throttled or hit a transient error are
+        retried in a later batch, after a backoff.
 
         Args:
-            message (Dict[str, Any]): Raw message dictionary from Gmail API.
+            message_ids (Iterable[str]): The Gmail message IDs to fetch.
+            batch_size (int): Number of messages per batch request (max 100).
+            message_format (str): "full", "metadata" to fetch only the
+                headers the Emails need and leave the bodies for later, or
+                "raw" to stream the bodies out of the RFC 822 messages.
 
         Returns:
-            Email: Parsed Email object.
-        """
-        headers = message["payload"]["headers"]
-        header_map = {h["name"].lower(): h["value"] for h in headers}
-
-        received_timestamp_ms = int(message["internalDate"])
-        received_at = datetime.fromtimestamp(received_timestamp_ms / 1000.0)
-
-        label_ids = message.get("labelIds", [])
-
-        return Email(
-            id=message["id"],
-            thread_id=message["threadId"],
-            message_id=header_map.get("message-id", message["id"]),
-            subject=header_map.get("subject", ""),
-            sender=header_map.get("from", ""),
-            recipient=header_map.get("to", ""),
-            received_at=received_at,
-            body=self._extract_message_body(message["payload"]),
-            is_read="UNREAD" not in label_ids,
-            labels=json.dumps(label_ids),
-        )
-
-    def _extract_message_body(self, payload: Dict[str, Any]) -> str:
+            BatchFetchResult: Parsed emails and per-ID failures.
         """
-        Finds and decodes the text/plain part of an email's body.
+        batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        ids = list(dict.fromkeys(message_ids))
+        parsed: Dict[str, Email] = {}
+        failures: Dict[str, str] = {}
+        retries: Dict[str, HttpError] = {}
+
+        def callback(
+            request_id: str, response: Optional[Dict[str, Any]], exception: Any
+        ) -> None:
+            if exception is not None:
+                if isinstance(exception, HttpError) and is_retryable(
+                    exception.resp.status, exception.content
+                ):
+                    retries[request_id] = exception
+                failures[request_id] = str(exception)
+                return
+            try:
+                parsed[request_id] = parse_message(
+                    response or {}, message_format, self.max_body_bytes
+                )
+            except (KeyError, TypeError, ValueError) as error:
+                failures[request_id] = f"Could not parse message: {error}"
+
+        pending = ids
+        attempt = 0
+        while True:
+            self._fetch_batches(pending, batch_size, message_format, callback, failures)
+            if not retries or attempt >= self.rate_limiter.max_retries:
+                break
+            pending = [message_id for message_id in ids if message_id in retries]
+            errors = list(retries.values())
+            retries.clear()
+            for message_id in pending:
+                del failures[message_id]
+            if any(is_rate_limited(e.resp.status, e.content) for e in errors):
+                self.rate_limiter.concurrency.decrease()
+            delays = [retry_after(e.resp) for e in errors]
+            server_delay = max((d for d in delays if d is not None), default=None)
+            logger.warning(
+                f"Retrying {len(pending)} messages after retryable batch errors"
+            )
+            self.rate_limiter.wait(attempt, server_delay)
+            attempt += 1
 
-        Args:
-            payload (Dict[str, Any]): The payload part of the Gmail message.
+        for message_id, reason in failures.items():
+            logger.error(
+                f"An error occurred fetching details for message ID "
+                f"{message_id}: {reason}"
+            )
 
-        Returns:
-            str: The decoded plain text body, or empty string if not found.
+        emails = [parsed[message_id] for message_id in ids if message_id in parsed]
+        return BatchFetchResult(emails=emails, failures=failures)
+
+    def _fetch_batches(
+        self,
+        message_ids: List[str],
+        batch_size: int,
+        message_format: str,
+        callback: Callable[[str, Optional[Dict[str, Any]], Any], None],
+        failures: Dict[str, str],
+    ) -> None:
         """
-        if payload.get("body", {}).get("data"):
-            data = payload["body"]["data"]
-            return base64.urlsafe_b64decode(data.encode("ASCII")).decode(
-                "utf-8", "ignore"
-            )
+        Send ``messages.get`` batch requests for the given IDs.
 
-        if "parts" in payload:
-            for part in payload["parts"]:
-                if part["mimeType"] == "text/plain":
-                    if part.get("body", {}).get("data"):
-                        data = part["body"]["data"]
-                        return base64.urlsafe_b64decode(data.encode("ASCII")).decode(
-                            "utf-8", "ignore"
-                        )
-                elif "parts" in part:
-                    body = self._extract_message_body(part)
-                    if body:
-                        return body
-        return ""
+        Args:
+            message_ids (List[str]): The Gmail message IDs to fetch.
+            batch_size (int): Number of messages per batch request.
+            message_format (str): The format to fetch the messages in.
+            callback (Callable[[str, Optional[Dict[str, Any]], Any], None]):
+                Receives each sub-request's response or exception.
+            failures (Dict[str, str]): Failures of whole batches are recorded
+                here for each of their IDs.
+        """
+        units = quota_units("gmail.users.messages.get")
+        for start in range(0, len(message_ids), batch_size):
+            chunk = message_ids[start : start + batch_size]
+            batch = BatchHttpRequest(callback=callback, batch_uri=GMAIL_BATCH_URI)
+            for message_id in chunk:
+                batch.add(
+                    self.service.users()
+                    .messages()
+                    .get(userId="me", id=message_id, **message_params(message_format)),
+                    request_id=message_id,
+                )
+            try:
+                self._execute(batch, units=units * len(chunk))
+            except Exception as error:
+                logger.error(f"Batch request for {len(chunk)} messages failed: {error}")
+                for message_id in chunk:
+                    failures.setdefault(message_id, str(error))
 
     def mark_as_read(self, message_id: str) -> bool:
         """
@@ -261,11 +616,54 @@ class GmailClient:
             "removeLabelIds": remove_labels or [],
         }
         try:
-            self.service.users().messages().modify(
-                userId="me", id=message_id, body=body
-            ).execute()
+            self._execute(
+                self.service.users()
+                .messages()
+                .modify(userId="me", id=message_id, body=body)
+            )
             logger.info(f"Successfully modified labels for message {message_id}.")
             return True
         except HttpError as error:
             logger.error(f"Failed to modify labels for message {message_id}: {error}")
             return False
+
+    def batch_modify_labels(
+        self,
+        message_ids: Iterable[str],
+        add_labels: Optional[List[str]] = None,
+        remove_labels: Optional[List[str]] = None,
+    ) -> List[str]:
+        """
+        Apply the same label change to many messages with ``batchModify``.
+
+        IDs are sent in chunks of up to 1,000, one API call per chunk. A failed
+        chunk is logged and skipped without affecting the others.
+
+        Args:
+            message_ids (Iterable[str]): The Gmail message IDs to modify.
+            add_labels (Optional[List[str]]): List of label IDs to add.
+            remove_labels (Optional[List[str]]): List of label IDs to remove.
+
+        Returns:
+            List[str]: IDs of the messages that were modified successfully.
+        """
+        ids = list(dict.fromkeys(message_ids))
+        modified: List[str] = []
+        for start in range(0, len(ids), MAX_BATCH_MODIFY_SIZE):
+            chunk = ids[start : start + MAX_BATCH_MODIFY_SIZE]
+            body = {
+                "ids": chunk,
+                "addLabelIds": add_labels or [],
+                "removeLabelIds": remove_labels or [],
+            }
+            try:
+                self._execute(
+                    self.service.users().messages().batchModify(userId="me", body=body)
+                )
+                modified.extend(chunk)
+                logger.info(f"Successfully modified labels for {len(chunk)} messages.")
+            except HttpError as error:
+                logger.error(
+                    f"Failed to modify labels for {len(chunk)} messages: {error}"
+                )
+        return modified
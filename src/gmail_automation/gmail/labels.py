@@ -0,0 +1,255 @@
+"""Lazily loaded, expiring cache of Gmail label names and IDs."""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, insert, select
+
+from ..database.connection import Database
+from ..database.models import Label
+
+logger = logging.getLogger(__name__)
+
+# Labels refetched after this many seconds.
+DEFAULT_TTL = 3600.0
+
+# Names not found are not looked up again for this many seconds.
+DEFAULT_NEGATIVE_TTL = 300.0
+
+# System labels, whose IDs are their names, so no lookup is needed.
+SYSTEM_LABELS = frozenset(
+    {
+        "INBOX",
+        "UNREAD",
+        "STARRED",
+        "IMPORTANT",
+        "SENT",
+        "DRAFT",
+        "SPAM",
+        "TRASH",
+        "CHAT",
+        "CATEGORY_PERSONAL",
+        "CATEGORY_SOCIAL",
+        "CATEGORY_PROMOTIONS",
+        "CATEGORY_UPDATES",
+        "CATEGORY_FORUMS",
+    }
+)
+
+LabelList = List[Dict[str, Any]]
+
+
+class LabelRegistry:
+    """Map label names to IDs, fetching the label list only when needed.
+
+    Labels are fetched on the first lookup of a user label, not when the
+    registry is created, and again once they are older than ``ttl``. A name
+    that is not cached triggers one refetch, since the label may have been
+    created since; names still missing are remembered for ``negative_ttl``
+    so repeated misses cost no requests. System labels resolve without any
+    lookup.
+
+    With a database, the label list is stored in the labels table and reused
+    by later processes while it is fresh, so a short command starts without
+    a round trip.
+    """
+
+    def __init__(
+        self,
+        fetch_labels: Callable[[], Optional[LabelList]],
+        create_labels: Optional[Callable[[List[str]], LabelList]] = None,
+        database: Optional[Database] = None,
+        ttl: float = DEFAULT_TTL,
+        negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ):
+        """
+        Initialize the registry, empty.
+
+        Args:
+            fetch_labels (Callable[[], Optional[LabelList]]): Lists the
+                user's labels (``labels.list`` resources), or returns None on
+                error.
+            create_labels (Optional[Callable[[List[str]], LabelList]]):
+                Creates labels by name and returns the created resources.
+            database (Optional[Database]): Persists the label list.
+            ttl (float): Seconds before the label list is refetched.
+            negative_ttl (float): Seconds a missing name is remembered.
+            clock (Callable[[], datetime]): Current time, as naive UTC.
+        """
+        self._fetch_labels = fetch_labels
+        self._create_labels = create_labels
+        self.database = database
+        self.ttl = timedelta(seconds=ttl)
+        self.negative_ttl = timedelta(seconds=negative_ttl)
+        self._clock = clock
+        self._ids: Dict[str, str] = {}
+        self._loaded_at: Optional[datetime] = None
+        self._missing: Dict[str, datetime] = {}
+
+    def get_id(self, name: str) -> Optional[str]:
+        """
+        Get a label's ID by name.
+
+        Args:
+            name (str): The label name.
+
+        Returns:
+            Optional[str]: The label ID, or None if there is no such label.
+        """
+        if name in SYSTEM_LABELS:
+            return name
+        fetched = self._ensure_loaded()
+        label_id = self._ids.get(name)
+        if label_id is not None:
+            return label_id
+
+        missed_at = self._missing.get(name)
+        if missed_at is not None and self._clock() - missed_at < self.negative_ttl:
+            return None
+        if not fetched:
+            # The label may have been created since the list was fetched.
+            self.refresh()
+            label_id = self._ids.get(name)
+            if label_id is not None:
+                return label_id
+        self._missing[name] = self._clock()
+        return None
+
+    def ensure(self, names: Iterable[str]) -> Dict[str, str]:
+        """
+        Create the labels that do not exist yet, in one batch.
+
+        Args:
+            names (Iterable[str]): Label names that must exist.
+
+        Returns:
+            Dict[str, str]: The ID of each name that exists now.
+        """
+        names = list(dict.fromkeys(names))
+        ids = {name: self.get_id(name) for name in names}
+        missing = [name for name, label_id in ids.items() if label_id is None]
+        if missing and self._create_labels is not None:
+            created = self._create_labels(missing)
+            if created:
+                logger.info(f"Created {len(created)} labels.")
+                self._add(created)
+            for label in created:
+                ids[label["name"]] = label["id"]
+        return {name: label_id for name, label_id in ids.items() if label_id}
+
+    def refresh(self) -> bool:
+        """
+        Fetch the label list now, replacing the cache.
+
+        Returns:
+            bool: True if the labels were fetched.
+        """
+        labels = self._fetch_labels()
+        if labels is None:
+            # Keep serving the stale list rather than failing every lookup.
+            self._loaded_at = self._clock()
+            return False
+        self._ids = {label["name"]: label["id"] for label in labels}
+        self._loaded_at = self._clock()
+        # Other misses stay cached, so alternating misses do not refetch.
+        for name in self._ids.keys() & self._missing.keys():
+            del self._missing[name]
+        self._save(labels)
+        logger.info(f"Cached {len(self._ids)} labels.")
+        return True
+
+    def invalidate(self) -> None:
+        """
+        Forget the cached labels, so the next lookup fetches them.
+
+        Names remembered as missing stay so until the fetched list has them
+        or ``negative_ttl`` passes.
+        """
+        self._ids = {}
+        self._loaded_at = None
+
+    def _ensure_loaded(self) -> bool:
+        """
+        Load the labels if they were never loaded or have expired.
+
+        Returns:
+            bool: True if the labels were just requested from the API.
+        """
+        if self._loaded_at is not None and self._clock() - self._loaded_at < self.ttl:
+            return False
+        if self._loaded_at is None and self._load_stored():
+            return False
+        self.refresh()
+        return True
+
+    def _add(self, labels: LabelList) -> None:
+        """
+        Add labels to the cache and the stored list.
+
+        Args:
+            labels (LabelList): Label resources to add.
+        """
+        for label in labels:
+            self._ids[label["name"]] = label["id"]
+            self._missing.pop(label["name"], None)
+        if self.database is not None:
+            with self.database.get_session() as session:
+                for row in self._rows(labels):
+                    session.merge(Label(**row))
+
+    def _load_stored(self) -> bool:
+        """
+        Load the stored label list if it is still fresh.
+
+        Returns:
+            bool: True if the cache was loaded from the database.
+        """
+        if self.database is None:
+            return False
+        with self.database.get_session() as session:
+            rows = session.execute(select(Label.id, Label.name, Label.fetched_at)).all()
+        if not rows:
+            return False
+        loaded_at = min(row.fetched_at for row in rows)
+        if self._clock() - loaded_at >= self.ttl:
+            return False
+        self._ids = {row.name: row.id for row in rows}
+        self._loaded_at = loaded_at
+        return True
+
+    def _save(self, labels: LabelList) -> None:
+        """
+        Replace the stored label list.
+
+        Args:
+            labels (LabelList): The fetched label resources.
+        """
+        if self.database is None:
+            return
+        with self.database.get_session() as session:
+            session.execute(delete(Label))
+            if labels:
+                session.execute(insert(Label), self._rows(labels))
+
+    def _rows(self, labels: LabelList) -> List[Dict[str, Any]]:
+        """
+        Build the stored rows of label resources.
+
+        Args:
+            labels (LabelList): The label resources.
+
+        Returns:
+            List[Dict[str, Any]]: One row per label, fetched now.
+        """
+        fetched_at = self._clock()
+        return [
+            {
+                "id": label["id"],
+                "name": label["name"],
+                "type": label.get("type"),
+                "fetched_at": fetched_at,
+            }
+            for label in labels
+        ]
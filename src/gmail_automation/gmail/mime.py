@@ -0,0 +1,308 @@
+"""Streaming scan of raw RFC 822 messages fetched with format=raw.
+
+The base64url ``raw`` string is decoded a chunk at a time and scanned line by
+line. Only header blocks and the text part are kept; other parts, such as
+attachments, are skipped as they stream past, and scanning stops at the first
+text/plain part. Memory use therefore does not grow with attachment size
+beyond the ``raw`` string itself.
+"""
+
+import binascii
+from email.message import Message
+from email.parser import BytesHeaderParser
+from email.policy import default
+from typing import Iterator, List, NamedTuple, Optional
+
+# Base64 characters decoded at a time, a multiple of 4.
+CHUNK_SIZE = 65_536
+
+# Longer lines are read in pieces; no delimiter line is this long.
+_MAX_LINE = 8_192
+
+# Header bytes kept per part; the rest of an oversized block is dropped.
+_MAX_HEADER_BYTES = 262_144
+
+_header_parser = BytesHeaderParser(policy=default)
+
+
+class RawMessage(NamedTuple):
+    """The parts of a raw message that an Email is built from.
+
+    Attributes:
+        headers (Message): The top-level headers.
+        text (str): The decoded text of the body part, or empty string.
+        mime_type (Optional[str]): The body part's type, "text/plain" or
+            "text/html", or None if there is no text part.
+    """
+
+    headers: Message
+    text: str
+    mime_type: Optional[str]
+
+
+def decoded_chunks(data: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Decode base64url data a chunk at a time.
+
+    Args:
+        data (str): The base64url-encoded data, padded or not.
+        chunk_size (int): Characters decoded per chunk, a multiple of 4.
+
+    Yields:
+        bytes: The decoded chunks, in order.
+    """
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start : start + chunk_size].replace("-", "+").replace("_", "/")
+        yield binascii.a2b_base64(chunk + "=" * (-len(chunk) % 4))
+
+
+class _LineReader:
+    """Read lines from a stream of byte chunks, keeping at most one chunk."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        """
+        Initialize the reader.
+
+        Args:
+            chunks (Iterator[bytes]): The decoded message, in chunks.
+        """
+        self._chunks = chunks
+        self._buffer = b""
+        self._position = 0
+        self._line_start = True
+
+    def readline(self) -> bytes:
+        """
+        Read the next line, or the next ``_MAX_LINE`` bytes of a longer one.
+
+        Returns:
+            bytes: The line with its line break, or b"" at the end.
+        """
+        while True:
+            stop = self._position + _MAX_LINE
+            end = self._buffer.find(b"\n", self._position, stop)
+            if end >= 0 or len(self._buffer) >= stop or not self._fill():
+                break
+        end = end + 1 if end >= 0 else stop
+        line = self._buffer[self._position : end]
+        self._position += len(line)
+        self._line_start = line.endswith(b"\n")
+        return line
+
+    def unread(self, line: bytes) -> None:
+        """
+        Push back the line just read.
+
+        Args:
+            line (bytes): The line.
+        """
+        self._position -= len(line)
+        self._line_start = True
+
+    def skip_to_dashes(self) -> bool:
+        """
+        Discard data up to the next line starting with "--".
+
+        Returns:
+            bool: True if such a line is next, False at the end.
+        """
+        while len(self._buffer) - self._position < 2 and self._fill():
+            pass
+        if self._line_start and self._buffer.startswith(b"--", self._position):
+            return True
+        while True:
+            index = self._buffer.find(b"\n--", self._position)
+            if index >= 0:
+                self._position = index + 1
+                self._line_start = True
+                return True
+            # Keep a trailing "\n-" that the next chunk may complete.
+            self._position = max(self._position, len(self._buffer) - 2)
+            self._line_start = False
+            if not self._fill():
+                return False
+
+    def read_headers(self) -> Message:
+        """
+        Read a header block and the blank line ending it.
+
+        Returns:
+            Message: The parsed headers, without a payload.
+        """
+        lines: List[bytes] = []
+        size = 0
+        while True:
+            line = self.readline()
+            if not line or line in (b"\r\n", b"\n"):
+                break
+            size += len(line)
+            if size <= _MAX_HEADER_BYTES:
+                lines.append(line)
+        return _header_parser.parsebytes(b"".join(lines))
+
+    def _fill(self) -> bool:
+        """
+        Append the next chunk to the unread part of the buffer.
+
+        Returns:
+            bool: False if the stream is exhausted.
+        """
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        self._buffer = self._buffer[self._position :] + chunk
+        self._position = 0
+        return True
+
+
+def read_raw_message(
+    data: str, max_body_bytes: Optional[int] = None, chunk_size: int = CHUNK_SIZE
+) -> RawMessage:
+    """
+    Scan a raw message for its headers and body text.
+
+    The first text/plain part that is not an attachment is the body. Until
+    one is found, the first text/html part is kept as a fallback. Scanning
+    stops once the text/plain part is read, so the rest of the message is
+    never decoded.
+
+    Args:
+        data (str): The message's base64url ``raw`` field.
+        max_body_bytes (Optional[int]): Cut the body to this many decoded
+            bytes (None for no limit).
+        chunk_size (int): Base64 characters decoded at a time.
+
+    Returns:
+        RawMessage: The top-level headers and the body text.
+    """
+    reader = _LineReader(decoded_chunks(data, chunk_size))
+    headers = reader.read_headers()
+    if headers.get_content_maintype() != "multipart":
+        if headers.get_content_maintype() != "text":
+            return RawMessage(headers, "", None)
+        text = _read_text(reader, headers, [], max_body_bytes)
+        return RawMessage(headers, text, headers.get_content_type())
+
+    boundaries = [_boundary(headers)]
+    html: Optional[str] = None
+    while reader.skip_to_dashes():
+        delimiter = reader.readline().rstrip()
+        depth = _boundary_depth(delimiter, boundaries)
+        if depth is None:
+            continue
+        if delimiter.endswith(b"--") and delimiter[:-2] == b"--" + boundaries[depth]:
+            # Closing delimiter: the rest is the enclosing part's epilogue.
+            del boundaries[depth:]
+            continue
+        del boundaries[depth + 1 :]
+
+        part = reader.read_headers()
+        if part.get_content_maintype() == "multipart":
+            boundaries.append(_boundary(part))
+            continue
+        if part.get_content_disposition() == "attachment":
+            continue
+        mime_type = part.get_content_type()
+        if mime_type == "text/plain":
+            return RawMessage(
+                headers, _read_text(reader, part, boundaries, max_body_bytes), mime_type
+            )
+        if mime_type == "text/html" and html is None:
+            html = _read_text(reader, part, boundaries, max_body_bytes)
+
+    if html is None:
+        return RawMessage(headers, "", None)
+    return RawMessage(headers, html, "text/html")
+
+
+def _boundary(part: Message) -> bytes:
+    """
+    Get a multipart part's boundary.
+
+    Args:
+        part (Message): The part's headers.
+
+    Returns:
+        bytes: The boundary, or b"" if the part declares none.
+    """
+    return (part.get_boundary() or "").encode("utf-8")
+
+
+def _boundary_depth(line: bytes, boundaries: List[bytes]) -> Optional[int]:
+    """
+    Find which open boundary a line delimits, innermost first.
+
+    Args:
+        line (bytes): The line, without trailing whitespace.
+        boundaries (List[bytes]): Open boundaries, outermost first.
+
+    Returns:
+        Optional[int]: The index of the boundary, or None if the line is
+        not a delimiter.
+    """
+    for depth in range(len(boundaries) - 1, -1, -1):
+        delimiter = b"--" + boundaries[depth]
+        if line == delimiter or line == delimiter + b"--":
+            return depth
+    return None
+
+
+def _read_text(
+    reader: _LineReader,
+    part: Message,
+    boundaries: List[bytes],
+    max_body_bytes: Optional[int],
+) -> str:
+    """
+    Read and decode a text part's body, up to its closing delimiter.
+
+    Encoded data is only collected up to what ``max_body_bytes`` can need.
+    The delimiter line is left unread.
+
+    Args:
+        reader (_LineReader): Positioned at the start of the body.
+        part (Message): The part's headers.
+        boundaries (List[bytes]): Open boundaries, outermost first.
+        max_body_bytes (Optional[int]): Cut the body to this many decoded
+            bytes (None for no limit).
+
+    Returns:
+        str: The decoded text.
+    """
+    # Quoted-printable takes at most 3 bytes per byte, plus soft line breaks.
+    limit = None if max_body_bytes is None else 4 * max_body_bytes + _MAX_LINE
+    lines: List[bytes] = []
+    size = 0
+    while limit is None or size < limit:
+        line = reader.readline()
+        if not line:
+            break
+        if (
+            line.startswith(b"--")
+            and _boundary_depth(line.rstrip(), boundaries) is not None
+        ):
+            reader.unread(line)
+            if lines:
+                # The line break before a delimiter belongs to the delimiter.
+                lines[-1] = lines[-1].rstrip(b"\r\n")
+            break
+        lines.append(line)
+        size += len(line)
+
+    encoded = b"".join(lines)
+    encoding = part.get("Content-Transfer-Encoding", "7bit").strip().lower()
+    if encoding == "base64":
+        encoded = b"".join(encoded.split())
+        raw = binascii.a2b_base64(encoded[: len(encoded) // 4 * 4])
+    elif encoding == "quoted-printable":
+        raw = binascii.a2b_qp(encoded)
+    else:
+        raw = encoded
+    if max_body_bytes is not None:
+        raw = raw[:max_body_bytes]
+
+    charset = part.get_content_charset() or "utf-8"
+    try:
+        return raw.decode(charset, "ignore")
+    except LookupError:
+        return raw.decode("utf-8", "ignore")
@@ -0,0 +1,143 @@
+"""Parallel message fetching with one Gmail client per worker thread."""
+
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from types import TracebackType
+from typing import Callable, Iterable, Iterator, List, Optional, Set, Type
+
+from .client import DEFAULT_BATCH_SIZE, BatchFetchResult, GmailClient
+from .parser import FORMAT_FULL
+
+DEFAULT_WORKERS = 4
+
+
+class ParallelFetcher:
+    """Fetch message details on a pool of worker threads.
+
+    googleapiclient service objects and the httplib2 transports under them
+    are not thread-safe, so every worker thread builds its own client with
+    ``client_factory`` the first time it needs one and keeps it for the
+    fetcher's lifetime. Chunks of IDs are handed out to the workers, and each
+    chunk is fetched with batch requests (or one request per message), so
+    throughput grows with the number of workers until the API quota is the
+    limit.
+
+    Can be used as a context manager, which shuts the pool down on exit.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], GmailClient],
+        workers: int = DEFAULT_WORKERS,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        use_batch: bool = True,
+        message_format: str = FORMAT_FULL,
+    ):
+        """
+        Initialize the fetcher.
+
+        Args:
+            client_factory (Callable[[], GmailClient]): Builds a new client,
+                with its own service and transport, for a worker thread.
+            workers (int): Number of worker threads.
+            batch_size (int): Messages per batch request.
+            use_batch (bool): Fetch each chunk with batch requests instead of
+                one request per message.
+            message_format (str): "full", "metadata" to leave the bodies
+                for later, or "raw" to scan the RFC 822 messages.
+        """
+        self.client_factory = client_factory
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.use_batch = use_batch
+        self.message_format = message_format
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="gmail-fetch"
+        )
+
+    def __enter__(self) -> "ParallelFetcher":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the worker pool, cancelling chunks not started yet."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _client(self) -> GmailClient:
+        """
+        Return the calling worker thread's client, building it on first use.
+
+        Returns:
+            GmailClient: The thread's own client.
+        """
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self.client_factory()
+            self._local.client = client
+        return client
+
+    def fetch_details(self, message_ids: List[str]) -> BatchFetchResult:
+        """
+        Fetch one chunk of messages on the calling thread's client.
+
+        Args:
+            message_ids (List[str]): The Gmail message IDs to fetch.
+
+        Returns:
+            BatchFetchResult: Parsed emails and per-ID failures.
+        """
+        client = self._client()
+        if self.use_batch:
+            return client.get_messages_details(
+                message_ids,
+                batch_size=self.batch_size,
+                message_format=self.message_format,
+            )
+
+        emails = []
+        failures = {}
+        for message_id in message_ids:
+            email = client.get_message_details(message_id, self.message_format)
+            if email is None:
+                failures[message_id] = "Could not fetch message"
+            else:
+                emails.append(email)
+        return BatchFetchResult(emails=emails, failures=failures)
+
+    def fetch(self, id_chunks: Iterable[List[str]]) -> Iterator[BatchFetchResult]:
+        """
+        Fetch chunks of messages in parallel, yielding results as they finish.
+
+        Chunks are pulled from ``id_chunks`` lazily, keeping at most two per
+        worker queued, so a streaming listing is consumed while earlier
+        chunks are being fetched. Empty chunks are skipped.
+
+        Args:
+            id_chunks (Iterable[List[str]]): Chunks of message IDs.
+
+        Yields:
+            BatchFetchResult: One result per chunk, in completion order.
+        """
+        pending: Set["Future[BatchFetchResult]"] = set()
+        chunks = iter(id_chunks)
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < 2 * self.workers:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                elif chunk:
+                    pending.add(self._executor.submit(self.fetch_details, chunk))
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
@@ -0,0 +1,348 @@
+"""Quota-aware rate limiting and retries for Gmail API requests."""
+
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from googleapiclient.errors import HttpError
+
+logger = logging.getLogger(__name__)
+
+# Quota units charged per API method, from the Gmail API usage limits.
+QUOTA_UNITS: Dict[str, int] = {
+    "gmail.users.getProfile": 1,
+    "gmail.users.labels.list": 1,
+    "gmail.users.labels.create": 5,
+    "gmail.users.history.list": 2,
+    "gmail.users.messages.list": 5,
+    "gmail.users.messages.get": 5,
+    "gmail.users.messages.modify": 5,
+    "gmail.users.messages.batchModify": 50,
+}
+DEFAULT_QUOTA_UNITS = 5
+
+# Per-user limit of 15,000 quota units per minute.
+DEFAULT_UNITS_PER_SECOND = 250.0
+
+# Statuses worth retrying: rate limiting and transient server errors.
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# 403 reasons Gmail uses for rate limiting instead of 429.
+RATE_LIMIT_REASONS = frozenset({"rateLimitExceeded", "userRateLimitExceeded"})
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 32.0
+
+
+def quota_units(method_id: Optional[str]) -> int:
+    """
+    Get the quota cost of an API method.
+
+    Args:
+        method_id (Optional[str]): The discovery method ID, e.g.
+            "gmail.users.messages.get".
+
+    Returns:
+        int: The quota units the method consumes.
+    """
+    return QUOTA_UNITS.get(method_id or "", DEFAULT_QUOTA_UNITS)
+
+
+def is_rate_limited(status: int, content: Any = None) -> bool:
+    """
+    Check whether an error response means the caller is being throttled.
+
+    Args:
+        status (int): The HTTP status code.
+        content (Any): The response body, used to tell rate-limit 403s from
+            permission errors.
+
+    Returns:
+        bool: True for 429s and rate-limit 403s.
+    """
+    if status == 429:
+        return True
+    if status != 403 or not content:
+        return False
+    try:
+        if isinstance(content, bytes):
+            content = content.decode("utf-8", "ignore")
+        error = json.loads(content).get("error", {})
+    except (ValueError, AttributeError):
+        return False
+    return any(
+        item.get("reason") in RATE_LIMIT_REASONS for item in error.get("errors", [])
+    )
+
+
+def is_retryable(status: int, content: Any = None) -> bool:
+    """
+    Check whether a failed request may succeed if retried.
+
+    Args:
+        status (int): The HTTP status code.
+        content (Any): The response body.
+
+    Returns:
+        bool: True for throttling and transient server errors.
+    """
+    return status in RETRYABLE_STATUSES or is_rate_limited(status, content)
+
+
+def retry_after(headers: Any) -> Optional[float]:
+    """
+    Read a Retry-After header given in seconds.
+
+    Args:
+        headers (Any): The response headers (a case-insensitive mapping or
+            an httplib2 response, whose keys are lowercase).
+
+    Returns:
+        Optional[float]: The delay in seconds, or None if absent or given as
+        an HTTP date.
+    """
+    if headers is None:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket metering quota units.
+
+    Refills at ``rate`` units per second up to ``capacity``. :meth:`acquire`
+    blocks until enough units are available, so callers sharing a bucket
+    together stay under the quota.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Initialize the bucket, full.
+
+        Args:
+            rate (float): Units added per second.
+            capacity (Optional[float]): Maximum burst, defaults to one
+                second's worth of units.
+            clock (Callable[[], float]): Monotonic clock, in seconds.
+            sleep (Callable[[float], None]): Sleeps for a number of seconds.
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, units: float) -> float:
+        """
+        Take units from the bucket, waiting for them if needed.
+
+        Requests larger than the capacity wait for a full bucket and leave it
+        in debt, so they are delayed rather than rejected.
+
+        Args:
+            units (float): The units to consume.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            needed = min(units, self.capacity)
+            wait = max(0.0, (needed - self._tokens) / self.rate)
+            # Reserve the units now so concurrent callers queue behind us.
+            self._tokens -= units
+        if wait:
+            self._sleep(wait)
+        return wait
+
+
+class AdaptiveConcurrency:
+    """Concurrency limit that adapts to throttling (AIMD).
+
+    The limit is halved whenever a request is throttled and grows by one
+    after ``limit`` consecutive successes, up to ``maximum``, so callers
+    sharing it back off quickly under sustained 429s and creep back towards
+    the quota once they stop.
+    """
+
+    def __init__(self, maximum: int):
+        """
+        Initialize the limit at its maximum.
+
+        Args:
+            maximum (int): The highest allowed number of requests in flight.
+        """
+        self.maximum = max(1, maximum)
+        self.limit = self.maximum
+        self._active = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Wait until fewer than ``limit`` requests are in flight."""
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+
+    def release(self, throttled: bool = False, succeeded: bool = True) -> None:
+        """
+        Finish a request and adjust the limit.
+
+        Args:
+            throttled (bool): Whether the request was rate limited.
+            succeeded (bool): Whether the request succeeded. Other failures
+                leave the limit unchanged.
+        """
+        with self._condition:
+            self._active -= 1
+            if throttled:
+                self._decrease()
+            elif succeeded:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.maximum:
+                    self._successes = 0
+                    self.limit += 1
+            self._condition.notify_all()
+
+    def decrease(self) -> None:
+        """Halve the limit after throttling reported outside :meth:`release`."""
+        with self._condition:
+            self._decrease()
+
+    def _decrease(self) -> None:
+        self._successes = 0
+        if self.limit > 1:
+            self.limit //= 2
+            logger.info(f"Throttled; concurrency limit is now {self.limit}")
+
+
+class RateLimiter:
+    """Central request execution for the Gmail API.
+
+    Every request waits for its quota units in a shared :class:`TokenBucket`
+    and for a slot in an :class:`AdaptiveConcurrency` limit, then runs.
+    Throttled and transient failures are retried with exponential backoff and
+    full jitter, waiting at least as long as the server's Retry-After. One
+    limiter can be shared by clients on several threads.
+    """
+
+    def __init__(
+        self,
+        units_per_second: float = DEFAULT_UNITS_PER_SECOND,
+        max_concurrency: int = 1,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            units_per_second (float): Quota units allowed per second.
+            max_concurrency (int): Maximum number of requests in flight.
+            max_retries (int): Retries before a request's error is raised.
+            base_delay (float): Backoff before the first retry, in seconds.
+            max_delay (float): Upper bound of the backoff, in seconds.
+            clock (Callable[[], float]): Monotonic clock, in seconds.
+            sleep (Callable[[float], None]): Sleeps for a number of seconds.
+        """
+        self.bucket = TokenBucket(units_per_second, clock=clock, sleep=sleep)
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+
+    def backoff(self, attempt: int, server_delay: Optional[float] = None) -> float:
+        """
+        Compute the delay before a retry.
+
+        Args:
+            attempt (int): The number of the retry, starting at 0.
+            server_delay (Optional[float]): The server's Retry-After delay.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        if server_delay is not None:
+            delay = max(delay, server_delay)
+        return delay
+
+    def wait(self, attempt: int, server_delay: Optional[float] = None) -> None:
+        """
+        Sleep before a retry.
+
+        Args:
+            attempt (int): The number of the retry, starting at 0.
+            server_delay (Optional[float]): The server's Retry-After delay.
+        """
+        self._sleep(self.backoff(attempt, server_delay))
+
+    def execute(self, request: Any, units: Optional[int] = None) -> Any:
+        """
+        Execute a request within the quota, retrying retryable failures.
+
+        Args:
+            request (Any): A googleapiclient request or batch, anything with
+                an ``execute()`` method.
+            units (Optional[int]): Quota units the request costs; derived from
+                its method ID when omitted.
+
+        Returns:
+            Any: The request's result.
+
+        Raises:
+            HttpError: If the request fails with a non-retryable status, or
+                still fails after ``max_retries`` retries.
+        """
+        if units is None:
+            units = quota_units(getattr(request, "methodId", None))
+        attempt = 0
+        while True:
+            self.bucket.acquire(units)
+            self.concurrency.acquire()
+            throttled = False
+            succeeded = False
+            try:
+                result = request.execute()
+                succeeded = True
+                return result
+            except HttpError as error:
+                status = error.resp.status
+                throttled = is_rate_limited(status, error.content)
+                if attempt >= self.max_retries or not is_retryable(
+                    status, error.content
+                ):
+                    raise
+                delay = self.backoff(attempt, retry_after(error.resp))
+                logger.warning(
+                    f"Request failed with HTTP {status}; retry {attempt + 1} of "
+                    f"{self.max_retries} in {delay:.1f}s"
+                )
+            finally:
+                self.concurrency.release(throttled, succeeded)
+            self._sleep(delay)
+            attempt += 1
@@ -3,7 +3,7 @@
 import argparse
 import sys
 
-from gmail_automation.utils.helpers import load_env_file, setup_logging
+from gmail_automation.utils.helpers import load_env_file, positive_int, setup_logging
 
 
 def main():
@@ -18,7 +18,15 @@ def main():
         epilog="""
 Examples:
   gmail-automation fetch --query "is:unread" --max-results 50
+  gmail-automation fetch --incremental
+  gmail-automation fetch --workers 4
+  gmail-automation fetch --async --concurrency 20
+  gmail-automation fetch --format metadata
   gmail-automation process --rules custom_rules.json --dry-run
+  gmail-automation process --vectorize
+  gmail-automation process --full
+  gmail-automation process --create-labels
+  gmail-automation search "invoice" --limit 10
         """,
     )
 
@@ -30,6 +38,54 @@ Examples:
     fetch_parser.add_argument(
         "--max-results", type=int, default=100, help="Max emails to fetch"
     )
+    fetch_parser.add_argument(
+        "--batch-size",
+        type=positive_int,
+        default=50,
+        help="Messages per Gmail batch request",
+    )
+    fetch_parser.add_argument(
+        "--no-batch", action="store_true", help="Fetch messages one at a time"
+    )
+    fetch_parser.add_argument(
+        "--commit-every",
+        type=positive_int,
+        default=500,
+        help="New emails per DB commit",
+    )
+    fetch_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Sync only changes since the last checkpoint",
+    )
+    fetch_parser.add_argument(
+        "--workers", type=positive_int, default=1, help="Threads fetching in parallel"
+    )
+    fetch_parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Fetch messages concurrently (requires httpx)",
+    )
+    fetch_parser.add_argument(
+        "--concurrency",
+        type=positive_int,
+        default=10,
+        help="Requests in flight with --async",
+    )
+    fetch_parser.add_argument(
+        "--format",
+        choices=["full", "metadata", "raw"],
+        default="full",
+        help="Fetch full messages, headers only with bodies fetched on demand, "
+        "or raw RFC 822 messages scanned in chunks",
+    )
+    fetch_parser.add_argument(
+        "--max-body-bytes",
+        type=int,
+        default=1_048_576,
+        help="Truncate stored bodies to this many bytes, 0 for no limit",
+    )
 
     # Process command
     process_parser = subparsers.add_parser("process", help="Process emails with rules")
@@ -39,6 +95,48 @@ Examples:
     process_parser.add_argument(
         "--dry-run", action="store_true", help="Preview actions without executing"
     )
+    process_parser.add_argument(
+        "--optimize", action="store_true", help="Order conditions by cost"
+    )
+    process_parser.add_argument(
+        "--vectorize", action="store_true", help="Evaluate rules with NumPy"
+    )
+    process_parser.add_argument(
+        "--batch-size", type=positive_int, default=10_000, help="Emails per batch"
+    )
+    process_parser.add_argument(
+        "--full", action="store_true", help="Evaluate all emails, not only changed"
+    )
+    process_parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Apply label changes concurrently (requires httpx)",
+    )
+    process_parser.add_argument(
+        "--concurrency",
+        type=positive_int,
+        default=10,
+        help="Requests in flight with --async",
+    )
+    process_parser.add_argument(
+        "--create-labels",
+        action="store_true",
+        help="Create missing destination labels first",
+    )
+
+    # Search command
+    search_parser = subparsers.add_parser("search", help="Search stored emails")
+    search_parser.add_argument("query", help="Text to search for")
+    search_parser.add_argument(
+        "--limit", type=int, default=20, help="Maximum number of results"
+    )
+    search_parser.add_argument(
+        "--field", choices=["subject", "body", "sender"], help="Only search one field"
+    )
+    search_parser.add_argument(
+        "--raw", action="store_true", help="Treat the query as an FTS5 expression"
+    )
 
     # Global options
     parser.add_argument(
@@ -64,7 +162,25 @@ Examples:
             args.query,
             "--max-results",
             str(args.max_results),
+            "--batch-size",
+            str(args.batch_size),
+            "--commit-every",
+            str(args.commit_every),
+            "--workers",
+            str(args.workers),
+            "--concurrency",
+            str(args.concurrency),
+            "--format",
+            args.format,
+            "--max-body-bytes",
+            str(args.max_body_bytes),
         ]
+        if args.no_batch:
+            sys_argv.append("--no-batch")
+        if args.incremental:
+            sys_argv.append("--incremental")
+        if args.use_async:
+            sys_argv.append("--async")
         sys.argv = sys_argv
         scripts.fetch_emails.main()
 
@@ -75,12 +191,37 @@ Examples:
             "process_rules.py",
             "--rules",
             args.rules,
+            "--batch-size",
+            str(args.batch_size),
+            "--concurrency",
+            str(args.concurrency),
         ]
         if args.dry_run:
             sys_argv.append("--dry-run")
+        if args.optimize:
+            sys_argv.append("--optimize")
+        if args.vectorize:
+            sys_argv.append("--vectorize")
+        if args.full:
+            sys_argv.append("--full")
+        if args.use_async:
+            sys_argv.append("--async")
+        if args.create_labels:
+            sys_argv.append("--create-labels")
         sys.argv = sys_argv
         scripts.process_rules.main()
 
+    elif args.command == "search":
+        import scripts.search_emails
+
+        sys_argv = ["search_emails.py", args.query, "--limit", str(args.limit)]
+        if args.field:
+            sys_argv.extend(["--field", args.field])
+        if args.raw:
+            sys_argv.append("--raw")
+        sys.argv = sys_argv
+        scripts.search_emails.main()
+
 
 if __name__ == "__main__":
     main()
@@ -1,41 +1,95 @@
 """Action execution for email operations."""
 
+import asyncio
+import json
 import logging
-from typing import List
+import math
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, Optional, Sequence, Set, Tuple, Union
+
+from pydantic import BaseModel
 
 from ..database.connection import Database
 from ..database.models import Email
-from ..gmail.client import GmailClient
+from ..database.store import set_labels
+from ..gmail.async_client import AsyncGmailClient
+from ..gmail.client import MAX_BATCH_MODIFY_SIZE, GmailClient
+from ..utils.helpers import chunked
 from .engine import Action
 
 logger = logging.getLogger(__name__)
 
+# (label IDs to add, label IDs to remove)
+LabelDelta = Tuple[FrozenSet[str], FrozenSet[str]]
+
+# One batchModify call: (label IDs to add, label IDs to remove, new label IDs
+# of each email in the call)
+_Batch = Tuple[FrozenSet[str], FrozenSet[str], Dict[str, List[str]]]
+
+
+class ExecutionStats(BaseModel):
+    """Statistics for a batched action run.
+
+    Attributes:
+        api_calls (int): Number of batchModify calls issued.
+        emails_modified (int): Emails whose labels were changed successfully.
+        emails_failed (int): Emails whose label change failed.
+        emails_unchanged (int): Emails skipped because their stored labels
+            already reflected the planned change.
+        api_calls_avoided (int): batchModify calls saved by dropping label
+            changes that were already in effect.
+    """
+
+    api_calls: int = 0
+    emails_modified: int = 0
+    emails_failed: int = 0
+    emails_unchanged: int = 0
+    api_calls_avoided: int = 0
+
 
 class ActionExecutor:
     """Execute actions on emails."""
 
-    def __init__(self, gmail_client: GmailClient, database: Database):
+    def __init__(
+        self,
+        gmail_client: Union[GmailClient, AsyncGmailClient],
+        database: Database,
+    ):
         """
         Initialize the ActionExecutor.
 
         Args:
-            gmail_client (GmailClient): The Gmail API client.
+            gmail_client (Union[GmailClient, AsyncGmailClient]): The Gmail
+                API client. With an AsyncGmailClient, label changes must be
+                planned and applied with :meth:`flush_async`.
             database (Database): The database connection manager.
         """
         self.gmail_client = gmail_client
         self.database = database
+        # Email ID -> (labels to add, labels to remove, stored labels)
+        self._planned: Dict[str, Tuple[Set[str], Set[str], Tuple[str, ...]]] = {}
+        # Email ID -> labels after a change made by the current execute_actions
+        self._results: Dict[str, List[str]] = {}
 
     def execute_actions(self, email: Email, actions: List[Action]) -> bool:
         """
         Execute a list of actions on an email.
 
+        The email's new labels and read state are stored in the database
+        before returning, in one transaction for all of its actions.
+
         Args:
             email (Email): The email to act on.
             actions (List[Action]): List of actions to execute.
 
         Returns:
             bool: True if all actions succeeded, False otherwise.
+
+        Raises:
+            TypeError: If the executor uses an AsyncGmailClient.
         """
+        if isinstance(self.gmail_client, AsyncGmailClient):
+            raise TypeError("execute_actions() needs a synchronous GmailClient")
         success = True
 
         for action in actions:
@@ -50,6 +104,9 @@ class ActionExecutor:
                 logger.error(f"Error executing action {action.type}: {e}")
                 success = False
 
+        if self._results:
+            self._store_labels(self._results)
+            self._results = {}
         return success
 
     def _execute_single_action(self, email: Email, action: Action) -> bool:
@@ -85,13 +142,12 @@ class ActionExecutor:
         Returns:
             bool: True if successful, False otherwise.
         """
+        if email.is_read:
+            logger.debug(f"Email {email.id} is already read")
+            return True
         if self.gmail_client.mark_as_read(email.id):
-            # Update database
-            with self.database.get_session() as session:
-                db_email = session.get(Email, email.id)
-                if db_email:
-                    db_email.is_read = True
-                    logger.info(f"Marked email {email.id} as read")
+            self._record_result(email, self._label_delta(Action(type="mark_read")))
+            logger.info(f"Marked email {email.id} as read")
             return True
         return False
 
@@ -105,13 +161,12 @@ class ActionExecutor:
         Returns:
             bool: True if successful, False otherwise.
         """
+        if not email.is_read:
+            logger.debug(f"Email {email.id} is already unread")
+            return True
         if self.gmail_client.mark_as_unread(email.id):
-            # Update database
-            with self.database.get_session() as session:
-                db_email = session.get(Email, email.id)
-                if db_email:
-                    db_email.is_read = False
-                    logger.info(f"Marked email {email.id} as unread")
+            self._record_result(email, self._label_delta(Action(type="mark_unread")))
+            logger.info(f"Marked email {email.id} as unread")
             return True
         return False
 
@@ -126,7 +181,303 @@ class ActionExecutor:
         Returns:
             bool: True if successful, False otherwise.
         """
+        delta = self._label_delta(Action(type="move_message", destination=destination))
+        if delta is not None and not any(self._effective_delta(email, *delta)):
+            logger.debug(f"Email {email.id} is already in {destination}")
+            return True
         if self.gmail_client.move_to_label(email.id, destination):
+            self._record_result(email, delta)
             logger.info(f"Moved email {email.id} to {destination}")
             return True
         return False
+
+    def plan_actions(self, email: Email, actions: List[Action]) -> bool:
+        """
+        Queue an email's label actions to be applied in bulk by :meth:`flush`.
+
+        Actions planned for the same email are merged into one label change,
+        with later actions taking precedence over earlier ones. The email's
+        stored labels and read state are kept so :meth:`flush` can drop the
+        parts of the change that are already in effect.
+
+        Args:
+            email (Email): The email to act on.
+            actions (List[Action]): List of actions to plan.
+
+        Returns:
+            bool: True if every action could be planned, False otherwise.
+        """
+        add, remove, _ = self._planned.get(email.id, (set(), set(), frozenset()))
+        success = True
+
+        for action in actions:
+            delta = self._label_delta(action)
+            if delta is None:
+                logger.error(f"Failed to plan action {action.type} on email {email.id}")
+                success = False
+                continue
+            add_labels, remove_labels = delta
+            add = (add - remove_labels) | add_labels
+            remove = (remove - add_labels) | remove_labels
+
+        if add or remove:
+            self._planned[email.id] = (add, remove, self._current_labels(email))
+        return success
+
+    def flush(self) -> ExecutionStats:
+        """
+        Apply all planned label changes with as few API calls as possible,
+        and store every change Gmail accepted in the database.
+
+        Label changes are first reduced to the labels each email does not
+        already have, or has and should lose; emails left with no change are
+        skipped. Emails sharing an identical (add, remove) label change are
+        then grouped and sent through ``batchModify`` in chunks of up to 1,000
+        IDs. After each call, the new labels and read state of the emails it
+        modified are written with bulk statements in one transaction, so the
+        database never lags Gmail by more than one chunk.
+
+        Returns:
+            ExecutionStats: Statistics for the flushed run.
+
+        Raises:
+            TypeError: If the executor uses an AsyncGmailClient.
+        """
+        if isinstance(self.gmail_client, AsyncGmailClient):
+            raise TypeError("Use flush_async() with an AsyncGmailClient")
+        stats, batches = self._prepare_flush()
+        for add, remove, new_labels in batches:
+            modified = self.gmail_client.batch_modify_labels(
+                list(new_labels), add_labels=sorted(add), remove_labels=sorted(remove)
+            )
+            self._store_batch(stats, new_labels, modified)
+        return self._finish_flush(stats, batches)
+
+    async def flush_async(self, gmail_client: AsyncGmailClient) -> ExecutionStats:
+        """
+        Like :meth:`flush`, but send every ``batchModify`` call concurrently
+        through an async client.
+
+        Each call's results are stored as soon as it completes.
+
+        Args:
+            gmail_client (AsyncGmailClient): The async Gmail API client.
+
+        Returns:
+            ExecutionStats: Statistics for the flushed run.
+        """
+        stats, batches = self._prepare_flush()
+
+        async def apply(batch: _Batch) -> None:
+            add, remove, new_labels = batch
+            modified = await gmail_client.batch_modify_labels(
+                list(new_labels), add_labels=sorted(add), remove_labels=sorted(remove)
+            )
+            self._store_batch(stats, new_labels, modified)
+
+        await asyncio.gather(*(apply(batch) for batch in batches))
+        return self._finish_flush(stats, batches)
+
+    def _prepare_flush(self) -> Tuple[ExecutionStats, List[_Batch]]:
+        """
+        Split the planned label changes into ``batchModify`` calls.
+
+        Returns:
+            Tuple[ExecutionStats, List[_Batch]]: The run's statistics so far
+            and its batches. ``api_calls_avoided`` temporarily holds the number
+            of calls the unreduced changes would have needed.
+        """
+        stats = ExecutionStats()
+        planned, self._planned = self._planned, {}
+        requested: Dict[LabelDelta, int] = defaultdict(int)
+        groups: Dict[LabelDelta, List[str]] = defaultdict(list)
+        for email_id, (planned_add, planned_remove, current) in planned.items():
+            requested[(frozenset(planned_add), frozenset(planned_remove))] += 1
+            missing = planned_add.difference(current)
+            present = planned_remove.intersection(current)
+            if missing or present:
+                groups[(frozenset(missing), frozenset(present))].append(email_id)
+            else:
+                stats.emails_unchanged += 1
+
+        stats.api_calls_avoided = sum(
+            math.ceil(count / MAX_BATCH_MODIFY_SIZE) for count in requested.values()
+        )
+        batches = [
+            (
+                add,
+                remove,
+                {
+                    email_id: _apply_delta(planned[email_id][2], add, remove)
+                    for email_id in chunk
+                },
+            )
+            for (add, remove), email_ids in groups.items()
+            for chunk in chunked(email_ids, MAX_BATCH_MODIFY_SIZE)
+        ]
+        return stats, batches
+
+    def _store_batch(
+        self,
+        stats: ExecutionStats,
+        new_labels: Dict[str, List[str]],
+        modified: List[str],
+    ) -> None:
+        """
+        Count a ``batchModify`` call and store the emails Gmail modified.
+
+        Args:
+            stats (ExecutionStats): The run's statistics.
+            new_labels (Dict[str, List[str]]): New label IDs of each email in
+                the call.
+            modified (List[str]): IDs of the emails Gmail modified.
+        """
+        stats.api_calls += 1
+        stats.emails_modified += len(modified)
+        stats.emails_failed += len(new_labels) - len(modified)
+        if modified:
+            self._store_labels(
+                {email_id: new_labels[email_id] for email_id in modified}
+            )
+
+    def _finish_flush(
+        self, stats: ExecutionStats, batches: List[_Batch]
+    ) -> ExecutionStats:
+        """
+        Complete and log the statistics of a flush.
+
+        Args:
+            stats (ExecutionStats): The run's statistics.
+            batches (List[_Batch]): The run's batches.
+
+        Returns:
+            ExecutionStats: The completed statistics.
+        """
+        stats.api_calls_avoided -= stats.api_calls
+        groups = {(add, remove) for add, remove, _ in batches}
+        logger.info(
+            f"Modified {stats.emails_modified} emails in {len(groups)} label "
+            f"groups with {stats.api_calls} API calls "
+            f"({stats.emails_failed} failed, {stats.emails_unchanged} already "
+            f"up to date, {stats.api_calls_avoided} calls avoided)"
+        )
+        return stats
+
+    def _store_labels(self, labels_by_id: Dict[str, List[str]]) -> None:
+        """
+        Write new labels and read states to the database in one transaction.
+
+        Args:
+            labels_by_id (Dict[str, List[str]]): New label IDs per email ID.
+        """
+        with self.database.get_session() as session:
+            set_labels(session, labels_by_id, update_read_state=True)
+
+    def _record_result(self, email: Email, delta: Optional[LabelDelta]) -> None:
+        """
+        Remember an email's labels after a change Gmail accepted, to be stored
+        when :meth:`execute_actions` returns.
+
+        The email itself is updated too, so later actions see its new state.
+
+        Args:
+            email (Email): The modified email.
+            delta (Optional[LabelDelta]): The label change that was applied.
+        """
+        if delta is None:
+            return
+        labels = _apply_delta(self._current_labels(email), *delta)
+        self._results[email.id] = labels
+        email.labels = json.dumps(labels)
+        email.is_read = "UNREAD" not in labels
+
+    def _current_labels(self, email: Email) -> Tuple[str, ...]:
+        """
+        Return the label IDs an email has according to the database.
+
+        The UNREAD label follows ``is_read``, which is kept in sync with it.
+
+        Args:
+            email (Email): The stored email.
+
+        Returns:
+            Tuple[str, ...]: The email's label IDs, in stored order.
+        """
+        labels = email.get_labels()
+        unread_label_id = self.gmail_client.get_label_id_by_name("UNREAD")
+        if unread_label_id:
+            if email.is_read:
+                labels = [label for label in labels if label != unread_label_id]
+            elif unread_label_id not in labels:
+                labels.append(unread_label_id)
+        return tuple(labels)
+
+    def _effective_delta(
+        self, email: Email, add: FrozenSet[str], remove: FrozenSet[str]
+    ) -> LabelDelta:
+        """
+        Reduce a label change to the part not already in effect for an email.
+
+        Args:
+            email (Email): The stored email.
+            add (FrozenSet[str]): Label IDs to add.
+            remove (FrozenSet[str]): Label IDs to remove.
+
+        Returns:
+            LabelDelta: The labels still to add and remove.
+        """
+        current = self._current_labels(email)
+        return add.difference(current), remove.intersection(current)
+
+    def _label_delta(self, action: Action) -> Optional[LabelDelta]:
+        """
+        Translate an action into the label IDs it adds and removes.
+
+        Args:
+            action (Action): The action to translate.
+
+        Returns:
+            Optional[LabelDelta]: The label change, or None if the action type
+            is unknown or a required label does not exist.
+        """
+        action_type = action.type.lower()
+
+        if action_type in ("mark_read", "mark_unread"):
+            unread_label_id = self.gmail_client.get_label_id_by_name("UNREAD")
+            if not unread_label_id:
+                logger.error("Could not find the 'UNREAD' label ID.")
+                return None
+            if action_type == "mark_read":
+                return frozenset(), frozenset([unread_label_id])
+            return frozenset([unread_label_id]), frozenset()
+        elif action_type == "move_message":
+            destination_label_id = self.gmail_client.get_label_id_by_name(
+                action.destination
+            )
+            if not destination_label_id:
+                logger.error(f"Destination label '{action.destination}' not found.")
+                return None
+            inbox_label_id = self.gmail_client.get_label_id_by_name("INBOX")
+            remove = [inbox_label_id] if inbox_label_id else []
+            return frozenset([destination_label_id]), frozenset(remove)
+        else:
+            logger.warning(f"Unknown action type: {action_type}")
+            return None
+
+
+def _apply_delta(
+    labels: Sequence[str], add: FrozenSet[str], remove: FrozenSet[str]
+) -> List[str]:
+    """
+    Apply a label change to a list of label IDs, keeping their order.
+
+    Args:
+        labels (Sequence[str]): The current label IDs.
+        add (FrozenSet[str]): Label IDs to add.
+        remove (FrozenSet[str]): Label IDs to remove.
+
+    Returns:
+        List[str]: The new label IDs, with added ones sorted at the end.
+    """
+    kept = [label for label in labels if label not in remove]
+    return kept + sorted(add.difference(kept))
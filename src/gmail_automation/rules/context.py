@@ -0,0 +1,113 @@
+"""Run-scoped state for evaluating rules."""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import ColumnElement
+
+from ..database.models import Email
+
+logger = logging.getLogger(__name__)
+
+# Relative date units mapped to their length. Months and years are approximate.
+DATE_UNITS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "month": timedelta(days=30),
+    "year": timedelta(days=365),
+}
+
+
+class EvaluationContext(dict):
+    """Date expressions resolved to absolute cutoffs for one evaluation run.
+
+    Maps each date expression used by a rule (e.g. "7 days ago" or
+    "2024-01-31") to the naive UTC datetime it stands for, parsing it the
+    first time it is looked up. Relative expressions are resolved against a
+    single ``now`` fixed when the context is created, so every email in a run
+    is compared against the same cutoffs. Invalid expressions map to None.
+    """
+
+    __slots__ = ("now",)
+
+    def __init__(self, now: Optional[datetime] = None):
+        """
+        Initialize the context.
+
+        Args:
+            now (Optional[datetime]): Reference time for relative expressions,
+                as naive UTC. Defaults to the current time.
+        """
+        super().__init__()
+        self.now = now or datetime.utcnow()
+
+    def __missing__(self, expression: str) -> Optional[datetime]:
+        cutoff = parse_date_expression(expression, self.now)
+        self[expression] = cutoff
+        return cutoff
+
+    def date_filter(
+        self, attribute: str, predicate: str, expression: str
+    ) -> Optional[ColumnElement[bool]]:
+        """
+        Translate a date condition into a SQL filter on the Email model.
+
+        Args:
+            attribute (str): The Email datetime attribute, e.g. "received_at".
+            predicate (str): "greater_than" or "less_than".
+            expression (str): The date expression to compare against.
+
+        Returns:
+            Optional[ColumnElement[bool]]: The filter, or None if the
+            condition cannot be expressed in SQL.
+        """
+        cutoff = self[expression]
+        column = getattr(Email, attribute, None)
+        if cutoff is None or column is None:
+            return None
+        if predicate == "greater_than":
+            return column > cutoff
+        elif predicate == "less_than":
+            return column < cutoff
+        return None
+
+
+def parse_date_expression(expression: str, now: datetime) -> Optional[datetime]:
+    """
+    Parse a date expression into a naive UTC datetime.
+
+    Supports relative expressions like '30 minutes ago', '7 days ago' or
+    '1 year ago', and absolute ISO 8601 dates or datetimes like '2024-01-31'
+    or '2024-01-31T08:00:00Z'.
+
+    Args:
+        expression (str): The date expression.
+        now (datetime): Reference time for relative expressions.
+
+    Returns:
+        Optional[datetime]: The resolved datetime, or None if invalid.
+    """
+    try:
+        parts = expression.lower().split()
+        if len(parts) == 3 and parts[2] == "ago":
+            amount = int(parts[0])
+            for unit, length in DATE_UNITS.items():
+                if parts[1].startswith(unit):
+                    return now - amount * length
+            return None
+
+        text = expression.strip()
+        if text.endswith(("Z", "z")):
+            text = text[:-1] + "+00:00"
+        parsed = datetime.fromisoformat(text)
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    except ValueError:
+        return None
+    except Exception as e:
+        logger.error(f"Error parsing date expression '{expression}': {e}")
+        return None
@@ -1,16 +1,31 @@
 """Rule engine for email processing."""
 
+import hashlib
 import json
 import logging
-from datetime import datetime, timedelta
-from typing import List, Optional
+from collections import defaultdict
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
 
 from pydantic import BaseModel, Field
+from sqlalchemy import ColumnElement
 
 from ..database.models import Email
+from .context import EvaluationContext
+from .matcher import MIN_INDEXED_PATTERNS, MultiPatternMatcher
 
 logger = logging.getLogger(__name__)
 
+# Rule field names mapped to the Email attributes they read.
+FIELD_ATTRIBUTES = {
+    "from": "sender",
+    "to": "recipient",
+    "subject": "subject",
+    "message": "body",
+    "received_date": "received_at",
+}
+
 
 class Condition(BaseModel):
     """Rule condition model.
@@ -54,17 +69,425 @@ class Rule(BaseModel):
     actions: List[Action]
 
 
+class FieldCache(dict):
+    """Lazily computed, lowercased field values of one email.
+
+    Each Email attribute is read and lowercased the first time a condition
+    needs it, then reused by every other condition evaluated against the same
+    email. Missing values are cached as None. ``context`` holds the date
+    cutoffs of the current run.
+    """
+
+    __slots__ = ("email", "context", "found")
+
+    def __init__(
+        self,
+        email: Email,
+        matchers: Optional[Dict[str, MultiPatternMatcher]] = None,
+        context: Optional[EvaluationContext] = None,
+    ):
+        """
+        Initialize the cache for an email.
+
+        Args:
+            email (Email): The email whose fields are cached.
+            matchers (Optional[Dict[str, MultiPatternMatcher]]): Pattern
+                matchers for indexed attributes, used by ``found``.
+            context (Optional[EvaluationContext]): The run's date cutoffs.
+                Defaults to a new context resolved against the current time.
+        """
+        super().__init__()
+        self.email = email
+        self.context = context if context is not None else EvaluationContext()
+        self.found = PatternHits(self, matchers or {})
+
+    def __missing__(self, attribute: str) -> Optional[str]:
+        value = getattr(self.email, attribute)
+        lowered = None if value is None else str(value).lower()
+        self[attribute] = lowered
+        return lowered
+
+
+class PatternHits(dict):
+    """Lazily computed sets of indexed patterns contained in an email's fields.
+
+    Each indexed field is scanned once, for all of its patterns, the first time
+    a contains/not_contains condition on it is evaluated. Missing fields map to
+    None.
+    """
+
+    __slots__ = ("fields", "matchers")
+
+    def __init__(self, fields: FieldCache, matchers: Dict[str, MultiPatternMatcher]):
+        """
+        Initialize the hits for an email.
+
+        Args:
+            fields (FieldCache): The email's lowercased field values.
+            matchers (Dict[str, MultiPatternMatcher]): Matchers keyed by Email
+                attribute.
+        """
+        super().__init__()
+        self.fields = fields
+        self.matchers = matchers
+
+    def __missing__(self, attribute: str) -> Optional[FrozenSet[str]]:
+        value = self.fields[attribute]
+        found = None if value is None else self.matchers[attribute].find(value)
+        self[attribute] = found
+        return found
+
+
+EmailPredicate = Callable[[FieldCache], bool]
+
+# Relative cost of reading a field; scanning the body dominates.
+FIELD_COSTS = {
+    "received_at": 1.0,
+    "sender": 2.0,
+    "recipient": 2.0,
+    "subject": 3.0,
+    "body": 20.0,
+}
+
+# Relative cost of a predicate; substring scans cost more than comparisons.
+PREDICATE_COSTS = {"contains": 2.0, "not_contains": 2.0}
+
+# Substring predicates served by a per-field multi-pattern index.
+INDEXED_PREDICATES = ("contains", "not_contains")
+
+# When optimizing, selectivity is sampled over the first SAMPLE_SIZE emails of
+# every REORDER_INTERVAL, then conditions are reordered and counting stops.
+SAMPLE_SIZE = 1_000
+REORDER_INTERVAL = 50_000
+
+
+class CompiledCondition:
+    """A compiled condition with its cost estimate and observed selectivity.
+
+    Attributes:
+        check (EmailPredicate): The compiled predicate.
+        cost (float): Static estimate of the predicate's evaluation cost.
+        evaluations (int): Times the condition was evaluated while counting.
+        matches (int): Times the condition was true while counting.
+    """
+
+    __slots__ = ("check", "cost", "evaluations", "matches")
+
+    def __init__(self, check: EmailPredicate, cost: float):
+        """
+        Initialize the CompiledCondition.
+
+        Args:
+            check (EmailPredicate): The compiled predicate.
+            cost (float): Static estimate of the predicate's evaluation cost.
+        """
+        self.check = check
+        self.cost = cost
+        self.evaluations = 0
+        self.matches = 0
+
+    def counted(self) -> EmailPredicate:
+        """
+        Wrap the predicate so every evaluation updates the statistics.
+
+        Returns:
+            EmailPredicate: The counting predicate.
+        """
+        check = self.check
+
+        def counted_check(fields: FieldCache) -> bool:
+            self.evaluations += 1
+            if check(fields):
+                self.matches += 1
+                return True
+            return False
+
+        return counted_check
+
+    def rank(self, logic: str) -> float:
+        """
+        Expected cost of evaluating this condition first; lower runs earlier.
+
+        For "all" rules cheap conditions that usually fail should run first,
+        for "any" rules cheap conditions that usually pass. The observed
+        pass rate is smoothed so unseen conditions rank by cost alone.
+
+        Args:
+            logic (str): The rule logic, "all" or "any".
+
+        Returns:
+            float: The ranking key.
+        """
+        pass_rate = (self.matches + 1) / (self.evaluations + 2)
+        decisive_rate = 1 - pass_rate if logic == "all" else pass_rate
+        return self.cost / decisive_rate
+
+
+class CompiledRule:
+    """A rule compiled into a short-circuiting predicate.
+
+    Attributes:
+        rule (Rule): The source rule.
+        conditions (List[CompiledCondition]): Conditions in evaluation order.
+        matches (EmailPredicate): Function returning True if an email's fields
+            match the rule.
+    """
+
+    __slots__ = ("rule", "conditions", "matches", "_checks", "_counted_checks")
+
+    def __init__(self, rule: Rule, conditions: List[CompiledCondition]):
+        """
+        Initialize the CompiledRule.
+
+        Args:
+            rule (Rule): The source rule.
+            conditions (List[CompiledCondition]): The compiled conditions.
+        """
+        self.rule = rule
+        self.conditions = conditions
+        self._checks = [condition.check for condition in conditions]
+        self._counted_checks = [condition.counted() for condition in conditions]
+        self.matches = self._build(self._checks)
+
+    def set_counting(self, counting: bool) -> None:
+        """
+        Switch between plain and statistics-collecting evaluation.
+
+        Args:
+            counting (bool): Whether evaluations update condition statistics.
+        """
+        self.matches = self._build(self._counted_checks if counting else self._checks)
+
+    def _build(self, checks: List[EmailPredicate]) -> EmailPredicate:
+        """
+        Combine condition checks with the rule's logic, stopping at the first
+        decisive result.
+
+        Args:
+            checks (List[EmailPredicate]): Condition checks in evaluation order.
+
+        Returns:
+            EmailPredicate: The combined predicate.
+        """
+        if self.rule.logic == "all":
+
+            def match_all(fields: FieldCache) -> bool:
+                for check in checks:
+                    if not check(fields):
+                        return False
+                return True
+
+            return match_all
+        elif self.rule.logic == "any":
+
+            def match_any(fields: FieldCache) -> bool:
+                for check in checks:
+                    if check(fields):
+                        return True
+                return False
+
+            return match_any
+
+        logger.warning(f"Unknown logic '{self.rule.logic}' in rule '{self.rule.name}'")
+        return _never
+
+    def reorder(self) -> None:
+        """
+        Reorder conditions by expected cost, in place.
+
+        Results are unchanged because "all" and "any" do not depend on order.
+        """
+        order = sorted(
+            range(len(self.conditions)),
+            key=lambda i: self.conditions[i].rank(self.rule.logic),
+        )
+        self.conditions[:] = [self.conditions[i] for i in order]
+        self._checks[:] = [self._checks[i] for i in order]
+        self._counted_checks[:] = [self._counted_checks[i] for i in order]
+
+
 class RuleEngine:
     """Engine for processing email rules."""
 
-    def __init__(self, rules_file: str = "config/rules.json"):
+    def __init__(
+        self,
+        rules_file: str = "config/rules.json",
+        rules: Optional[List[Rule]] = None,
+        optimize: bool = False,
+    ):
         """
-        Initialize the rule engine and load rules from file.
+        Initialize the rule engine, load rules from file and compile them.
 
         Args:
             rules_file (str): Path to the rules JSON file.
+            rules (Optional[List[Rule]]): Rules to use instead of loading the file.
+            optimize (bool): Reorder conditions cheapest-first and refine the
+                order with selectivity statistics sampled while evaluating.
+        """
+        self.rules = rules if rules is not None else self._load_rules(rules_file)
+        self.optimize = optimize
+        self._compiled: List[CompiledRule] = []
+        self._matchers: Dict[str, MultiPatternMatcher] = {}
+        self._exact: Dict[str, Dict[str, List[int]]] = {}
+        self._guarded: Dict[str, Dict[str, List[int]]] = {}
+        self._unguarded: List[int] = []
+        self._evaluations = 0
+        self.context = EvaluationContext()
+        self.compile()
+
+    def start_run(self, now: Optional[datetime] = None) -> EvaluationContext:
+        """
+        Start a new evaluation run with freshly resolved date cutoffs.
+
+        Relative dates like "7 days ago" are resolved once per run against
+        ``now``, so they do not drift while a long run is in progress. Call
+        this at the start of each processing run.
+
+        Args:
+            now (Optional[datetime]): Reference time for relative dates, as
+                naive UTC. Defaults to the current time.
+
+        Returns:
+            EvaluationContext: The new run's context.
+        """
+        self.context = EvaluationContext(now)
+        return self.context
+
+    def compile(self) -> None:
+        """
+        Precompile every rule into a single predicate function.
+
+        Condition values are lowercased once and predicates are resolved to
+        closures over the attribute they read, so evaluating an email does no
+        parsing or dispatch, and each field is lowercased at most once per
+        email via a FieldCache. Conditions short-circuit, and with ``optimize``
+        cheap header conditions are ordered before body scans.
+
+        Fields with many contains/not_contains values get a multi-pattern
+        matcher, so each such field is scanned once per email for all of its
+        patterns instead of once per condition. "all" rules requiring an
+        equals value or an indexed pattern are only evaluated for emails where
+        a hash lookup or the scan found it. Call again after changing
+        ``rules``.
+        """
+        self._matchers = self._build_matchers()
+        self._compiled = [self._compile_rule(rule) for rule in self.rules]
+        self._build_guards()
+        self._evaluations = 0
+        if self.optimize:
+            self.reorder()
+            self._set_counting(True)
+
+    def _build_matchers(self) -> Dict[str, MultiPatternMatcher]:
         """
-        self.rules = self._load_rules(rules_file)
+        Build a matcher for each field with enough substring patterns.
+
+        Returns:
+            Dict[str, MultiPatternMatcher]: Matchers keyed by Email attribute.
+        """
+        patterns: Dict[str, Set[str]] = defaultdict(set)
+        for rule in self.rules:
+            for condition in rule.conditions:
+                attribute = FIELD_ATTRIBUTES.get(condition.field.lower())
+                value = condition.value.lower()
+                if (
+                    attribute
+                    and value
+                    and condition.predicate.lower() in INDEXED_PREDICATES
+                ):
+                    patterns[attribute].add(value)
+
+        matchers = {}
+        for attribute, values in patterns.items():
+            if len(values) >= MIN_INDEXED_PATTERNS:
+                matchers[attribute] = MultiPatternMatcher(values)
+                logger.debug(f"Indexed {len(values)} patterns for {attribute}")
+        return matchers
+
+    def _build_guards(self) -> None:
+        """
+        Index "all" rules by one equals value or indexed pattern they require.
+
+        A rule guarded by ``field equals value`` cannot match an email whose
+        field has a different value, and one guarded by a pattern cannot match
+        an email whose field does not contain it. Only the rules found with
+        one hash lookup per equals field or in the pattern scan, plus the
+        unguarded rules, need evaluating.
+        """
+        indexes: Dict[str, Dict[str, Dict[str, List[int]]]] = {
+            "equals": defaultdict(lambda: defaultdict(list)),
+            "contains": defaultdict(lambda: defaultdict(list)),
+        }
+        self._unguarded = []
+        for index, rule in enumerate(self.rules):
+            guard = self._find_guard(rule)
+            if guard is None:
+                self._unguarded.append(index)
+            else:
+                predicate, attribute, value = guard
+                indexes[predicate][attribute][value].append(index)
+        self._exact = {
+            attribute: dict(by_value)
+            for attribute, by_value in indexes["equals"].items()
+        }
+        self._guarded = {
+            attribute: dict(by_pattern)
+            for attribute, by_pattern in indexes["contains"].items()
+        }
+
+    def _find_guard(self, rule: Rule) -> Optional[Tuple[str, str, str]]:
+        """
+        Pick a condition an "all" rule requires that can be looked up.
+
+        Equals conditions are preferred since they select the fewest emails.
+
+        Args:
+            rule (Rule): The rule to inspect.
+
+        Returns:
+            Optional[Tuple[str, str, str]]: The (predicate, attribute, value)
+            guarding the rule, or None if every email must be evaluated
+            against it.
+        """
+        if rule.logic != "all":
+            return None
+        guard = None
+        for condition in rule.conditions:
+            attribute = FIELD_ATTRIBUTES.get(condition.field.lower())
+            if attribute is None:
+                continue
+            predicate = condition.predicate.lower()
+            value = condition.value.lower()
+            if predicate == "equals":
+                return predicate, attribute, value
+            if (
+                guard is None
+                and predicate == "contains"
+                and value
+                and attribute in self._matchers
+            ):
+                guard = predicate, attribute, value
+        return guard
+
+    def reorder(self) -> None:
+        """
+        Reorder every rule's conditions by expected cost.
+
+        Uses static field/predicate costs, refined by the pass rates sampled
+        so far when ``optimize`` is enabled. Match results are unaffected.
+        """
+        for compiled in self._compiled:
+            compiled.reorder()
+
+    def _set_counting(self, counting: bool) -> None:
+        """
+        Turn selectivity sampling on or off for every rule.
+
+        Args:
+            counting (bool): Whether evaluations update condition statistics.
+        """
+        for compiled in self._compiled:
+            compiled.set_counting(counting)
 
     def _load_rules(self, rules_file: str) -> List[Rule]:
         """
@@ -99,16 +522,271 @@ class RuleEngine:
         """
         applicable_actions = []
 
-        for rule in self.rules:
-            if self._evaluate_rule(email, rule):
+        fields = FieldCache(email, self._matchers, self.context)
+
+        for compiled in self._candidates(fields):
+            if compiled.matches(fields):
+                rule = compiled.rule
                 logger.info(f"Rule '{rule.name}' matched email {email.id}")
                 applicable_actions.extend(rule.actions)
 
+        if self.optimize:
+            self._evaluations += 1
+            phase = self._evaluations % REORDER_INTERVAL
+            if phase == SAMPLE_SIZE:
+                self.reorder()
+                self._set_counting(False)
+            elif phase == 0:
+                self._set_counting(True)
+
         return applicable_actions
 
+    def evaluate_batch(self, emails: Sequence[Email]) -> Any:
+        """
+        Evaluate all rules against a batch of emails with NumPy column
+        operations instead of per-email predicates.
+
+        Requires the optional NumPy dependency.
+
+        Args:
+            emails (Sequence[Email]): The emails to evaluate.
+
+        Returns:
+            Any: A boolean ``(len(rules), len(emails))`` NumPy array, True
+            where a rule matches an email.
+        """
+        from .batch import evaluate_rules
+
+        return evaluate_rules(self.rules, emails, self.context)
+
+    def sql_filter(self, full_text: bool = False) -> Optional[ColumnElement[bool]]:
+        """
+        Build a SQL filter selecting every stored email some rule could match.
+
+        Rows the filter selects must still be evaluated; rows it excludes
+        match no rule and never need to be loaded. Date conditions use the
+        current run's cutoffs.
+
+        Args:
+            full_text (bool): Look up contains conditions in the SQLite
+                full-text index instead of scanning with LIKE.
+
+        Returns:
+            Optional[ColumnElement[bool]]: The filter, or None if some rule
+            cannot be translated and every email must be evaluated.
+        """
+        from .sql import rules_filter
+
+        return rules_filter(self.rules, self.context, full_text)
+
+    def version(self) -> str:
+        """
+        Return a hash identifying the rule definitions.
+
+        Rules are hashed after parsing, so reformatting the rules file does
+        not change the version but editing any rule does.
+
+        Returns:
+            str: Hex SHA-256 digest of the rules.
+        """
+        canonical = json.dumps(
+            [rule.model_dump() for rule in self.rules], sort_keys=True
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def changed_filter(self, watermark: datetime) -> ColumnElement[bool]:
+        """
+        Build a SQL filter selecting emails that may match a rule now but
+        did not when the rules last ran at ``watermark``.
+
+        Args:
+            watermark (datetime): Start of the last completed run, as naive
+                UTC.
+
+        Returns:
+            ColumnElement[bool]: The filter.
+        """
+        from .sql import changed_filter
+
+        return changed_filter(self.rules, self.context, watermark)
+
+    def referenced_fields(self) -> Set[str]:
+        """
+        Return the Email attributes the rules' conditions read.
+
+        Lets callers load only these columns, e.g. leaving ``body`` unloaded
+        unless some rule has a "message" condition.
+
+        Returns:
+            Set[str]: The referenced Email attribute names.
+        """
+        return {
+            FIELD_ATTRIBUTES[condition.field.lower()]
+            for rule in self.rules
+            for condition in rule.conditions
+            if condition.field.lower() in FIELD_ATTRIBUTES
+        }
+
+    def evaluate_emails(
+        self, emails: Sequence[Email], vectorize: bool = False
+    ) -> List[List[Action]]:
+        """
+        Evaluate a batch of emails and return each one's applicable actions.
+
+        Args:
+            emails (Sequence[Email]): The emails to evaluate.
+            vectorize (bool): Use :meth:`evaluate_batch` instead of calling
+                :meth:`evaluate_email` per email. Ignored when ``optimize`` is
+                set, since selectivity is sampled per email.
+
+        Returns:
+            List[List[Action]]: The actions to perform, one list per email.
+        """
+        if not vectorize or self.optimize:
+            return [self.evaluate_email(email) for email in emails]
+
+        from .batch import matched_actions
+
+        return matched_actions(self.rules, emails, self.evaluate_batch(emails))
+
+    def _candidates(self, fields: FieldCache) -> List[CompiledRule]:
+        """
+        Return the compiled rules that can match an email, in rule order.
+
+        Args:
+            fields (FieldCache): The email being evaluated.
+
+        Returns:
+            List[CompiledRule]: Unguarded rules and rules whose guard value or
+            pattern was found in the email.
+        """
+        if not self._exact and not self._guarded:
+            return self._compiled
+
+        indexes = list(self._unguarded)
+        for attribute, by_value in self._exact.items():
+            value = fields[attribute]
+            if value is not None:
+                indexes.extend(by_value.get(value, ()))
+        for attribute, by_pattern in self._guarded.items():
+            found = fields.found[attribute]
+            if found:
+                for pattern in found:
+                    indexes.extend(by_pattern.get(pattern, ()))
+        indexes.sort()
+        return [self._compiled[index] for index in indexes]
+
+    def _compile_rule(self, rule: Rule) -> CompiledRule:
+        """
+        Compile a rule into a short-circuiting predicate.
+
+        Args:
+            rule (Rule): The rule to compile.
+
+        Returns:
+            CompiledRule: The compiled rule.
+        """
+        conditions = []
+        for condition in rule.conditions:
+            check = self._compile_condition(condition)
+            attribute = FIELD_ATTRIBUTES.get(condition.field.lower(), "")
+            predicate = condition.predicate.lower()
+            # Indexed fields are scanned once for all their patterns.
+            indexed = attribute in self._matchers and predicate in INDEXED_PREDICATES
+            cost = (
+                0.0
+                if check is _never
+                else FIELD_COSTS.get(attribute, 1.0)
+                * (1.0 if indexed else PREDICATE_COSTS.get(predicate, 1.0))
+            )
+            conditions.append(CompiledCondition(check, cost))
+        return CompiledRule(rule, conditions)
+
+    def _compile_condition(self, condition: Condition) -> EmailPredicate:
+        """
+        Compile a single condition into a predicate function.
+
+        Args:
+            condition (Condition): The condition to compile.
+
+        Returns:
+            EmailPredicate: Function returning True if an email matches.
+        """
+        attribute = FIELD_ATTRIBUTES.get(condition.field.lower())
+        if attribute is None:
+            return _never
+        predicate = condition.predicate.lower()
+        target_value = condition.value.lower()
+        indexed = attribute in self._matchers and target_value
+
+        if predicate == "contains" and indexed:
+
+            def check(fields: FieldCache) -> bool:
+                found = fields.found[attribute]
+                return found is not None and target_value in found
+
+        elif predicate == "not_contains" and indexed:
+
+            def check(fields: FieldCache) -> bool:
+                found = fields.found[attribute]
+                return found is not None and target_value not in found
+
+        elif predicate == "contains":
+
+            def check(fields: FieldCache) -> bool:
+                value = fields[attribute]
+                return value is not None and target_value in value
+
+        elif predicate == "not_contains":
+
+            def check(fields: FieldCache) -> bool:
+                value = fields[attribute]
+                return value is not None and target_value not in value
+
+        elif predicate == "equals":
+
+            def check(fields: FieldCache) -> bool:
+                value = fields[attribute]
+                return value is not None and value == target_value
+
+        elif predicate == "not_equals":
+
+            def check(fields: FieldCache) -> bool:
+                value = fields[attribute]
+                return value is not None and value != target_value
+
+        elif predicate in ("greater_than", "less_than"):
+            expression = condition.value
+            if self.context[expression] is None:
+                return _never
+            get_field = attrgetter(attribute)
+            greater = predicate == "greater_than"
+
+            def check(fields: FieldCache) -> bool:
+                field_value = get_field(fields.email)
+                if not isinstance(field_value, datetime):
+                    return False
+                target_date = fields.context[expression]
+                try:
+                    if greater:
+                        return field_value > target_date
+                    return field_value < target_date
+                except TypeError as e:
+                    logger.error(f"Error evaluating condition: {e}")
+                    return False
+
+        else:
+            logger.warning(f"Unknown predicate: {predicate}")
+            return _never
+
+        return check
+
     def _evaluate_rule(self, email: Email, rule: Rule) -> bool:
         """
-        Evaluate if an email matches a rule.
+        Evaluate if an email matches a rule without compiling it.
+
+        This is the reference implementation the compiled predicates from
+        :meth:`compile` must agree with.
 
         Args:
             email (Email): The email to check.
@@ -171,7 +849,7 @@ class RuleEngine:
             logger.error(f"Error evaluating condition: {e}")
             return False
 
-    def _get_field_value(self, email: Email, field: str):
+    def _get_field_value(self, email: Email, field: str) -> Any:
         """
         Get field value from email object.
 
@@ -182,15 +860,8 @@ class RuleEngine:
         Returns:
             Any: The value of the field, or None if not found.
         """
-        field_mapping = {
-            "from": email.sender,
-            "to": email.recipient,
-            "subject": email.subject,
-            "message": email.body,
-            "received_date": email.received_at,
-        }
-
-        return field_mapping.get(field.lower())
+        attribute = FIELD_ATTRIBUTES.get(field.lower())
+        return getattr(email, attribute) if attribute else None
 
     def _compare_dates(self, field_value, target_value: str, comparison: str) -> bool:
         """
@@ -221,31 +892,25 @@ class RuleEngine:
 
     def _parse_relative_date(self, date_expr: str) -> Optional[datetime]:
         """
-        Parse relative date expressions like '7 days ago'.
+        Resolve a date expression like '7 days ago' for the current run.
 
         Args:
-            date_expr (str): The relative date expression.
+            date_expr (str): The relative or absolute date expression.
 
         Returns:
             Optional[datetime]: The calculated datetime, or None if invalid.
         """
-        try:
-            parts = date_expr.lower().split()
-            if len(parts) == 3 and parts[2] == "ago":
-                amount = int(parts[0])
-                unit = parts[1]
-
-                now = datetime.utcnow()
-
-                if unit.startswith("day"):
-                    return now - timedelta(days=amount)
-                elif unit.startswith("hour"):
-                    return now - timedelta(hours=amount)
-                elif unit.startswith("week"):
-                    return now - timedelta(weeks=amount)
-                elif unit.startswith("month"):
-                    return now - timedelta(days=amount * 30)  # Approximate
-        except Exception as e:
-            logger.error(f"Error parsing relative date '{date_expr}': {e}")
+        return self.context[date_expr]
 
-        return None
+
+def _never(fields: FieldCache) -> bool:
+    """
+    Predicate for conditions and rules that can never match.
+
+    Args:
+        fields (FieldCache): The email being evaluated (ignored).
+
+    Returns:
+        bool: Always False.
+    """
+    return False
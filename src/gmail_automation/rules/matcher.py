@@ -0,0 +1,156 @@
+"""Multi-pattern substring matching for rule conditions."""
+
+import re
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+try:
+    import ahocorasick
+except ImportError:  # Optional dependency: pip install gmail-automation[fast]
+    ahocorasick = None
+
+# Below this many patterns per field, separate ``in`` checks (C string search)
+# beat a combined scan. The pure-regex fallback pays off later than a real
+# Aho-Corasick automaton.
+MIN_INDEXED_PATTERNS = 8 if ahocorasick is not None else 32
+
+# Trie node: maps the next character to its child; the "" key marks the end of
+# a pattern.
+_Trie = Dict[str, "_Trie"]
+
+
+class MultiPatternMatcher:
+    """Find every pattern contained in a text with a single scan.
+
+    When ``pyahocorasick`` is installed the patterns are compiled into an
+    Aho-Corasick automaton. Otherwise they are compiled into one trie-shaped
+    regular expression wrapped in a lookahead, so the regex engine walks the
+    trie once from every text position and reports the longest pattern
+    starting there; shorter patterns hidden inside a reported match (its
+    prefixes and inner substrings) are recovered from a containment map built
+    up front. Either way the cost of a scan grows with the length of the text
+    rather than the number of patterns, and :meth:`find` returns exactly the
+    set of patterns for which ``pattern in text`` is true.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Initialize the matcher and compile the patterns.
+
+        Args:
+            patterns (Iterable[str]): Non-empty patterns to search for. Matching
+                is exact, so callers should normalize case beforehand.
+        """
+        self.patterns = frozenset(pattern for pattern in patterns if pattern)
+        self._automaton: Any = None
+        self._regex: Optional[re.Pattern] = None
+        self._contained: Dict[str, FrozenSet[str]] = {}
+
+        if ahocorasick is not None:
+            if self.patterns:
+                self._automaton = ahocorasick.Automaton()
+                for pattern in self.patterns:
+                    self._automaton.add_word(pattern, pattern)
+                self._automaton.make_automaton()
+            return
+
+        trie: _Trie = {}
+        for pattern in self.patterns:
+            node = trie
+            for char in pattern:
+                node = node.setdefault(char, {})
+            node[""] = {}
+
+        if self.patterns:
+            self._regex = re.compile(f"(?=({_trie_to_regex(trie)}))", re.DOTALL)
+
+        # Every pattern contained in each pattern, including itself.
+        for pattern in sorted(self.patterns, key=len):
+            contained = {pattern}
+            for other in self._prefixes(trie, pattern) + self._scan(pattern):
+                if other != pattern:
+                    contained |= self._contained[other]
+            self._contained[pattern] = frozenset(contained)
+
+    def find(self, text: str) -> FrozenSet[str]:
+        """
+        Return every pattern that occurs in the text.
+
+        Args:
+            text (str): The text to scan.
+
+        Returns:
+            FrozenSet[str]: The patterns found.
+        """
+        if self._automaton is not None:
+            return frozenset(pattern for _, pattern in self._automaton.iter(text))
+
+        hits = set(self._scan(text))
+        if not hits:
+            return frozenset()
+        return frozenset().union(*(self._contained[hit] for hit in hits))
+
+    def _scan(self, text: str) -> List[str]:
+        """
+        Return the longest pattern starting at each position of the text.
+
+        Args:
+            text (str): The text to scan.
+
+        Returns:
+            List[str]: The reported patterns, possibly with repeats.
+        """
+        if self._regex is None:
+            return []
+        return self._regex.findall(text)
+
+    @staticmethod
+    def _prefixes(trie: _Trie, pattern: str) -> List[str]:
+        """
+        Return the patterns that are prefixes of a pattern.
+
+        Args:
+            trie (_Trie): The pattern trie.
+            pattern (str): The pattern to walk.
+
+        Returns:
+            List[str]: Patterns that are prefixes of ``pattern``.
+        """
+        prefixes = []
+        node = trie
+        for length, char in enumerate(pattern, start=1):
+            node = node[char]
+            if "" in node:
+                prefixes.append(pattern[:length])
+        return prefixes
+
+
+def _trie_to_regex(node: _Trie) -> str:
+    """
+    Convert a trie into an equivalent, greedy (longest-match) regex.
+
+    Chains of single-child nodes are emitted as literals without recursing, so
+    long patterns do not deepen the recursion.
+
+    Args:
+        node (_Trie): The trie node to convert.
+
+    Returns:
+        str: The regex source for the subtree.
+    """
+    chain = []
+    while len(node) == 1 and "" not in node:
+        ((char, node),) = node.items()
+        chain.append(char)
+    literal = re.escape("".join(chain))
+
+    branches = [
+        re.escape(char) + _trie_to_regex(child)
+        for char, child in sorted(node.items())
+        if char
+    ]
+    if not branches:
+        return literal
+    body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    if "" in node:
+        body = f"(?:{body})?"
+    return literal + body
@@ -0,0 +1,187 @@
+"""Translation of rules into SQL filters on the Email model."""
+
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+from sqlalchemy import ColumnElement, and_, false, func, or_, true
+
+from ..database.models import Email
+from ..database.search import contains_filter
+from .context import EvaluationContext
+from .engine import FIELD_ATTRIBUTES, Condition, Rule
+
+# Attributes stored as text, whose lowered value SQL can compare like Python.
+TEXT_ATTRIBUTES = ("sender", "recipient", "subject", "body")
+
+# Attributes stored as datetimes, which date predicates compare against.
+DATE_ATTRIBUTES = ("received_at",)
+
+
+def rules_filter(
+    rules: Sequence[Rule], context: EvaluationContext, full_text: bool = False
+) -> Optional[ColumnElement[bool]]:
+    """
+    Build a filter selecting every email any of the rules could match.
+
+    The filter is a superset: rows it selects must still be evaluated in
+    Python, but rows it excludes match no rule. SQL ``lower()`` only folds
+    ASCII letters, so conditions with non-ASCII values are left to Python;
+    non-ASCII field characters whose Python lowercase is ASCII (such as the
+    Kelvin sign) are not folded.
+
+    Args:
+        rules (Sequence[Rule]): The rules to translate.
+        context (EvaluationContext): The run's date cutoffs.
+        full_text (bool): Look up contains conditions in the full-text index.
+
+    Returns:
+        Optional[ColumnElement[bool]]: The filter, or None if some rule cannot
+        be translated and every email must be evaluated.
+    """
+    clauses = []
+    for rule in rules:
+        clause = rule_filter(rule, context, full_text)
+        if clause is None:
+            return None
+        clauses.append(clause)
+    return or_(false(), *clauses)
+
+
+def rule_filter(
+    rule: Rule, context: EvaluationContext, full_text: bool = False
+) -> Optional[ColumnElement[bool]]:
+    """
+    Translate a rule into a filter selecting every email it could match.
+
+    Untranslatable conditions are dropped from "all" rules, which only widens
+    the filter, but make an "any" rule untranslatable.
+
+    Args:
+        rule (Rule): The rule to translate.
+        context (EvaluationContext): The run's date cutoffs.
+        full_text (bool): Look up contains conditions in the full-text index.
+
+    Returns:
+        Optional[ColumnElement[bool]]: The filter, or None if the rule cannot
+        be narrowed down in SQL.
+    """
+    clauses: List[ColumnElement[bool]] = []
+    for condition in rule.conditions:
+        clause = condition_filter(condition, context, full_text)
+        if clause is not None:
+            clauses.append(clause)
+        elif rule.logic == "any":
+            return None
+
+    if rule.logic == "all":
+        return and_(true(), *clauses)
+    elif rule.logic == "any":
+        return or_(false(), *clauses)
+    return false()
+
+
+def changed_filter(
+    rules: Sequence[Rule], context: EvaluationContext, watermark: datetime
+) -> ColumnElement[bool]:
+    """
+    Build a filter selecting emails whose rule outcome may have changed since
+    the rules were evaluated at ``watermark``.
+
+    Those are the emails updated since then, plus the emails that crossed a
+    relative "older than" cutoff (``received_date less_than "7 days ago"``)
+    that moved forward in the meantime. Other date conditions cannot start
+    matching an unchanged email as time passes.
+
+    Args:
+        rules (Sequence[Rule]): The rules being evaluated.
+        context (EvaluationContext): The current run's date cutoffs.
+        watermark (datetime): When the previous run started, as naive UTC.
+
+    Returns:
+        ColumnElement[bool]: The filter.
+    """
+    previous = EvaluationContext(watermark)
+    clauses = [Email.updated_at > watermark]
+    for rule in rules:
+        for condition in rule.conditions:
+            attribute = FIELD_ATTRIBUTES.get(condition.field.lower())
+            if (
+                attribute not in DATE_ATTRIBUTES
+                or condition.predicate.lower() != "less_than"
+            ):
+                continue
+            before, cutoff = previous[condition.value], context[condition.value]
+            if before is not None and cutoff is not None and before < cutoff:
+                column = getattr(Email, attribute)
+                clauses.append(and_(column >= before, column < cutoff))
+    return or_(*clauses)
+
+
+def condition_filter(
+    condition: Condition, context: EvaluationContext, full_text: bool = False
+) -> Optional[ColumnElement[bool]]:
+    """
+    Translate a single condition into an equivalent SQL expression.
+
+    Args:
+        condition (Condition): The condition to translate.
+        context (EvaluationContext): The run's date cutoffs.
+        full_text (bool): Look up contains conditions in the full-text index
+            where it can answer them.
+
+    Returns:
+        Optional[ColumnElement[bool]]: The expression, or None if the
+        condition cannot be evaluated in SQL.
+    """
+    attribute = FIELD_ATTRIBUTES.get(condition.field.lower())
+    if attribute is None:
+        return false()
+    predicate = condition.predicate.lower()
+
+    if predicate in ("greater_than", "less_than"):
+        if attribute not in DATE_ATTRIBUTES or context[condition.value] is None:
+            return false()
+        return context.date_filter(attribute, predicate, condition.value)
+
+    if predicate not in ("contains", "not_contains", "equals", "not_equals"):
+        return false()
+    target_value = condition.value.lower()
+    if attribute not in TEXT_ATTRIBUTES or not target_value.isascii():
+        return None
+
+    clause = text_filter(attribute, predicate, target_value, full_text)
+    if attribute == "body":
+        # Bodies not fetched yet may match once they are.
+        return or_(Email.body_fetched.is_(False), clause)
+    return clause
+
+
+def text_filter(
+    attribute: str, predicate: str, target_value: str, full_text: bool = False
+) -> ColumnElement[bool]:
+    """
+    Build the SQL expression of a text condition.
+
+    Args:
+        attribute (str): The Email text attribute.
+        predicate (str): "contains", "not_contains", "equals" or "not_equals".
+        target_value (str): The lowercased ASCII value to compare with.
+        full_text (bool): Look up contains conditions in the full-text index
+            where it can answer them.
+
+    Returns:
+        ColumnElement[bool]: The expression.
+    """
+    if predicate == "contains" and full_text:
+        clause = contains_filter(attribute, target_value)
+        if clause is not None:
+            return clause
+
+    column = func.lower(getattr(Email, attribute))
+    if predicate == "contains":
+        return column.contains(target_value, autoescape=True)
+    elif predicate == "not_contains":
+        return ~column.contains(target_value, autoescape=True)
+    elif predicate == "equals":
+        return column == target_value
+    return column != target_value
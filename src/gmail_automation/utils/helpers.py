@@ -1,8 +1,12 @@
 """Utility functions and helpers."""
 
+import argparse
 import logging
 import os
-from typing import Optional
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
 
 
 def setup_logging(level: str = "INFO") -> None:
@@ -46,3 +50,41 @@ def get_env_var(name: str, default: Optional[str] = None) -> Optional[str]:
         Optional[str]: Value of the environment variable or default.
     """
     return os.getenv(name, default)
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Lazily split an iterable into lists of at most ``size`` items.
+
+    Args:
+        iterable (Iterable[T]): The items to split.
+        size (int): Maximum number of items per chunk.
+
+    Yields:
+        List[T]: Consecutive chunks of the input.
+    """
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def positive_int(value: str) -> int:
+    """
+    Parse a command-line argument that must be a positive integer.
+
+    Args:
+        value (str): The argument as given.
+
+    Returns:
+        int: The parsed value.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not an integer above 0.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: {value}")
+    return number
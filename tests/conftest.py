@@ -1,3 +1,9 @@
+import base64
+import email
+import json
+from urllib.parse import parse_qs, urlparse
+
+import httplib2
 import pytest
 from gmail_automation.database.models import Email
 from datetime import datetime
@@ -17,4 +23,92 @@ def sample_email():
         labels='["INBOX"]',
         created_at=datetime.utcnow(),
         updated_at=datetime.utcnow(),
-    )
\ No newline at end of file
+    )
+
+
+class FakeGmailHttp:
+    """A local httplib2 stand-in that answers Gmail API calls, including batches.
+
+    ``handler(method, path, params, body)`` returns ``(status, payload)`` or
+    ``(status, payload, headers)`` for each individual call; batch requests are
+    unpacked and answered part by part.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+        self.batches = 0
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        parsed = urlparse(uri)
+        if parsed.path.startswith("/batch"):
+            return self._batch(body, headers)
+        return self._call(method, parsed.path, parsed.query, body)
+
+    def _call(self, method, path, query, body):
+        self.calls.append((method, path))
+        params = {k: v[0] if len(v) == 1 else v for k, v in parse_qs(query).items()}
+        status, payload, *headers = self.handler(method, path, params, json.loads(body) if body else None)
+        response = httplib2.Response(
+            {"status": str(status), "content-type": "application/json", **(headers[0] if headers else {})}
+        )
+        return response, json.dumps(payload).encode("utf-8")
+
+    def _batch(self, body, headers):
+        self.batches += 1
+        message = email.message_from_string(
+            f"Content-Type: {headers['content-type']}\r\n\r\n{body}"
+        )
+        boundary = "fake_batch_boundary"
+        chunks = []
+        for part in message.get_payload():
+            request_line, rest = part.get_payload().split("\n", 1)
+            method, target, _ = request_line.split(" ", 2)
+            target = urlparse(target)
+            request_body = rest.split("\n\n", 1)[1] if "\n\n" in rest else ""
+            response, content = self._call(
+                method, target.path, target.query, request_body.strip() or None
+            )
+            content_id = part["Content-ID"].replace("<", "<response-", 1)
+            chunks.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: {content_id}\r\n\r\n"
+                f"HTTP/1.1 {response.status} OK\r\nContent-Type: application/json\r\n\r\n"
+                f"{content.decode('utf-8')}\r\n"
+            )
+        chunks.append(f"--{boundary}--")
+        response = httplib2.Response(
+            {"status": "200", "content-type": f"multipart/mixed; boundary={boundary}"}
+        )
+        return response, "".join(chunks).encode("utf-8")
+
+
+def make_gmail_message(message_id, subject="Hello", sender="a@b.com", body="Body", labels=("INBOX", "UNREAD")):
+    data = base64.urlsafe_b64encode(body.encode("utf-8")).decode("ascii")
+    return {
+        "id": message_id,
+        "threadId": f"t-{message_id}",
+        "labelIds": list(labels),
+        "internalDate": "1700000000000",
+        "payload": {
+            "mimeType": "multipart/alternative",
+            "headers": [
+                {"name": "From", "value": sender},
+                {"name": "To", "value": "me@example.com"},
+                {"name": "Subject", "value": subject},
+                {"name": "Message-ID", "value": f"<{message_id}@example.com>"},
+            ],
+            "body": {"size": 0},
+            "parts": [{"mimeType": "text/plain", "body": {"data": data}}],
+        },
+    }
+
+
+@pytest.fixture
+def fake_gmail_http():
+    return FakeGmailHttp
+
+
+@pytest.fixture
+def gmail_message():
+    return make_gmail_message
@@ -37,4 +37,126 @@ def test_execute_unknown_action(fake_email):
     database = MagicMock()
     executor = ActionExecutor(gmail_client, database)
     action = Action(type="unknown_action")
-    assert executor.execute_actions(fake_email, [action]) is False
\ No newline at end of file
+    assert executor.execute_actions(fake_email, [action]) is False
+
+def make_email(email_id):
+    from datetime import datetime
+    return Email(
+        id=email_id,
+        thread_id="t1",
+        message_id=f"m{email_id}",
+        sender="a@b.com",
+        recipient="b@c.com",
+        subject="Test",
+        body="Body",
+        received_at=datetime.utcnow(),
+        is_read=False,
+        labels='["INBOX", "UNREAD"]',
+    )
+
+def make_gmail_client():
+    gmail_client = MagicMock()
+    # System label IDs equal their names; user labels get generated IDs.
+    gmail_client.get_label_id_by_name.side_effect = lambda name: name if name.isupper() else f"id_{name}"
+    gmail_client.batch_modify_labels.side_effect = lambda ids, **kwargs: list(ids)
+    return gmail_client
+
+def test_plan_and_flush_groups_identical_label_changes():
+    gmail_client = make_gmail_client()
+    executor = ActionExecutor(gmail_client, MagicMock())
+
+    for i in range(3):
+        assert executor.plan_actions(make_email(str(i)), [Action(type="mark_read")])
+    executor.plan_actions(
+        make_email("moved"),
+        [Action(type="mark_unread"), Action(type="move_message", destination="Archive"), Action(type="mark_read")],
+    )
+    stats = executor.flush()
+
+    calls = {
+        (tuple(c.kwargs["add_labels"]), tuple(c.kwargs["remove_labels"])): list(c.args[0])
+        for c in gmail_client.batch_modify_labels.call_args_list
+    }
+    assert calls == {
+        ((), ("UNREAD",)): ["0", "1", "2"],
+        (("id_Archive",), ("INBOX", "UNREAD")): ["moved"],
+    }
+    assert stats.api_calls == 2
+    assert stats.emails_modified == 4
+
+def test_flush_skips_changes_already_in_effect():
+    gmail_client = make_gmail_client()
+    executor = ActionExecutor(gmail_client, MagicMock())
+
+    read = make_email("read")
+    read.is_read = True
+    archived = make_email("archived")
+    archived.labels = '["id_Archive"]'
+    executor.plan_actions(read, [Action(type="mark_read")])
+    executor.plan_actions(archived, [Action(type="move_message", destination="Archive")])
+    executor.plan_actions(make_email("unread"), [Action(type="mark_read")])
+    stats = executor.flush()
+
+    gmail_client.batch_modify_labels.assert_called_once_with(["unread"], add_labels=[], remove_labels=["UNREAD"])
+    assert stats.emails_unchanged == 2
+    assert stats.api_calls_avoided == 1
+
+def test_execute_actions_skips_no_op_calls():
+    gmail_client = make_gmail_client()
+    executor = ActionExecutor(gmail_client, MagicMock())
+    email = make_email("1")
+    email.is_read = True
+    email.labels = '["id_Archive"]'
+
+    assert executor.execute_actions(email, [Action(type="mark_read"), Action(type="move_message", destination="Archive")])
+    gmail_client.mark_as_read.assert_not_called()
+    gmail_client.move_to_label.assert_not_called()
+
+def test_flush_stores_each_accepted_chunk(monkeypatch):
+    from gmail_automation.database.store import EmailStore
+    from tests.unit.test_store import make_database
+
+    monkeypatch.setattr("gmail_automation.rules.actions.MAX_BATCH_MODIFY_SIZE", 2)
+    db = make_database()
+    emails = [make_email(str(i)) for i in range(3)]
+    with EmailStore(db) as store:
+        store.add(emails)
+    gmail_client = make_gmail_client()
+    # Gmail rejects the second chunk.
+    gmail_client.batch_modify_labels.side_effect = lambda ids, **kwargs: [] if "2" in ids else list(ids)
+    executor = ActionExecutor(gmail_client, db)
+
+    for email in emails:
+        executor.plan_actions(email, [Action(type="move_message", destination="Archive"), Action(type="mark_read")])
+    stats = executor.flush()
+
+    assert (stats.api_calls, stats.emails_modified, stats.emails_failed) == (2, 2, 1)
+    with db.get_session() as session:
+        stored = {e.id: (e.get_labels(), e.is_read) for e in session.query(Email)}
+    assert stored == {
+        "0": (["id_Archive"], True),
+        "1": (["id_Archive"], True),
+        "2": (["INBOX", "UNREAD"], False),
+    }
+
+def test_execute_actions_stores_results_without_flush():
+    from gmail_automation.database.store import EmailStore
+    from tests.unit.test_store import make_database
+
+    db = make_database()
+    email = make_email("1")
+    with EmailStore(db) as store:
+        store.add([make_email("1")])
+    gmail_client = make_gmail_client()
+    executor = ActionExecutor(gmail_client, db)
+
+    assert executor.execute_actions(email, [Action(type="move_message", destination="Archive"), Action(type="mark_read")])
+    assert email.is_read is True
+    with db.get_session() as session:
+        stored = session.get(Email, "1")
+        assert (stored.get_labels(), stored.is_read) == (["id_Archive"], True)
+
+def test_plan_unknown_action_fails():
+    executor = ActionExecutor(MagicMock(), MagicMock())
+    assert executor.plan_actions(make_email("1"), [Action(type="unknown_action")]) is False
+    assert executor.flush().api_calls == 0
@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from gmail_automation.gmail.async_client import AsyncGmailClient
+from gmail_automation.rules.actions import ActionExecutor
+from gmail_automation.rules.engine import Action
+from tests.conftest import make_gmail_message
+
+LABELS = {"labels": [{"id": "INBOX", "name": "INBOX"}, {"id": "UNREAD", "name": "UNREAD"}, {"id": "L1", "name": "Archive"}]}
+
+
+class FakeGmailServer:
+    """Answers Gmail API calls over an httpx MockTransport and tracks concurrency."""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.modified = []
+
+    async def handle(self, request):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            path = request.url.path.rsplit("/users/me", 1)[1]
+            if path == "/labels":
+                return httpx.Response(200, json=LABELS)
+            if path == "/messages":
+                return httpx.Response(200, json={"messages": [{"id": i} for i in self.messages]})
+            if path == "/messages/batchModify":
+                body = json.loads(request.content)
+                self.modified.append((body["ids"], body["addLabelIds"], body["removeLabelIds"]))
+                return httpx.Response(204)
+            message_id = path.split("/")[2]
+            if path.endswith("/modify"):
+                self.modified.append(([message_id],) + tuple(json.loads(request.content).values()))
+                return httpx.Response(200, json={"id": message_id})
+            if message_id in self.messages:
+                return httpx.Response(200, json=self.messages[message_id])
+            return httpx.Response(404, json={"error": {"code": 404, "message": "Not Found"}})
+        finally:
+            self.in_flight -= 1
+
+
+def make_client(server, **kwargs):
+    return AsyncGmailClient(None, transport=httpx.MockTransport(server.handle), **kwargs)
+
+
+def test_get_messages_details_runs_concurrently_within_limit():
+    server = FakeGmailServer({f"m{i}": make_gmail_message(f"m{i}", subject=f"Subject {i}") for i in range(12)})
+
+    async def run():
+        async with make_client(server, max_concurrency=4) as client:
+            ids = await client.list_messages(max_results=20)
+            return await client.get_messages_details([m["id"] for m in ids] + ["missing"])
+
+    result = asyncio.run(run())
+    assert [e.id for e in result.emails] == [f"m{i}" for i in range(12)]
+    assert result.emails[3].subject == "Subject 3"
+    assert list(result.failures) == ["missing"]
+    assert server.max_in_flight == 4
+
+
+def test_label_actions_resolve_names_from_cache():
+    server = FakeGmailServer({})
+
+    async def run():
+        async with make_client(server) as client:
+            await client.load_labels()
+            assert await client.mark_as_read("m1")
+            assert await client.move_to_label("m2", "Archive")
+            assert not await client.move_to_label("m3", "Missing")
+
+    asyncio.run(run())
+    assert server.modified == [(["m1"], [], ["UNREAD"]), (["m2"], ["L1"], ["INBOX"])]
+
+
+def test_labels_are_not_requested_until_loaded():
+    server = FakeGmailServer({"m1": make_gmail_message("m1")})
+    paths = []
+
+    async def handle(request):
+        paths.append(request.url.path.rsplit("/users/me", 1)[1])
+        return await server.handle(request)
+
+    async def run():
+        async with AsyncGmailClient(None, transport=httpx.MockTransport(handle)) as client:
+            assert (await client.get_message_details("m1")).id == "m1"
+            assert await client.mark_as_unread("m1")
+            assert client.get_label_id_by_name("Archive") is None
+
+    asyncio.run(run())
+    assert paths == ["/messages/m1", "/messages/m1/modify"]
+    assert server.modified == [(["m1"], ["UNREAD"], [])]
+
+
+def test_action_executor_flush_async():
+    from tests.unit.test_actions import make_email
+    from tests.unit.test_store import make_database
+
+    server = FakeGmailServer({})
+    database = make_database()
+
+    async def run():
+        async with make_client(server) as client:
+            await client.load_labels()
+            executor = ActionExecutor(client, database)
+            for i in range(3):
+                executor.plan_actions(make_email(str(i)), [Action(type="move_message", destination="Archive")])
+            return await executor.flush_async(client)
+
+    stats = asyncio.run(run())
+    assert stats.api_calls == 1 and stats.emails_modified == 3
+    assert server.modified == [(["0", "1", "2"], ["L1"], ["INBOX"])]
@@ -0,0 +1,29 @@
+import pytest
+
+from gmail_automation.rules.engine import Action, Condition, FieldCache, Rule, RuleEngine
+from tests.unit.test_rules import make_reference_emails, make_reference_rules, make_test_email
+
+np = pytest.importorskip("numpy")
+
+
+def test_evaluate_batch_matches_compiled_evaluation():
+    rules = make_reference_rules() + [
+        Rule(name="empty all", conditions=[], actions=[Action(type="mark_read")]),
+        Rule(name="empty any", logic="any", conditions=[], actions=[Action(type="mark_read")]),
+        Rule(name="missing", conditions=[Condition(field="message", predicate="not_equals", value="x")], actions=[Action(type="mark_read")]),
+    ]
+    emails = make_reference_emails() + [make_test_email("5", None, "Newsletter", None, 100)]
+    engine = RuleEngine(rules=rules)
+
+    matrix = engine.evaluate_batch(emails)
+    assert matrix.shape == (len(rules), len(emails))
+    expected = [[compiled.matches(FieldCache(email)) for email in emails] for compiled in engine._compiled]
+    assert matrix.tolist() == expected
+    assert engine.evaluate_emails(emails, vectorize=True) == [engine.evaluate_email(email) for email in emails]
+
+
+def test_evaluate_batch_shares_repeated_values():
+    rules = [Rule(name="boss", conditions=[Condition(field="from", predicate="equals", value="Boss@X.com")], actions=[Action(type="mark_read")])]
+    emails = [make_test_email(str(i), "boss@x.com" if i % 3 == 0 else f"u{i % 2}@x.com", "s", "b", 0) for i in range(9)]
+    matrix = RuleEngine(rules=rules).evaluate_batch(emails)
+    assert np.flatnonzero(matrix[0]).tolist() == [0, 3, 6]
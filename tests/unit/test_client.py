@@ -0,0 +1,172 @@
+import base64
+import re
+
+import pytest
+
+from gmail_automation.gmail.client import GmailClient, HistoryExpiredError
+
+MESSAGE_PATH = re.compile(r"/gmail/v1/users/me/messages/([^/]+)$")
+
+
+def make_handler(messages):
+    def handler(method, path, params, body):
+        if path.endswith("/labels"):
+            return 200, {"labels": [{"id": "INBOX", "name": "INBOX"}, {"id": "UNREAD", "name": "UNREAD"}]}
+        match = MESSAGE_PATH.search(path)
+        if match and match.group(1) in messages:
+            return 200, messages[match.group(1)]
+        return 404, {"error": {"code": 404, "message": "Not Found"}}
+
+    return handler
+
+
+def test_get_messages_details_batches_and_reports_failures(fake_gmail_http, gmail_message):
+    messages = {f"m{i}": gmail_message(f"m{i}", subject=f"Subject {i}") for i in range(5)}
+    http = fake_gmail_http(make_handler(messages))
+    client = GmailClient(None, http=http)
+
+    result = client.get_messages_details(["m0", "m1", "missing", "m2", "m3", "m4"], batch_size=2)
+
+    assert http.batches == 3
+    assert [e.id for e in result.emails] == ["m0", "m1", "m2", "m3", "m4"]
+    assert result.emails[1].subject == "Subject 1"
+    assert result.emails[0].body == "Body"
+    assert list(result.failures) == ["missing"]
+
+
+def test_get_messages_details_metadata_leaves_body_unfetched(fake_gmail_http, gmail_message):
+    seen = []
+    serve = make_handler({"m0": gmail_message("m0", subject="Hi")})
+
+    def handler(method, path, params, body):
+        seen.append(params)
+        return serve(method, path, params, body)
+
+    client = GmailClient(None, http=fake_gmail_http(handler))
+    [email] = client.get_messages_details(["m0"], message_format="metadata").emails
+    assert seen[0]["format"] == "metadata"
+    assert seen[0]["metadataHeaders"] == ["From", "To", "Subject", "Message-ID"]
+    assert (email.subject, email.body, email.body_fetched) == ("Hi", None, False)
+    assert client.get_message_details("m0").body_fetched is True
+
+
+def test_get_message_details_raw_scans_rfc822(fake_gmail_http):
+    raw = base64.urlsafe_b64encode(
+        b"From: a@b.com\r\nSubject: Hi\r\nContent-Type: text/plain\r\n\r\nBody\r\n"
+    ).decode("ascii")
+    message = {"id": "m0", "threadId": "t0", "labelIds": [], "internalDate": "0", "raw": raw}
+    seen = []
+
+    def handler(method, path, params, body):
+        seen.append(params)
+        return 200, message
+
+    client = GmailClient(None, http=fake_gmail_http(handler))
+    email = client.get_message_details("m0", "raw")
+    assert seen[0]["format"] == "raw"
+    assert (email.sender, email.subject, email.body) == ("a@b.com", "Hi", "Body\r\n")
+
+
+def test_get_messages_details_empty(fake_gmail_http):
+    http = fake_gmail_http(make_handler({}))
+    client = GmailClient(None, http=http)
+    result = client.get_messages_details([])
+    assert result.emails == [] and result.failures == {}
+    assert http.batches == 0
+
+
+def make_list_handler(total_ids, page_size_seen):
+    def handler(method, path, params, body):
+        if path.endswith("/labels"):
+            return 200, {"labels": []}
+        start = int(params.get("pageToken", 0))
+        size = int(params["maxResults"])
+        page_size_seen.append(size)
+        end = min(start + size, total_ids)
+        payload = {"messages": [{"id": f"m{i}"} for i in range(start, end)]}
+        if end < total_ids:
+            payload["nextPageToken"] = str(end)
+        return 200, payload
+
+    return handler
+
+
+def test_iter_message_ids_follows_page_tokens(fake_gmail_http):
+    sizes = []
+    client = GmailClient(None, http=fake_gmail_http(make_list_handler(7, sizes)))
+    assert list(client.iter_message_ids("is:unread", page_size=3)) == [f"m{i}" for i in range(7)]
+    assert sizes == [3, 3, 3]
+
+
+def test_iter_message_ids_is_lazy_and_respects_limit(fake_gmail_http):
+    sizes = []
+    http = fake_gmail_http(make_list_handler(1000, sizes))
+    client = GmailClient(None, http=http)
+    ids = client.iter_message_ids("is:unread", limit=5, page_size=2)
+    assert next(ids) == "m0"
+    assert sizes == [2]
+    assert list(ids) == ["m1", "m2", "m3", "m4"]
+    assert sizes == [2, 2, 1]
+    assert len(client.list_messages("is:unread", max_results=600)) == 600
+
+
+def test_list_history_folds_changes_across_pages(fake_gmail_http):
+    pages = {
+        None: {
+            "history": [
+                {"messagesAdded": [{"message": {"id": "a", "labelIds": ["INBOX", "UNREAD"]}}]},
+                {"messagesAdded": [{"message": {"id": "b", "labelIds": ["INBOX"]}}]},
+                {"labelsRemoved": [{"message": {"id": "old", "labelIds": ["INBOX"]}, "labelIds": ["UNREAD"]}]},
+            ],
+            "nextPageToken": "p2",
+            "historyId": "150",
+        },
+        "p2": {
+            "history": [
+                {"messagesDeleted": [{"message": {"id": "b"}}]},
+                {"labelsAdded": [{"message": {"id": "a", "labelIds": ["INBOX", "UNREAD", "STARRED"]}, "labelIds": ["STARRED"]}]},
+            ],
+            "historyId": "200",
+        },
+    }
+
+    def handler(method, path, params, body):
+        if path.endswith("/labels"):
+            return 200, {"labels": []}
+        assert params["startHistoryId"] == "100"
+        return 200, pages[params.get("pageToken")]
+
+    client = GmailClient(None, http=fake_gmail_http(handler))
+    changes = client.list_history("100")
+
+    assert changes.history_id == "200"
+    assert changes.added == ["a"]
+    assert changes.deleted == ["b"]
+    assert changes.label_updates == {"a": ["INBOX", "UNREAD", "STARRED"], "old": ["INBOX"]}
+
+
+def test_list_history_raises_when_checkpoint_expired(fake_gmail_http):
+    def handler(method, path, params, body):
+        if path.endswith("/labels"):
+            return 200, {"labels": []}
+        return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+
+    client = GmailClient(None, http=fake_gmail_http(handler))
+    with pytest.raises(HistoryExpiredError):
+        client.list_history("1")
+
+
+def test_batch_modify_labels_chunks_ids(fake_gmail_http):
+    bodies = []
+
+    def handler(method, path, params, body):
+        if path.endswith("/labels"):
+            return 200, {"labels": []}
+        bodies.append(body)
+        return 204, {}
+
+    client = GmailClient(None, http=fake_gmail_http(handler))
+    ids = [f"m{i}" for i in range(2500)]
+    assert client.batch_modify_labels(ids, remove_labels=["UNREAD"]) == ids
+    assert [len(b["ids"]) for b in bodies] == [1000, 1000, 500]
+    assert bodies[0]["removeLabelIds"] == ["UNREAD"]
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+from gmail_automation.database.connection import Database
+from gmail_automation.database.models import Email
+from gmail_automation.rules.context import EvaluationContext
+from gmail_automation.rules.engine import Action, Condition, Rule, RuleEngine
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+def test_context_resolves_relative_and_absolute_dates():
+    context = EvaluationContext(NOW)
+    assert context["30 minutes ago"] == NOW - timedelta(minutes=30)
+    assert context["2 Years ago"] == NOW - timedelta(days=730)
+    assert context["1 month ago"] == NOW - timedelta(days=30)
+    assert context["2024-01-31"] == datetime(2024, 1, 31)
+    assert context["2024-01-31T10:00:00+02:00"] == datetime(2024, 1, 31, 8)
+    assert context["2024-01-31T08:00:00Z"] == datetime(2024, 1, 31, 8)
+    assert context["soon"] is None
+    assert context["x days ago"] is None
+
+
+def test_date_filter_selects_the_same_emails_as_the_rule():
+    db = Database("sqlite://")
+    db.create_tables()
+    with db.get_session() as session:
+        for days in (1, 5, 10):
+            session.add(Email(id=str(days), thread_id="t", message_id=f"<{days}>", sender="a@b.c", received_at=NOW - timedelta(days=days)))
+
+    context = EvaluationContext(NOW)
+    clause = context.date_filter("received_at", "less_than", "7 days ago")
+    with db.get_session() as session:
+        assert [e.id for e in session.query(Email).filter(clause)] == ["10"]
+    assert context.date_filter("received_at", "less_than", "whenever") is None
+
+
+def test_start_run_fixes_cutoffs_for_the_whole_run():
+    rule = Rule(
+        name="recent",
+        conditions=[Condition(field="received_date", predicate="greater_than", value="1 hour ago")],
+        actions=[Action(type="mark_read")],
+    )
+    engine = RuleEngine(rules=[rule])
+    email = Email(id="1", received_at=NOW - timedelta(minutes=30))
+    engine.start_run(NOW)
+    assert engine.evaluate_email(email) == rule.actions
+    engine.start_run(NOW + timedelta(hours=1))
+    assert engine.evaluate_email(email) == []
@@ -3,6 +3,10 @@ import pytest
 from gmail_automation.database.connection import Database, get_db_url
 from gmail_automation.database.models import Email
 
+@pytest.fixture(autouse=True)
+def temp_database_url(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path}/gmail_automation.db")
+
 def test_database_connection():
     db = Database(get_db_url())
     db.create_tables()
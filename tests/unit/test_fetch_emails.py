@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+import fetch_emails  # noqa: E402
+from gmail_automation.database.connection import Database  # noqa: E402
+from gmail_automation.database.models import SyncState  # noqa: E402
+
+
+class FailingHistoryClient:
+    """Stands in for GmailClient when users.history.list fails with a 5xx."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def list_history(self, start_history_id):
+        return None
+
+    def get_history_id(self):
+        return "999"
+
+
+def test_history_error_keeps_checkpoint_without_full_resync(monkeypatch, tmp_path):
+    url = f"sqlite:///{tmp_path}/sync.db"
+    database = Database(url)
+    database.create_tables()
+    with database.get_session() as session:
+        session.add(SyncState(account=fetch_emails.SYNC_ACCOUNT, history_id="100"))
+
+    full_resync = MagicMock(return_value=True)
+    monkeypatch.setattr(fetch_emails, "full_resync", full_resync)
+    monkeypatch.setattr(fetch_emails, "GmailClient", FailingHistoryClient)
+    monkeypatch.setattr(fetch_emails, "GmailAuth", lambda: MagicMock())
+    monkeypatch.setattr(fetch_emails, "get_db_url", lambda: url)
+    monkeypatch.setattr(sys, "argv", ["fetch_emails.py", "--incremental"])
+
+    with pytest.raises(SystemExit) as exit_info:
+        fetch_emails.main()
+    assert exit_info.value.code == 1
+    full_resync.assert_not_called()
+    with database.get_session() as session:
+        assert session.get(SyncState, fetch_emails.SYNC_ACCOUNT).history_id == "100"
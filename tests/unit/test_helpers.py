@@ -1,5 +1,9 @@
+import argparse
 import os
 import logging
+
+import pytest
+
 from gmail_automation.utils import helpers
 
 def test_setup_logging_sets_level(monkeypatch):
@@ -14,4 +18,14 @@ def test_get_env_var_returns_value(monkeypatch):
     assert helpers.get_env_var("FOO") == "bar"
 
 def test_get_env_var_returns_default():
-    assert helpers.get_env_var("NOT_SET", "default") == "default"
\ No newline at end of file
+    assert helpers.get_env_var("NOT_SET", "default") == "default"
+
+def test_chunked_splits_lazily():
+    assert list(helpers.chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(helpers.chunked([], 3)) == []
+
+def test_positive_int_rejects_zero_and_negatives():
+    assert helpers.positive_int("3") == 3
+    for value in ("0", "-1", "x"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            helpers.positive_int(value)
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+from gmail_automation.gmail.client import GmailClient
+from gmail_automation.gmail.labels import LabelRegistry
+from tests.unit.test_store import make_database
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2024, 1, 1)
+
+    def __call__(self):
+        return self.now
+
+
+class FakeLabels:
+    def __init__(self, names):
+        self.labels = [{"id": f"Label_{name}", "name": name} for name in names]
+        self.fetches = 0
+
+    def fetch(self):
+        self.fetches += 1
+        return list(self.labels)
+
+
+def test_lookups_are_lazy_and_system_labels_need_no_request():
+    labels = FakeLabels(["Work"])
+    registry = LabelRegistry(labels.fetch)
+    assert registry.get_id("INBOX") == "INBOX" and labels.fetches == 0
+    assert registry.get_id("Work") == "Label_Work"
+    assert registry.get_id("Work") == "Label_Work"
+    assert labels.fetches == 1
+
+
+def test_refresh_on_miss_negative_cache_and_ttl():
+    clock = FakeClock()
+    labels = FakeLabels(["Work"])
+    registry = LabelRegistry(labels.fetch, ttl=3600, negative_ttl=60, clock=clock)
+    assert registry.get_id("Work") == "Label_Work"
+
+    labels.labels.append({"id": "Label_New", "name": "New"})
+    assert registry.get_id("New") == "Label_New"
+    assert labels.fetches == 2
+
+    assert registry.get_id("Missing") is None
+    assert registry.get_id("Missing") is None
+    assert labels.fetches == 3
+    clock.now += timedelta(seconds=61)
+    assert registry.get_id("Missing") is None
+    assert labels.fetches == 4
+
+    labels.labels = [{"id": "Label_Work2", "name": "Work"}]
+    clock.now += timedelta(hours=2)
+    assert registry.get_id("Work") == "Label_Work2"
+    assert labels.fetches == 5
+
+
+def test_distinct_misses_do_not_refetch_each_other():
+    labels = FakeLabels(["Work"])
+    registry = LabelRegistry(labels.fetch, negative_ttl=60, clock=FakeClock())
+    assert registry.get_id("A") is None and registry.get_id("B") is None
+    fetches = labels.fetches
+    for _ in range(3):
+        assert registry.get_id("A") is None and registry.get_id("B") is None
+    assert labels.fetches == fetches
+
+    labels.labels.append({"id": "Label_A", "name": "A"})
+    registry.invalidate()
+    assert registry.get_id("A") == "Label_A"
+    assert registry.get_id("B") is None and labels.fetches == fetches + 1
+
+
+def test_labels_persist_between_registries():
+    clock = FakeClock()
+    database = make_database()
+    labels = FakeLabels(["Work"])
+    LabelRegistry(labels.fetch, database=database, clock=clock).get_id("Work")
+
+    assert LabelRegistry(labels.fetch, database=database, clock=clock).get_id("Work") == "Label_Work"
+    assert labels.fetches == 1
+    clock.now += timedelta(hours=2)
+    LabelRegistry(labels.fetch, database=database, clock=clock).get_id("Work")
+    assert labels.fetches == 2
+
+
+def test_client_creates_missing_labels_in_one_batch(fake_gmail_http):
+    created = []
+
+    def handler(method, path, params, body):
+        if method == "POST" and path.endswith("/labels"):
+            created.append(body["name"])
+            return 200, {"id": f"Label_{body['name']}", "name": body["name"]}
+        return 200, {"labels": [{"id": "Label_Work", "name": "Work"}]}
+
+    http = fake_gmail_http(handler)
+    client = GmailClient(None, http=http)
+    assert http.calls == []
+
+    ids = client.labels.ensure(["Work", "Receipts/2024", "INBOX", "Travel"])
+    assert ids == {"Work": "Label_Work", "Receipts/2024": "Label_Receipts/2024", "INBOX": "INBOX", "Travel": "Label_Travel"}
+    assert created == ["Receipts/2024", "Travel"] and http.batches == 1
+    assert client.get_label_id_by_name("Travel") == "Label_Travel"
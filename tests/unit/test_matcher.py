@@ -0,0 +1,31 @@
+import random
+
+import pytest
+
+from gmail_automation.rules import matcher
+from gmail_automation.rules.matcher import MultiPatternMatcher
+
+
+@pytest.fixture(params=["automaton", "regex"])
+def backend(request, monkeypatch):
+    if request.param == "automaton":
+        pytest.importorskip("ahocorasick")
+    else:
+        monkeypatch.setattr(matcher, "ahocorasick", None)
+    return request.param
+
+
+def test_matcher_finds_overlapping_and_nested_patterns(backend):
+    patterns = ["he", "she", "his", "hers", "ers", "a.b", ""]
+    found = MultiPatternMatcher(patterns).find("ushers and a.b")
+    assert found == {"he", "she", "hers", "ers", "a.b"}
+    assert MultiPatternMatcher([]).find("anything") == frozenset()
+
+
+def test_matcher_agrees_with_substring_checks(backend):
+    rng = random.Random(7)
+    patterns = {"".join(rng.choices("abc", k=rng.randint(1, 5))) for _ in range(60)}
+    index = MultiPatternMatcher(patterns)
+    for _ in range(200):
+        text = "".join(rng.choices("abcd", k=rng.randint(0, 30)))
+        assert index.find(text) == {p for p in patterns if p in text}
@@ -0,0 +1,70 @@
+import base64
+import tracemalloc
+from email.message import EmailMessage
+
+from gmail_automation.gmail.mime import read_raw_message
+from gmail_automation.gmail.parser import parse_message
+
+
+def raw_message(message_id, message):
+    return {
+        "id": message_id,
+        "threadId": f"t-{message_id}",
+        "labelIds": ["INBOX", "UNREAD"],
+        "internalDate": "1700000000000",
+        "raw": base64.urlsafe_b64encode(bytes(message)).decode("ascii").rstrip("="),
+    }
+
+
+def make_mime(text="Hello there,\nsee attached.\n", attachment=b"", attachment_first=False):
+    message = EmailMessage()
+    message["From"] = "Billing <billing@example.com>"
+    message["To"] = "me@example.com"
+    message["Subject"] = "Facture n° 12 — naïve"
+    message["Message-ID"] = "<m1@example.com>"
+    if attachment_first:
+        message.add_attachment(attachment, maintype="application", subtype="pdf", filename="a.pdf")
+        message.add_attachment(text, disposition="inline")
+    else:
+        message.set_content(text)
+        message.add_alternative(f"<p>{text}</p>", subtype="html")
+        message.add_attachment(attachment, maintype="application", subtype="pdf", filename="a.pdf")
+    return message
+
+
+def test_raw_message_matches_full_format_fields():
+    email = parse_message(raw_message("m1", make_mime(attachment=b"%PDF" * 1000)), "raw")
+    assert email.sender == "Billing <billing@example.com>"
+    assert email.recipient == "me@example.com"
+    assert email.subject == "Facture n° 12 — naïve"
+    assert email.message_id == "<m1@example.com>"
+    assert email.body == "Hello there,\nsee attached.\n"
+    assert (email.body_fetched, email.is_read, email.labels) == (True, False, '["INBOX", "UNREAD"]')
+
+
+def test_attachment_is_skipped_in_bounded_memory():
+    attachment = bytes(range(256)) * 40_000  # ~10 MB, before the text part
+    message = raw_message("m2", make_mime(attachment=attachment, attachment_first=True))
+
+    tracemalloc.start()
+    try:
+        email = parse_message(message, "raw")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert email.body == "Hello there,\nsee attached.\n"
+    assert peak < 1_000_000
+
+
+def test_html_only_quoted_printable_falls_back_and_truncates():
+    message = EmailMessage()
+    message["Subject"] = "News"
+    message.set_content("<html><body><p>Café &amp; more</p>" + "x" * 500 + "</body></html>", subtype="html", cte="quoted-printable")
+    message.add_attachment(b"\x00" * 5000, maintype="image", subtype="png", filename="logo.png")
+    data = raw_message("m3", message)["raw"]
+
+    raw = read_raw_message(data)
+    assert raw.mime_type == "text/html"
+    assert parse_message(raw_message("m3", message), "raw").body.startswith("Café & more xxx")
+    assert read_raw_message(data, max_body_bytes=20).text == "<html><body><p>Café"
+    assert read_raw_message(data, chunk_size=8).text == raw.text
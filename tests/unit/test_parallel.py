@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+from gmail_automation.database.connection import Database
+from gmail_automation.database.models import Email
+from gmail_automation.database.store import EmailStore, EmailWriter
+from gmail_automation.gmail.client import GmailClient
+from gmail_automation.gmail.parallel import ParallelFetcher
+from tests.unit.test_client import make_handler
+from tests.unit.test_store import make_email
+
+
+def test_parallel_fetcher_uses_one_client_per_thread(fake_gmail_http, gmail_message):
+    messages = {f"m{i}": gmail_message(f"m{i}") for i in range(20)}
+    built = []
+
+    def client_factory():
+        built.append(threading.get_ident())
+        return GmailClient(None, http=fake_gmail_http(make_handler(messages)))
+
+    chunks = [[f"m{i}", f"m{i + 1}"] for i in range(0, 20, 2)] + [[], ["missing"]]
+    with ParallelFetcher(client_factory, workers=3, batch_size=2) as fetcher:
+        results = list(fetcher.fetch(chunks))
+
+    assert sorted(e.id for r in results for e in r.emails) == sorted(messages)
+    assert [f for r in results for f in r.failures] == ["missing"]
+    assert len(built) == len(set(built)) <= 3
+
+
+def test_email_writer_stores_batches_from_one_thread(tmp_path):
+    db = Database(f"sqlite:///{tmp_path / 'emails.db'}")
+    db.create_tables()
+    store = EmailStore(db, commit_every=3)
+    writers = set()
+    add = store.add
+
+    def tracking_add(emails):
+        writers.add(threading.get_ident())
+        time.sleep(0.01)
+        add(emails)
+
+    store.add = tracking_add
+    with EmailWriter(store, max_pending=1) as writer:
+        for i in range(0, 10, 2):
+            writer.put([make_email(str(i)), make_email(str(i + 1))])
+
+    assert store.inserted == 10
+    assert len(writers) == 1 and threading.get_ident() not in writers
+    with db.get_session() as session:
+        assert session.query(Email).count() == 10
+
+
+def test_email_writer_reraises_store_errors(tmp_path):
+    db = Database(f"sqlite:///{tmp_path / 'emails.db'}")
+    store = EmailStore(db, commit_every=1)
+
+    with pytest.raises(RuntimeError):
+        with EmailWriter(store) as writer:
+            writer.put([make_email("1")])
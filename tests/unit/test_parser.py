@@ -0,0 +1,49 @@
+import base64
+import json
+from pathlib import Path
+
+import pytest
+
+from gmail_automation.gmail.parser import decode_body, parse_message, select_headers
+
+FIXTURES = Path(__file__).parent.parent / "fixtures" / "gmail_messages"
+
+
+def load_fixture(name):
+    return json.loads((FIXTURES / f"{name}.json").read_text())
+
+
+@pytest.mark.parametrize(
+    "name, sender, subject, body_start",
+    [
+        ("plain", "Alice <alice@example.com>", "Lunch on Friday?", "Hi,\r\n\r\nAre you free"),
+        ("attachment", "Billing <billing@vendor.example.com>", "Invoice 4821", "Please find invoice 4821 attached."),
+        ("notification", "GitHub <noreply@github.com>", "[repo] Build failed on main — naïve fix needed", "Build failed ✗"),
+    ],
+)
+def test_parse_corpus_uses_plain_text_part(name, sender, subject, body_start):
+    email = parse_message(load_fixture(name))
+    assert (email.sender, email.subject) == (sender, subject)
+    assert email.recipient == "me@example.com"
+    assert email.body.startswith(body_start)
+
+
+@pytest.mark.parametrize("name", ["html_only", "nested_html"])
+def test_html_bodies_fall_back_to_text(name):
+    body = parse_message(load_fixture(name)).body
+    assert "<" not in body and "color:#333" not in body and "var t" not in body
+    assert " — & more" in body
+    assert body.rstrip().endswith("Unsubscribe")
+
+
+def test_body_is_truncated_to_max_bytes():
+    message = load_fixture("large")
+    full = parse_message(message, max_body_bytes=None).body
+    assert len(full) > 50_000
+    assert parse_message(message, max_body_bytes=1000).body == full[:1000]
+    assert decode_body(base64.urlsafe_b64encode("aé".encode()).decode(), max_body_bytes=2) == "a"
+
+
+def test_select_headers_takes_first_of_each_in_any_case():
+    headers = [{"name": "Received", "value": "x"}, {"name": "SUBJECT", "value": "One"}, {"name": "Subject", "value": "Two"}, {"name": "message-id", "value": "<id>"}]
+    assert select_headers(headers) == {"subject": "One", "message_id": "<id>"}
@@ -0,0 +1,97 @@
+import pytest
+from googleapiclient.errors import HttpError
+
+from gmail_automation.gmail.client import GmailClient
+from gmail_automation.gmail.ratelimit import AdaptiveConcurrency, RateLimiter, TokenBucket
+from tests.unit.test_client import MESSAGE_PATH, make_handler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_limiter(clock, **kwargs):
+    return RateLimiter(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_token_bucket_waits_for_units():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire(10) == 0
+    assert bucket.acquire(5) == pytest.approx(0.5)
+    clock.now += 1.0
+    assert bucket.acquire(5) == 0
+
+
+def test_adaptive_concurrency_halves_and_recovers():
+    limit = AdaptiveConcurrency(8)
+    limit.acquire()
+    limit.release(throttled=True)
+    assert limit.limit == 4
+    for _ in range(4):
+        limit.acquire()
+        limit.release()
+    assert limit.limit == 5
+
+
+def test_execute_retries_throttled_requests_honouring_retry_after(fake_gmail_http):
+    responses = [(429, {"error": {"code": 429}}, {"retry-after": "7"}), (503, {"error": {"code": 503}})]
+
+    def handler(method, path, params, body):
+        if path.endswith("/profile") and responses:
+            return responses.pop(0)
+        return 200, {"historyId": "42", "labels": []}
+
+    clock = FakeClock()
+    client = GmailClient(None, http=fake_gmail_http(handler), rate_limiter=make_limiter(clock, max_concurrency=4))
+
+    assert client.get_history_id() == "42"
+    assert clock.sleeps[0] >= 7 and len(clock.sleeps) == 2
+    assert client.rate_limiter.concurrency.limit == 2
+
+
+def test_execute_raises_after_retries_and_not_on_client_errors(fake_gmail_http):
+    clock = FakeClock()
+    http = fake_gmail_http(lambda *args: (500, {"error": {"code": 500}}))
+    client = GmailClient(None, http=http, rate_limiter=make_limiter(clock, max_retries=2))
+    assert client.get_history_id() is None
+    assert len(http.calls) == 3
+
+    limiter = make_limiter(clock)
+    request = client.service.users().getProfile(userId="me")
+    http.handler = lambda *args: (404, {"error": {"code": 404}})
+    with pytest.raises(HttpError):
+        limiter.execute(request)
+    assert len(http.calls) == 4
+
+
+def test_get_messages_details_retries_throttled_sub_requests(fake_gmail_http, gmail_message):
+    messages = {f"m{i}": gmail_message(f"m{i}") for i in range(4)}
+    serve = make_handler(messages)
+    throttled = {"m1", "m3"}
+
+    def handler(method, path, params, body):
+        match = MESSAGE_PATH.search(path)
+        if match and match.group(1) in throttled:
+            throttled.discard(match.group(1))
+            return 429, {"error": {"code": 429, "message": "Too many requests"}}
+        return serve(method, path, params, body)
+
+    clock = FakeClock()
+    http = fake_gmail_http(handler)
+    client = GmailClient(None, http=http, rate_limiter=make_limiter(clock))
+
+    result = client.get_messages_details(["m0", "m1", "m2", "m3", "missing"])
+
+    assert [e.id for e in result.emails] == ["m0", "m1", "m2", "m3"]
+    assert list(result.failures) == ["missing"]
+    assert http.batches == 2 and len(clock.sleeps) == 1
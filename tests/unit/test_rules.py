@@ -24,4 +24,153 @@ def test_rule_engine_evaluate_email_no_match():
         updated_at=None,
     )
     actions = engine.evaluate_email(email)
-    assert isinstance(actions, list)
\ No newline at end of file
+    assert isinstance(actions, list)
+
+def make_test_email(email_id, sender, subject, body, days_old):
+    from datetime import datetime, timedelta
+    return Email(
+        id=email_id,
+        thread_id="t1",
+        message_id=f"m{email_id}",
+        sender=sender,
+        recipient="me@example.com",
+        subject=subject,
+        body=body,
+        received_at=datetime.utcnow() - timedelta(days=days_old),
+        is_read=False,
+        labels="[]",
+    )
+
+def make_reference_rules():
+    from gmail_automation.rules.engine import Action, Condition, Rule
+
+    return [
+        Rule(name="contains", conditions=[Condition(field="from", predicate="contains", value="NoReply")], actions=[Action(type="mark_read")]),
+        Rule(name="equals", conditions=[Condition(field="From", predicate="equals", value="Boss@Company.com")], actions=[Action(type="mark_unread")]),
+        Rule(
+            name="all",
+            logic="all",
+            conditions=[
+                Condition(field="subject", predicate="contains", value="newsletter"),
+                Condition(field="received_date", predicate="less_than", value="7 days ago"),
+                Condition(field="message", predicate="not_contains", value="urgent"),
+            ],
+            actions=[Action(type="move_message", destination="ARCHIVE")],
+        ),
+        Rule(
+            name="any",
+            logic="any",
+            conditions=[
+                Condition(field="subject", predicate="not_equals", value="hello"),
+                Condition(field="received_date", predicate="greater_than", value="2 weeks ago"),
+            ],
+            actions=[Action(type="mark_read")],
+        ),
+        Rule(name="bad predicate", conditions=[Condition(field="from", predicate="matches", value="x")], actions=[Action(type="mark_read")]),
+        Rule(name="bad logic", logic="xor", conditions=[Condition(field="from", predicate="contains", value="a")], actions=[Action(type="mark_read")]),
+    ]
+
+def make_reference_emails():
+    return [
+        make_test_email("1", "noreply@shop.com", "Weekly Newsletter", "Deals", 10),
+        make_test_email("2", "boss@company.com", "Hello", None, 1),
+        make_test_email("3", "friend@example.com", None, "urgent newsletter", 30),
+        make_test_email("4", "NOREPLY@x.com", "newsletter", "calm", 3),
+    ]
+
+@pytest.mark.parametrize("optimize", [False, True])
+def test_compiled_rules_match_reference_evaluation(optimize):
+    rules = make_reference_rules()
+    emails = make_reference_emails()
+    engine = RuleEngine(rules=rules, optimize=optimize)
+    for email in emails * 3:
+        expected = [a for rule in rules if engine._evaluate_rule(email, rule) for a in rule.actions]
+        assert engine.evaluate_email(email) == expected
+    assert [a.type for a in engine.evaluate_email(emails[0])] == ["mark_read", "move_message", "mark_read"]
+
+def test_optimize_orders_cheap_conditions_first():
+    from gmail_automation.rules.engine import Action, Condition, Rule
+
+    rule = Rule(
+        name="r",
+        conditions=[
+            Condition(field="message", predicate="contains", value="x"),
+            Condition(field="subject", predicate="contains", value="x"),
+            Condition(field="received_date", predicate="less_than", value="1 day ago"),
+        ],
+        actions=[Action(type="mark_read")],
+    )
+    engine = RuleEngine(rules=[rule], optimize=True)
+    costs = [c.cost for c in engine._compiled[0].conditions]
+    assert costs == sorted(costs)
+    assert engine._compiled[0].conditions[-1].cost == max(costs)
+
+    # A condition observed to always fail moves to the front of an "all" rule.
+    never = engine._compiled[0].conditions[-1]
+    never.evaluations, never.matches = 1000, 0
+    for c in engine._compiled[0].conditions[:-1]:
+        c.evaluations, c.matches = 1000, 1000
+    engine.reorder()
+    assert engine._compiled[0].conditions[0] is never
+
+def test_indexed_substring_rules_match_reference_evaluation(monkeypatch):
+    from gmail_automation.rules import engine as engine_module
+
+    monkeypatch.setattr(engine_module, "MIN_INDEXED_PATTERNS", 2)
+    rules = make_reference_rules()
+    emails = make_reference_emails()
+    engine = RuleEngine(rules=rules)
+    assert set(engine._matchers) == {"sender"}
+    for email in emails:
+        expected = [a for rule in rules if engine._evaluate_rule(email, rule) for a in rule.actions]
+        assert engine.evaluate_email(email) == expected
+
+def test_guarded_rules_skip_emails_without_their_pattern(monkeypatch):
+    from gmail_automation.rules import engine as engine_module
+    from gmail_automation.rules.engine import Action, Condition, Rule
+
+    monkeypatch.setattr(engine_module, "MIN_INDEXED_PATTERNS", 1)
+    rules = [
+        Rule(name=f"r{i}", conditions=[Condition(field="subject", predicate="contains", value=f"topic{i}")], actions=[Action(type="mark_read")])
+        for i in range(5)
+    ] + [Rule(name="any", logic="any", conditions=[Condition(field="subject", predicate="contains", value="topic4")], actions=[Action(type="mark_unread")])]
+    engine = RuleEngine(rules=rules)
+    assert engine._unguarded == [5]
+    fields = engine_module.FieldCache(make_test_email("1", "a@b.c", "About TOPIC3 and topic4", "", 0), engine._matchers)
+    assert [c.rule.name for c in engine._candidates(fields)] == ["r3", "r4", "any"]
+
+def test_equals_rules_are_looked_up_by_value():
+    from gmail_automation.rules.engine import Action, Condition, FieldCache, Rule
+
+    rules = [
+        Rule(name=f"vip{i}", conditions=[Condition(field="from", predicate="equals", value=f"VIP{i}@example.com")], actions=[Action(type="mark_read")])
+        for i in range(100)
+    ] + [
+        Rule(
+            name="any",
+            logic="any",
+            conditions=[Condition(field="from", predicate="equals", value="vip7@example.com")],
+            actions=[Action(type="mark_unread")],
+        )
+    ]
+    engine = RuleEngine(rules=rules)
+    assert engine._unguarded == [100]
+    email = make_test_email("1", "vip7@EXAMPLE.com", "Hi", "", 0)
+    assert [c.rule.name for c in engine._candidates(FieldCache(email))] == ["vip7", "any"]
+    assert [a.type for a in engine.evaluate_email(email)] == ["mark_read", "mark_unread"]
+
+def test_referenced_fields_skips_body_without_message_conditions():
+    from gmail_automation.rules.engine import Action, Condition, Rule
+
+    rule = Rule(
+        name="r",
+        conditions=[
+            Condition(field="From", predicate="contains", value="a"),
+            Condition(field="received_date", predicate="less_than", value="1 day ago"),
+        ],
+        actions=[Action(type="mark_read")],
+    )
+    engine = RuleEngine(rules=[rule])
+    assert engine.referenced_fields() == {"sender", "received_at"}
+    rule.conditions.append(Condition(field="message", predicate="contains", value="b"))
+    assert "body" in RuleEngine(rules=[rule]).referenced_fields()
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from gmail_automation.database.connection import Database
+from gmail_automation.database.models import Base, Email
+from gmail_automation.database.search import contains_filter, create_search_index, search_emails
+from gmail_automation.database.store import EmailStore
+from gmail_automation.rules.engine import Action, Condition, Rule, RuleEngine
+
+
+def make_email(message_id, subject, body, sender="a@b.com", days_old=0):
+    return Email(
+        id=message_id,
+        thread_id="t1",
+        message_id=f"<{message_id}@example.com>",
+        sender=sender,
+        recipient="b@c.com",
+        subject=subject,
+        body=body,
+        received_at=datetime(2024, 1, 10) - timedelta(days=days_old),
+        is_read=False,
+        labels='["INBOX"]',
+    )
+
+
+def test_search_index_stays_in_sync():
+    db = Database("sqlite://")
+    db.create_tables()
+    with EmailStore(db) as store:
+        store.add([make_email("1", "Your Invoice", "Paid in full"), make_email("2", "Lunch?", "See you at noon", days_old=1)])
+
+    with db.get_session() as session:
+        assert [e.id for e in search_emails(session, "invoice")] == ["1"]
+        assert [e.id for e in search_emails(session, "noon", attribute="subject")] == []
+        assert [e.id for e in search_emails(session, "lunch OR invoice", raw=True)] == ["1", "2"]
+        session.get(Email, "2").subject = "Invoice reminder"
+    with db.get_session() as session:
+        assert [e.id for e in search_emails(session, "INVOICE")] == ["1", "2"]
+        session.delete(session.get(Email, "1"))
+    with db.get_session() as session:
+        assert [e.id for e in search_emails(session, "invoice")] == ["2"]
+
+
+def test_search_index_is_built_for_existing_emails():
+    db = Database("sqlite://")
+    Base.metadata.create_all(db.engine)
+    with db.get_session() as session:
+        session.add(make_email("1", "Quarterly report", "numbers"))
+    assert create_search_index(db.engine)
+    with db.get_session() as session:
+        assert [e.id for e in search_emails(session, "report")] == ["1"]
+
+
+def test_full_text_rule_filter_matches_like_filter():
+    db = Database("sqlite://")
+    db.create_tables()
+    with EmailStore(db) as store:
+        store.add([make_email(str(i), f"Subject {i}", f"Body with code X-{i % 3}", sender=f"s{i}@Shop.com") for i in range(9)])
+
+    rule = Rule(
+        name="r",
+        logic="any",
+        conditions=[
+            Condition(field="message", predicate="contains", value="x-1"),
+            Condition(field="from", predicate="contains", value="S4@shop"),
+        ],
+        actions=[Action(type="mark_read")],
+    )
+    engine = RuleEngine(rules=[rule])
+    assert contains_filter("body", "x-") is None
+    with db.get_session() as session:
+        like = {e.id for e in session.query(Email).filter(engine.sql_filter())}
+        fts = {e.id for e in session.query(Email).filter(engine.sql_filter(full_text=True))}
+    assert fts == like == {"1", "4", "7"}
@@ -0,0 +1,96 @@
+import json
+from datetime import datetime, timedelta
+
+from gmail_automation.database.connection import Database
+from gmail_automation.database.models import Email
+from gmail_automation.rules.context import EvaluationContext
+from gmail_automation.rules.engine import Action, Condition, Rule, RuleEngine
+from gmail_automation.rules.sql import changed_filter, condition_filter, rules_filter
+from tests.unit.test_rules import make_reference_emails, make_reference_rules
+
+NOW = datetime(2024, 6, 1)
+
+
+def make_database(emails):
+    db = Database("sqlite://")
+    db.create_tables()
+    with db.get_session() as session:
+        for email in emails:
+            email.message_id = f"<{email.id}>"
+            email.sender = email.sender or ""
+            session.add(email)
+    return db
+
+
+def test_sql_filter_selects_every_matching_email():
+    emails = make_reference_emails() + [
+        Email(id="5", thread_id="t", sender="100%_sure@x.com", subject="Plain", received_at=datetime.utcnow() - timedelta(days=60)),
+    ]
+    rules = make_reference_rules() + [
+        Rule(name="escape", conditions=[Condition(field="from", predicate="contains", value="100%_")], actions=[Action(type="mark_read")]),
+    ]
+    db = make_database(emails)
+    engine = RuleEngine(rules=rules)
+    engine.start_run()
+    clause = engine.sql_filter()
+    assert clause is not None
+
+    with db.get_session() as session:
+        candidates = session.query(Email).filter(clause).all()
+        matching = {e.id for e in session.query(Email) if engine.evaluate_email(e)}
+        assert matching <= {e.id for e in candidates}
+        for rule in rules:
+            selected = {e.id for e in session.query(Email).filter(rules_filter([rule], engine.context))}
+            assert selected == {e.id for e in session.query(Email) if engine._evaluate_rule(e, rule)}
+
+
+def test_untranslatable_conditions_fall_back_to_python():
+    context = EvaluationContext(NOW)
+    unicode_value = Condition(field="subject", predicate="contains", value="Ünïcode")
+    rule_any = Rule(name="any", logic="any", conditions=[unicode_value], actions=[])
+    rule_all = Rule(name="all", conditions=[unicode_value, Condition(field="from", predicate="equals", value="a@b.c")], actions=[])
+
+    assert condition_filter(unicode_value, context) is None
+    assert rules_filter([rule_any], context) is None
+    assert rules_filter([rule_all], context) is not None
+    assert RuleEngine(rules=[rule_any]).sql_filter() is None
+
+
+def test_body_conditions_select_unfetched_bodies():
+    emails = [
+        Email(id="1", thread_id="t", sender="a", body="Invoice attached", received_at=NOW),
+        Email(id="2", thread_id="t", sender="a", body="Hello", received_at=NOW),
+        Email(id="3", thread_id="t", sender="a", body=None, body_fetched=False, received_at=NOW),
+    ]
+    db = make_database(emails)
+    clause = condition_filter(Condition(field="message", predicate="contains", value="invoice"), EvaluationContext(NOW))
+    with db.get_session() as session:
+        assert {e.id for e in session.query(Email).filter(clause)} == {"1", "3"}
+
+
+def test_changed_filter_selects_updated_and_newly_old_emails():
+    watermark = NOW - timedelta(days=1)
+    emails = [
+        Email(id="updated", thread_id="t", received_at=NOW - timedelta(days=1), updated_at=NOW),
+        Email(id="crossed", thread_id="t", received_at=NOW - timedelta(days=7, hours=12), updated_at=watermark),
+        Email(id="old", thread_id="t", received_at=NOW - timedelta(days=30), updated_at=watermark),
+        Email(id="recent", thread_id="t", received_at=NOW - timedelta(days=2), updated_at=watermark),
+    ]
+    db = make_database(emails)
+    rules = [Rule(name="r", conditions=[Condition(field="received_date", predicate="less_than", value="7 days ago")], actions=[])]
+
+    clause = changed_filter(rules, EvaluationContext(NOW), watermark)
+    with db.get_session() as session:
+        assert {e.id for e in session.query(Email).filter(clause)} == {"updated", "crossed"}
+
+
+def test_rules_version_ignores_file_formatting(tmp_path):
+    rules = {"rules": [{"name": "r", "conditions": [{"field": "from", "predicate": "contains", "value": "a"}], "actions": [{"type": "mark_read"}]}]}
+    compact, pretty = tmp_path / "compact.json", tmp_path / "pretty.json"
+    compact.write_text(json.dumps(rules))
+    pretty.write_text(json.dumps(rules, indent=4))
+    assert RuleEngine(str(compact)).version() == RuleEngine(str(pretty)).version()
+
+    rules["rules"][0]["conditions"][0]["value"] = "b"
+    compact.write_text(json.dumps(rules))
+    assert RuleEngine(str(compact)).version() != RuleEngine(str(pretty)).version()
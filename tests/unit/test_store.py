@@ -0,0 +1,170 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import inspect, select, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from gmail_automation.database.connection import Database
+from gmail_automation.database.models import Email, EmailLabel
+from gmail_automation.database.store import (
+    EmailStore,
+    delete_emails,
+    iter_emails,
+    set_bodies,
+    set_labels,
+)
+
+
+def make_email(message_id):
+    return Email(
+        id=message_id,
+        thread_id="t1",
+        message_id=f"<{message_id}@example.com>",
+        sender="a@b.com",
+        recipient="b@c.com",
+        subject="Test",
+        body="Body",
+        received_at=datetime.utcnow(),
+        is_read=False,
+        labels='["INBOX"]',
+    )
+
+
+def make_database():
+    db = Database("sqlite://")
+    db.create_tables()
+    return db
+
+
+def test_store_dedupes_and_commits_in_chunks():
+    db = make_database()
+    store = EmailStore(db, commit_every=2)
+    store.add([make_email("1"), make_email("2"), make_email("3")])
+
+    # The first full chunk is committed, the third row is still buffered.
+    assert store.existing_ids(["1", "2", "3", "4"]) == {"1", "2"}
+    assert store.filter_new_ids(["1", "3", "4"]) == ["4"]
+
+    store.flush()
+    assert store.inserted == 3
+    with db.get_session() as session:
+        assert session.query(Email).count() == 3
+        assert session.get(Email, "3").created_at is not None
+
+
+def test_store_skips_conflicting_rows():
+    db = make_database()
+    with EmailStore(db) as store:
+        store.add([make_email("1")])
+    with EmailStore(db) as store:
+        store.add([make_email("1"), make_email("2")])
+    assert store.inserted == 1
+
+
+def label_rows(db):
+    with db.get_session() as session:
+        return set(session.execute(select(EmailLabel.email_id, EmailLabel.label_id)))
+
+
+def test_store_writes_label_rows_for_inserted_emails_only():
+    db = make_database()
+    with EmailStore(db) as store:
+        store.add([make_email("1")])
+    existing = make_email("1")
+    existing.labels = '["SPAM"]'
+    with EmailStore(db) as store:
+        store.add([existing, make_email("2")])
+    assert label_rows(db) == {("1", "INBOX"), ("2", "INBOX")}
+
+
+def test_set_labels_and_delete_emails_keep_label_rows_in_sync():
+    db = make_database()
+    with EmailStore(db) as store:
+        store.add([make_email("1"), make_email("2")])
+    with db.get_session() as session:
+        set_labels(session, {"1": ["INBOX", "UNREAD"]}, update_read_state=True)
+        delete_emails(session, ["2"])
+        session.commit()
+
+        email = session.get(Email, "1")
+        assert email.get_labels() == ["INBOX", "UNREAD"]
+        assert email.is_read is False
+        assert session.scalars(
+            select(Email.id).where(Email.has_label("UNREAD"))
+        ).all() == ["1"]
+    assert label_rows(db) == {("1", "INBOX"), ("1", "UNREAD")}
+
+
+def test_migrate_backfills_labels_and_creates_indexes():
+    db = make_database()
+    with EmailStore(db) as store:
+        store.add([make_email("1")])
+    with db.engine.begin() as connection:
+        connection.execute(text("DELETE FROM email_labels"))
+        connection.execute(text("DROP INDEX ix_emails_sender"))
+        connection.execute(text("CREATE INDEX ix_emails_received_at ON emails (received_at)"))
+
+    db.migrate()
+    db.migrate()
+    assert label_rows(db) == {("1", "INBOX")}
+    indexes = {index["name"] for index in inspect(db.engine).get_indexes("emails")}
+    assert "ix_emails_sender" in indexes
+    assert "ix_emails_received_at" not in indexes
+
+
+def test_migrate_adds_missing_columns():
+    db = make_database()
+    with EmailStore(db) as store:
+        store.add([make_email("1")])
+    with db.engine.begin() as connection:
+        connection.execute(text("ALTER TABLE emails DROP COLUMN body_fetched"))
+
+    db.migrate()
+    db.migrate()
+    with db.get_session() as session:
+        assert session.get(Email, "1").body_fetched is True
+
+
+def test_set_bodies_marks_fetched_without_touching_updated_at():
+    db = make_database()
+    email = make_email("1")
+    email.body, email.body_fetched = None, False
+    with EmailStore(db) as store:
+        store.add([email])
+    with db.get_session() as session:
+        updated_at = session.get(Email, "1").updated_at
+
+    with db.get_session() as session:
+        set_bodies(session, {"1": "Hello"})
+    with db.get_session() as session:
+        stored = session.get(Email, "1")
+        assert (stored.body, stored.body_fetched, stored.updated_at) == ("Hello", True, updated_at)
+
+
+def test_iter_emails_pages_in_received_order():
+    db = make_database()
+    emails = [make_email(str(i)) for i in range(5)]
+    for email in emails:
+        email.received_at = datetime(2024, 1, 1)
+    emails[0].received_at = datetime(2024, 1, 2)
+    with EmailStore(db) as store:
+        store.add(emails)
+
+    pages = list(iter_emails(db, Email.id != "3", page_size=2))
+    assert [[email.id for email in page] for page in pages] == [
+        ["1", "2"],
+        ["4", "0"],
+    ]
+
+
+def test_iter_emails_loads_only_requested_columns():
+    db = make_database()
+    with EmailStore(db) as store:
+        store.add([make_email("1")])
+
+    (page,) = iter_emails(db, columns={"sender"})
+    email = page[0]
+    assert email.sender == "a@b.com"
+    assert email.get_labels() == ["INBOX"]
+    with pytest.raises(SQLAlchemyError):
+        email.body